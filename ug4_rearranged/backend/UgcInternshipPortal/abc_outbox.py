@@ -0,0 +1,471 @@
+"""
+ABC Registry Outbox
+Approvals are queued in an outbox table together with the record write and
+delivered to the ABC registry by a background worker (batched, retried, idempotent)
+"""
+
+import os
+import json
+import time
+import queue
+import random
+import sqlite3
+import hashlib
+import threading
+import http.client
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Callable
+from urllib.parse import urlsplit
+
+import record_store
+from abc_portal import save_to_abc
+
+OUTBOX_DB = os.path.join(record_store.DB_FOLDER, 'abc_outbox.sqlite3')
+
+# Remote registry; the in-process simulator is used when unset
+ABC_API_URL = os.environ.get('ABC_API_URL', '')
+
+BATCH_SIZE = int(os.environ.get('ABC_OUTBOX_BATCH_SIZE', '25'))
+MAX_ATTEMPTS = int(os.environ.get('ABC_OUTBOX_MAX_ATTEMPTS', '8'))
+BACKOFF_BASE = float(os.environ.get('ABC_OUTBOX_BACKOFF_BASE', '2'))
+BACKOFF_MAX = float(os.environ.get('ABC_OUTBOX_BACKOFF_MAX', '300'))
+POLL_INTERVAL = float(os.environ.get('ABC_OUTBOX_POLL_INTERVAL', '1'))
+# Rows claimed by a worker that died are retried after this many seconds
+CLAIM_LEASE = float(os.environ.get('ABC_OUTBOX_CLAIM_LEASE', '120'))
+# Registry status of a delivered row is re-polled no more often than this,
+# backing off to RECONCILE_MAX as the delivery ages
+RECONCILE_INTERVAL = float(os.environ.get('ABC_OUTBOX_RECONCILE_INTERVAL', '30'))
+RECONCILE_MAX = float(os.environ.get('ABC_OUTBOX_RECONCILE_MAX', '3600'))
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    internship_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    approval TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    claimed_at REAL,
+    last_error TEXT,
+    abc_token TEXT,
+    remote_status TEXT,
+    created_at TEXT NOT NULL,
+    delivered_at TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+'''
+
+
+class DeliveryError(Exception):
+    """Delivery failed; retryable unless permanent is set"""
+    
+    def __init__(self, message: str, permanent: bool = False):
+        super().__init__(message)
+        self.permanent = permanent
+
+
+def idempotency_key(payload: Dict[str, Any]) -> str:
+    """Stable key for an approval: same student, internship and credits -> same key"""
+    basis = json.dumps({
+        'internship_id': payload.get('internship_id'),
+        'apaar_id': payload.get('apaar_id'),
+        'credits': payload.get('credits'),
+    }, sort_keys=True)
+    return hashlib.sha256(basis.encode()).hexdigest()[:32]
+
+
+def _connect() -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(OUTBOX_DB) or '.', exist_ok=True)
+    conn = sqlite3.connect(OUTBOX_DB, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.executescript(SCHEMA)
+    return conn
+
+
+@contextmanager
+def _transaction(conn: sqlite3.Connection):
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('COMMIT')
+
+
+def save_record_with_outbox(record: Dict[str, Any], payload: Dict[str, Any],
+                            approval_data: Dict[str, Any]) -> str:
+    """
+    Save a record and queue its ABC delivery atomically
+    
+    The outbox row is inserted and the record file written inside one
+    SQLite transaction; if the record write fails the row is rolled back.
+    An approval already in the outbox keeps its delivery: the record gets
+    that row's status and token rather than going back to 'queued'.
+    
+    Returns:
+        Idempotency key of the queued delivery
+    """
+    key = idempotency_key(payload)
+    conn = _connect()
+    try:
+        with _transaction(conn):
+            conn.execute(
+                # Re-approving an undeliverable submission queues it again
+                '''INSERT INTO outbox
+                   (idempotency_key, internship_id, payload, approval, next_attempt_at, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (idempotency_key) DO UPDATE SET
+                       status = 'pending', attempts = 0, last_error = NULL,
+                       next_attempt_at = excluded.next_attempt_at
+                   WHERE outbox.status = 'failed' ''',
+                (key, record['internship_id'], json.dumps(payload), json.dumps(approval_data),
+                 time.time(), datetime.now().isoformat())
+            )
+            row = conn.execute('SELECT status, abc_token, remote_status FROM outbox WHERE idempotency_key = ?',
+                               (key,)).fetchone()
+            if row['status'] == 'delivered':
+                record['abc_token'] = row['abc_token']
+                record['abc_status'] = row['remote_status']
+            record['abc_outbox_key'] = key
+            record_store.save_record(record)
+    finally:
+        conn.close()
+    
+    wake_worker()
+    return key
+
+
+def outbox_status(internship_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Outbox rows (optionally for one internship), newest first"""
+    conn = _connect()
+    try:
+        if internship_id:
+            rows = conn.execute('SELECT * FROM outbox WHERE internship_id = ? ORDER BY id DESC', (internship_id,))
+        else:
+            rows = conn.execute('SELECT * FROM outbox ORDER BY id DESC LIMIT 200')
+        return [dict(row) for row in rows]
+    finally:
+        conn.close()
+
+
+def purge(internship_id: str) -> int:
+    """
+    Drop queued deliveries of a deleted record
+    
+    Call under record_store.record_lock(internship_id). Pending and failed
+    rows are deleted. Rows a worker is sending right now are marked
+    'cancelled' and settled by that worker when the call returns. Delivered
+    rows keep only their receipt (token and status); the student's data is
+    cleared from them.
+    
+    Returns:
+        Number of undelivered rows removed or cancelled
+    """
+    conn = _connect()
+    try:
+        with _transaction(conn):
+            removed = conn.execute("DELETE FROM outbox WHERE internship_id = ? AND status IN ('pending', 'failed')",
+                                   (internship_id,)).rowcount
+            removed += conn.execute("UPDATE outbox SET status = 'cancelled' WHERE internship_id = ? "
+                                    "AND status = 'sending'", (internship_id,)).rowcount
+            conn.execute("UPDATE outbox SET payload = '{}', approval = '{}' WHERE internship_id = ? "
+                         "AND status = 'delivered'", (internship_id,))
+        return removed
+    finally:
+        conn.close()
+
+
+# ============ TRANSPORTS ============
+
+class LocalABCTransport:
+    """Delivers through an in-process function (the demo simulator)"""
+    
+    def __init__(self, upload_func: Callable[[Dict[str, Any]], Dict[str, Any]], max_tokens: int = 4096):
+        self.upload_func = upload_func
+        # Responses of recent keys, so a retried delivery gets the same token
+        self._tokens = OrderedDict()
+        self.max_tokens = max_tokens
+    
+    def upload(self, payload: Dict[str, Any], key: str) -> Dict[str, Any]:
+        response = self._tokens.get(key) or self.upload_func(payload)
+        self._tokens[key] = response
+        self._tokens.move_to_end(key)
+        while len(self._tokens) > self.max_tokens:
+            self._tokens.popitem(last=False)
+        return response
+    
+    def status(self, abc_token: str) -> Dict[str, Any]:
+        return {'abc_token': abc_token, 'status': 'processed'}
+
+
+class HTTPABCClient:
+    """
+    Minimal keep-alive HTTP client with a fixed-size connection pool
+    
+    Talks to an ABC registry exposing POST /api/abc/upload and
+    GET /api/abc/status/<token> (same shape as the local simulator).
+    """
+    
+    def __init__(self, base_url: str, pool_size: int = 4, timeout: float = 10.0):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme or 'http'
+        self.host = parts.hostname
+        self.port = parts.port
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+    
+    def _new_connection(self):
+        cls = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=self.timeout)
+    
+    def _request(self, method: str, path: str, body: Optional[Dict] = None,
+                 headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._new_connection()
+        
+        send_headers = {'Content-Type': 'application/json', 'Connection': 'keep-alive'}
+        send_headers.update(headers or {})
+        try:
+            conn.request(method, self.prefix + path, body=json.dumps(body) if body is not None else None,
+                         headers=send_headers)
+            response = conn.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            conn.close()
+            raise DeliveryError(f"Connection error: {e}")
+        
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+        
+        if response.status >= 500 or response.status == 429:
+            raise DeliveryError(f"ABC registry returned {response.status}")
+        if response.status >= 400:
+            raise DeliveryError(f"ABC registry rejected request ({response.status})", permanent=True)
+        return json.loads(data or b'{}')
+    
+    def upload(self, payload: Dict[str, Any], key: str) -> Dict[str, Any]:
+        return self._request('POST', '/api/abc/upload', payload, {'Idempotency-Key': key})
+    
+    def status(self, abc_token: str) -> Dict[str, Any]:
+        return self._request('GET', f'/api/abc/status/{abc_token}')
+    
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+# ============ DELIVERY WORKER ============
+
+def backoff_delay(attempts: int) -> float:
+    """Exponential backoff with jitter"""
+    delay = min(BACKOFF_BASE ** attempts, BACKOFF_MAX)
+    return delay * random.uniform(0.5, 1.0)
+
+
+class DeliveryWorker:
+    """Drains the outbox in batches and reconciles registry status"""
+    
+    def __init__(self, transport, batch_size: int = BATCH_SIZE, concurrency: int = 4):
+        self.transport = transport
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True, name='abc-outbox')
+            self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(5)
+    
+    def wake(self):
+        self._wake.set()
+    
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                delivered = self.run_once()
+                self.reconcile()
+            except Exception as e:
+                print(f"ABC outbox worker error: {e}")
+                delivered = 0
+            if not delivered:
+                self._wake.wait(POLL_INTERVAL)
+                self._wake.clear()
+    
+    def _claim_batch(self, conn: sqlite3.Connection) -> List[sqlite3.Row]:
+        now = time.time()
+        with _transaction(conn):
+            # Release claims of workers that died mid-delivery
+            conn.execute("UPDATE outbox SET status = 'pending' WHERE status = 'sending' AND claimed_at < ?",
+                         (now - CLAIM_LEASE,))
+            conn.execute("DELETE FROM outbox WHERE status = 'cancelled' AND claimed_at < ?", (now - CLAIM_LEASE,))
+            rows = conn.execute(
+                "SELECT * FROM outbox WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+                (now, self.batch_size)
+            ).fetchall()
+            if rows:
+                conn.executemany("UPDATE outbox SET status = 'sending', claimed_at = ? WHERE id = ?",
+                                 [(now, row['id']) for row in rows])
+        return rows
+    
+    def run_once(self) -> int:
+        """Deliver one batch; returns the number of rows attempted"""
+        conn = _connect()
+        try:
+            rows = self._claim_batch(conn)
+            if not rows:
+                return 0
+            
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(rows))) as pool:
+                results = list(pool.map(self._deliver, rows))
+            
+            for row, (response, error) in zip(rows, results):
+                if error is None:
+                    self._mark_delivered(conn, row, response)
+                else:
+                    self._mark_failed(conn, row, error)
+            return len(rows)
+        finally:
+            conn.close()
+    
+    def _deliver(self, row: sqlite3.Row):
+        try:
+            return self.transport.upload(json.loads(row['payload']), row['idempotency_key']), None
+        except DeliveryError as e:
+            return None, e
+        except Exception as e:
+            return None, DeliveryError(str(e))
+    
+    def _mark_delivered(self, conn: sqlite3.Connection, row: sqlite3.Row, response: Dict[str, Any]):
+        abc_token = response['abc_token']
+        status = response.get('status', 'accepted')
+        
+        delivered = conn.execute(
+            "UPDATE outbox SET status = 'delivered', abc_token = ?, remote_status = ?, delivered_at = ?, "
+            "attempts = attempts + 1, last_error = NULL WHERE id = ? AND status = 'sending'",
+            (abc_token, status, datetime.now().isoformat(), row['id'])
+        ).rowcount
+        if not delivered:
+            # Purged while in flight: the registry has it, so keep the receipt without the student's data
+            conn.execute(
+                "UPDATE outbox SET status = 'delivered', abc_token = ?, remote_status = ?, delivered_at = ?, "
+                "attempts = attempts + 1, last_error = NULL, payload = '{}', approval = '{}' "
+                "WHERE id = ? AND status = 'cancelled'",
+                (abc_token, status, datetime.now().isoformat(), row['id'])
+            )
+            return
+        
+        def update(record):
+            record['abc_token'] = abc_token
+            record['abc_status'] = status
+        
+        record = record_store.update_record(row['internship_id'], update)
+        if record is None:
+            # Student deleted their data in the meantime
+            return
+        
+        save_to_abc(row['internship_id'], abc_token, record['form_data'], json.loads(row['approval']))
+    
+    def _mark_failed(self, conn: sqlite3.Connection, row: sqlite3.Row, error: DeliveryError):
+        # Purged while in flight and nothing reached the registry: drop it
+        if conn.execute("DELETE FROM outbox WHERE id = ? AND status = 'cancelled'", (row['id'],)).rowcount:
+            return
+        
+        attempts = row['attempts'] + 1
+        if error.permanent or attempts >= MAX_ATTEMPTS:
+            conn.execute("UPDATE outbox SET status = 'failed', attempts = ?, last_error = ? WHERE id = ?",
+                         (attempts, str(error), row['id']))
+            record_store.update_record(row['internship_id'],
+                                       lambda record: record.update(abc_status='delivery_failed'))
+            return
+        
+        conn.execute(
+            "UPDATE outbox SET status = 'pending', attempts = ?, last_error = ?, next_attempt_at = ? WHERE id = ?",
+            (attempts, str(error), time.time() + backoff_delay(attempts), row['id'])
+        )
+    
+    def reconcile(self, limit: int = 50) -> int:
+        """
+        Poll registry status for delivered rows not yet processed
+        
+        A row is polled again after RECONCILE_INTERVAL, or a quarter of its
+        age since delivery once that is longer (capped at RECONCILE_MAX).
+        """
+        conn = _connect()
+        try:
+            now = time.time()
+            rows = conn.execute(
+                "SELECT * FROM outbox WHERE status = 'delivered' AND remote_status != 'processed' "
+                "AND next_attempt_at <= ? ORDER BY next_attempt_at LIMIT ?",
+                (now, limit)
+            ).fetchall()
+            updated = 0
+            for row in rows:
+                age = max(0.0, (datetime.now() - datetime.fromisoformat(row['delivered_at'])).total_seconds())
+                conn.execute('UPDATE outbox SET next_attempt_at = ? WHERE id = ?',
+                             (now + min(max(RECONCILE_INTERVAL, age / 4), RECONCILE_MAX), row['id']))
+                try:
+                    remote = self.transport.status(row['abc_token'])
+                except DeliveryError:
+                    continue
+                remote_status = remote.get('status', row['remote_status'])
+                if remote_status == row['remote_status']:
+                    continue
+                
+                conn.execute('UPDATE outbox SET remote_status = ? WHERE id = ?', (remote_status, row['id']))
+                record_store.update_record(row['internship_id'],
+                                           lambda record: record.update(abc_status=remote_status))
+                updated += 1
+            return updated
+        finally:
+            conn.close()
+
+
+_worker: Optional[DeliveryWorker] = None
+
+
+def start_delivery_worker(local_upload: Callable[[Dict[str, Any]], Dict[str, Any]]) -> DeliveryWorker:
+    """
+    Start the process-wide delivery worker (or restart it if its thread died)
+    
+    Call this from a running process, not at import: a thread started before
+    a fork (gunicorn --preload) does not exist in the forked workers.
+    
+    Args:
+        local_upload: Simulator used when ABC_API_URL is not configured
+    """
+    global _worker
+    if _worker is None:
+        transport = HTTPABCClient(ABC_API_URL) if ABC_API_URL else LocalABCTransport(local_upload)
+        _worker = DeliveryWorker(transport)
+    _worker.start()
+    return _worker
+
+
+def wake_worker():
+    if _worker is not None:
+        _worker.wake()
@@ -5,89 +5,272 @@ Separate portal for students to check approval status of mentor-reviewed submiss
 
 from flask import Blueprint, request, jsonify, render_template, session, redirect, url_for
 import os
-import json
+import queue
+import atexit
 import hashlib
+import threading
 import bcrypt
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from datetime import datetime
 
+from serialization import dumps, loads
+from http_cache import file_validators, conditional_response, STATUS_CACHE_CONTROL
+
 abc_bp = Blueprint('abc', __name__, url_prefix='/abc', template_folder='templates/abc')
 
 DB_FOLDER = 'uploads/db'
 ABC_RECORDS_FILE = os.path.join(DB_FOLDER, 'abc_records.json')
 ABC_USERS_FILE = os.path.join(DB_FOLDER, 'abc_users.json')
 
+# bcrypt runs on a small dedicated pool; requests beyond the pool plus a
+# short queue are turned away instead of tying up every request worker
+BCRYPT_WORKERS = int(os.environ.get('BCRYPT_WORKERS', '2'))
+BCRYPT_MAX_PENDING = int(os.environ.get('BCRYPT_MAX_PENDING', '16'))
+BCRYPT_TIMEOUT = float(os.environ.get('BCRYPT_TIMEOUT', '10'))
+# Account provisioning hashes on its own pool so a batch never delays logins
+PROVISION_BCRYPT_WORKERS = int(os.environ.get('PROVISION_BCRYPT_WORKERS', '1'))
+
 # Ensure data files exist
 os.makedirs(DB_FOLDER, exist_ok=True)
 for file in [ABC_RECORDS_FILE, ABC_USERS_FILE]:
     if not os.path.exists(file):
-        with open(file, 'w') as f:
-            json.dump({}, f)
+        with open(file, 'wb') as f:
+            f.write(dumps({}))
 
 
 def load_abc_records():
     """Load ABC records from JSON"""
     try:
-        with open(ABC_RECORDS_FILE, 'r') as f:
-            return json.load(f)
+        with open(ABC_RECORDS_FILE, 'rb') as f:
+            return loads(f.read())
     except:
         return {}
 
 
 def save_abc_records(records):
     """Save ABC records to JSON"""
-    with open(ABC_RECORDS_FILE, 'w') as f:
-        json.dump(records, f, indent=2)
+    with open(ABC_RECORDS_FILE, 'wb') as f:
+        f.write(dumps(records))
+
+
+class LoginBusyError(Exception):
+    """Raised when the password hashing pool is saturated"""
+
+
+_bcrypt_pool = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix='bcrypt')
+_bcrypt_slots = threading.BoundedSemaphore(BCRYPT_WORKERS + BCRYPT_MAX_PENDING)
+_provision_pool = ThreadPoolExecutor(max_workers=PROVISION_BCRYPT_WORKERS, thread_name_prefix='bcrypt-provision')
+
+
+def run_bcrypt(func, *args):
+    """
+    Run a bcrypt call on the bounded hashing pool
+    
+    Raises:
+        LoginBusyError: if the pool and its queue are already full, or the
+            call does not finish within BCRYPT_TIMEOUT
+    """
+    if not _bcrypt_slots.acquire(blocking=False):
+        raise LoginBusyError('Password service busy, please retry')
+    try:
+        future = _bcrypt_pool.submit(func, *args)
+    except Exception:
+        _bcrypt_slots.release()
+        raise
+    future.add_done_callback(lambda _: _bcrypt_slots.release())
+    try:
+        return future.result(timeout=BCRYPT_TIMEOUT)
+    except FutureTimeoutError:
+        # Still queued: drop it; already running: its slot frees when it ends
+        future.cancel()
+        raise LoginBusyError('Password service busy, please retry')
+
+
+# In-memory user index, invalidated when abc_users.json changes on disk.
+# Shared between callers, so it is only handed out as a read-only view.
+_users_lock = threading.Lock()
+_users_cache = {'signature': None, 'users': MappingProxyType({})}
+
+
+def _users_file_signature():
+    try:
+        stat = os.stat(ABC_USERS_FILE)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
 
 
 def load_abc_users():
-    """Load ABC users from JSON"""
+    """
+    Load ABC users (served from the in-memory index while the file is unchanged)
+    
+    Returns:
+        Read-only mapping of apaar_id to account; copy it with dict() before editing
+    """
+    signature = _users_file_signature()
+    with _users_lock:
+        if signature is not None and signature == _users_cache['signature']:
+            return _users_cache['users']
+    
     try:
-        with open(ABC_USERS_FILE, 'r') as f:
-            return json.load(f)
+        with open(ABC_USERS_FILE, 'rb') as f:
+            users = loads(f.read())
     except:
-        return {}
+        return MappingProxyType({})
+    
+    users = MappingProxyType(users)
+    with _users_lock:
+        _users_cache['signature'] = signature
+        _users_cache['users'] = users
+    return users
 
 
 def save_abc_users(users):
-    """Save ABC users to JSON"""
-    with open(ABC_USERS_FILE, 'w') as f:
-        json.dump(users, f, indent=2)
+    """Save ABC users to JSON (atomic replace) and refresh the in-memory index"""
+    tmp_path = f"{ABC_USERS_FILE}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(dumps(dict(users)))
+    os.replace(tmp_path, ABC_USERS_FILE)
+    
+    with _users_lock:
+        _users_cache['signature'] = _users_file_signature()
+        _users_cache['users'] = MappingProxyType(dict(users))
+
+
+def _hash_password(password):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
 
 
 def create_student_account(apaar_id, name, email=''):
-    """Auto-create student account when submission approved"""
+    """Create a student account immediately (hashing on the provisioning pool)"""
+    provision_accounts([(apaar_id, name, email)])
+
+
+def provision_accounts(accounts):
+    """
+    Create accounts for (apaar_id, name, email) tuples in one users-file write
+    
+    Default password is the APAAR ID (demo behaviour).
+    """
     users = load_abc_users()
+    new_accounts = {}
     
-    # Check if user exists
-    if apaar_id in users:
+    for apaar_id, name, email in accounts:
+        if not apaar_id or apaar_id in users or apaar_id in new_accounts:
+            continue
+        new_accounts[apaar_id] = {
+            'apaar_id': apaar_id,
+            'name': name,
+            'email': email,
+            'password_hash': _provision_pool.submit(_hash_password, apaar_id),
+            'created_at': datetime.now().isoformat()
+        }
+    
+    if not new_accounts:
         return
     
-    # Generate default password (APAAR ID for demo)
-    default_password = apaar_id
-    hashed = bcrypt.hashpw(default_password.encode('utf-8'), bcrypt.gensalt())
+    for account in new_accounts.values():
+        account['password_hash'] = account['password_hash'].result()
     
-    users[apaar_id] = {
-        'apaar_id': apaar_id,
-        'name': name,
-        'email': email,
-        'password_hash': hashed.decode('utf-8'),
-        'created_at': datetime.now().isoformat()
-    }
+    with _provision_lock:
+        # Re-read under the lock so concurrent writers are not lost
+        users = dict(load_abc_users())
+        for apaar_id, account in new_accounts.items():
+            users.setdefault(apaar_id, account)
+        save_abc_users(users)
+
+
+# Deferred provisioning: approvals enqueue, a background thread creates accounts
+_provision_lock = threading.Lock()
+_provision_queue = queue.Queue()
+_pending_accounts = {}
+_pending_lock = threading.Lock()
+_provision_thread = None
+
+
+def enqueue_student_account(apaar_id, name, email=''):
+    """Queue account creation so the approval request does not wait on bcrypt"""
+    global _provision_thread
     
-    save_abc_users(users)
+    if not apaar_id or apaar_id in load_abc_users():
+        return
+    
+    with _pending_lock:
+        if apaar_id in _pending_accounts:
+            return
+        _pending_accounts[apaar_id] = threading.Event()
+        if _provision_thread is None or not _provision_thread.is_alive():
+            _provision_thread = threading.Thread(target=_provision_worker, daemon=True, name='abc-provisioning')
+            _provision_thread.start()
+    
+    _provision_queue.put((apaar_id, name, email))
 
 
-def verify_student_login(apaar_id, password):
-    """Verify student login credentials"""
-    users = load_abc_users()
+def _drain_provision_queue(block=True):
+    batch = []
+    try:
+        batch.append(_provision_queue.get(block=block, timeout=1 if block else None))
+        while len(batch) < 100:
+            batch.append(_provision_queue.get_nowait())
+    except queue.Empty:
+        pass
     
-    if apaar_id not in users:
+    if not batch:
         return False
     
-    user = users[apaar_id]
+    try:
+        provision_accounts(batch)
+    except Exception as e:
+        print(f"Account provisioning error: {e}")
+    finally:
+        with _pending_lock:
+            for apaar_id, _, _ in batch:
+                event = _pending_accounts.pop(apaar_id, None)
+                if event:
+                    event.set()
+    return True
+
+
+def _provision_worker():
+    while True:
+        _drain_provision_queue(block=True)
+
+
+def flush_provisioning():
+    """Create all queued accounts now (used at shutdown and in tests)"""
+    while _drain_provision_queue(block=False):
+        pass
+
+
+def wait_for_account(apaar_id, timeout=2.0):
+    """Wait briefly for a queued account; True if it is (now) provisioned"""
+    with _pending_lock:
+        event = _pending_accounts.get(apaar_id)
+    if event is not None:
+        event.wait(timeout)
+    return apaar_id in load_abc_users()
+
+
+atexit.register(flush_provisioning)
+
+
+def verify_student_login(apaar_id, password):
+    """
+    Verify student login credentials
+    
+    Raises:
+        LoginBusyError: if the hashing pool is saturated
+    """
+    user = load_abc_users().get(apaar_id)
+    if user is None:
+        if not wait_for_account(apaar_id):
+            return False
+        user = load_abc_users()[apaar_id]
+    
     stored_hash = user['password_hash'].encode('utf-8')
     
-    return bcrypt.checkpw(password.encode('utf-8'), stored_hash)
+    return run_bcrypt(bcrypt.checkpw, password.encode('utf-8'), stored_hash)
 
 
 def save_to_abc(internship_id, abc_token, internship_data, approval_data):
@@ -117,8 +300,8 @@ def save_to_abc(internship_id, abc_token, internship_data, approval_data):
     
     save_abc_records(records)
     
-    # Auto-create student account
-    create_student_account(
+    # Auto-create student account (deferred to the provisioning thread)
+    enqueue_student_account(
         internship_data.get('apaar_id', ''),
         internship_data.get('name', ''),
         internship_data.get('email', '')
@@ -151,7 +334,14 @@ def login():
             return render_template('abc/login.html', error='APAAR ID and password are required')
         
         # Verify credentials
-        if verify_student_login(apaar_id, password):
+        try:
+            valid = verify_student_login(apaar_id, password)
+        except LoginBusyError:
+            if request.is_json:
+                return jsonify({'success': False, 'error': 'Login service busy, please retry'}), 503, {'Retry-After': '2'}
+            return render_template('abc/login.html', error='Login service busy, please retry in a moment'), 503
+        
+        if valid:
             session['abc_student_id'] = apaar_id
             
             if request.is_json:
@@ -203,9 +393,7 @@ def dashboard():
                           submissions=student_submissions)
 
 
-@abc_bp.route('/api/status/<abc_token>')
-def get_status(abc_token):
-    """API endpoint to check status by ABC token"""
+def _find_status(abc_token):
     records = load_abc_records()
     
     # Find record by ABC token
@@ -217,6 +405,19 @@ def get_status(abc_token):
                 'data': record
             })
     
+    return '', 404
+
+
+@abc_bp.route('/api/status/<abc_token>')
+def get_status(abc_token):
+    """API endpoint to check status by ABC token"""
+    # Any change to the ABC records yields a new ETag; unchanged polls get a 304
+    validators = file_validators(ABC_RECORDS_FILE, abc_token)
+    if validators is not None:
+        response = conditional_response(validators, STATUS_CACHE_CONTROL, lambda: _find_status(abc_token))
+        if response.status_code != 404:
+            return response
+    
     return jsonify({
         'success': False,
         'status': 'not_found',
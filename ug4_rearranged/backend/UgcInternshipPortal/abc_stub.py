@@ -0,0 +1,121 @@
+"""
+Local ABC Registry Stand-in
+Small HTTP server speaking the ABC upload/status API, for tests and local runs
+"""
+
+import json
+import time
+import hashlib
+import threading
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class StubABCRegistry:
+    """
+    In-memory ABC registry served over HTTP
+    
+    Uploads are idempotent by Idempotency-Key. Failures and latency can be
+    injected to exercise retries.
+    """
+    
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self.submissions = {}
+        self.upload_calls = 0
+        self.fail_next = 0
+        self.latency = 0.0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+    
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def start(self) -> 'StubABCRegistry':
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True, name='abc-stub')
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc):
+        self.stop()
+    
+    def upload(self, payload, key):
+        with self._lock:
+            self.upload_calls += 1
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                return 503, {'error': 'Registry unavailable (injected)'}
+            
+            if key in self.submissions:
+                return 200, self.submissions[key]
+            
+            token = 'ABC-TOK-' + hashlib.sha256(key.encode()).hexdigest()[:12].upper()
+            response = {
+                'abc_token': token,
+                'status': 'accepted',
+                'message': 'Credit submission accepted (stub)',
+                'timestamp': datetime.now().isoformat()
+            }
+            self.submissions[key] = response
+            return 200, response
+    
+    def status(self, token):
+        with self._lock:
+            for response in self.submissions.values():
+                if response['abc_token'] == token:
+                    # Accepted submissions are processed by the time they are polled
+                    response['status'] = 'processed'
+                    return 200, {'abc_token': token, 'status': 'processed'}
+        return 404, {'error': 'Unknown token'}
+    
+    def _handler_class(self):
+        registry = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def _reply(self, code, body):
+                data = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'{}')
+                if registry.latency:
+                    time.sleep(registry.latency)
+                if self.path != '/api/abc/upload':
+                    return self._reply(404, {'error': 'Not found'})
+                key = self.headers.get('Idempotency-Key') or json.dumps(payload, sort_keys=True)
+                self._reply(*registry.upload(payload, key))
+            
+            def do_GET(self):
+                if not self.path.startswith('/api/abc/status/'):
+                    return self._reply(404, {'error': 'Not found'})
+                self._reply(*registry.status(self.path.rsplit('/', 1)[-1]))
+            
+            def log_message(self, format, *args):
+                pass
+        
+        return Handler
+
+
+if __name__ == '__main__':
+    import sys
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 5100
+    stub = StubABCRegistry(port=port)
+    print(f"Stub ABC registry on {stub.url} (set ABC_API_URL to use it)")
+    stub.server.serve_forever()
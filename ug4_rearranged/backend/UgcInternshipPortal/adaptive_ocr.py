@@ -0,0 +1,183 @@
+"""
+Adaptive OCR
+Cheap first pass over certificate images, escalating only while mandatory fields stay uncertain
+"""
+
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+# Fields and threshold that decide mentor review (see check_needs_review)
+MANDATORY_FIELDS = ['name', 'start_date', 'end_date']
+REVIEW_CONFIDENCE = 0.75
+
+# Longest side of the first pass image; an A4 scan at ~150 DPI
+OCR_FAST_MAX_SIDE = int(os.environ.get('OCR_FAST_MAX_SIDE', '1700'))
+# Page segmentation modes tried at full resolution when the default layout analysis fails
+OCR_ESCALATION_PSMS = [int(v) for v in os.environ.get('OCR_ESCALATION_PSMS', '6,11').split(',') if v.strip()]
+# Upscaling of the crops re-read in the region tier
+OCR_REGION_SCALE = 2
+
+TIER_FAST = 'fast'
+TIER_FULL = 'full'
+TIER_REGION = 'region'
+
+DATE_ANCHORS = ['from', 'to', 'till', 'until', 'date', 'dated', 'period', 'duration', 'since']
+_DATE_LIKE = re.compile(r'\d{1,4}\s*[/.-]\s*\d{1,2}|\b(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\b',
+                        re.IGNORECASE)
+
+
+def psm_tier(psm: int) -> str:
+    return f'psm{psm}'
+
+
+def weak_fields(result: Dict[str, Any], fields: List[str] = MANDATORY_FIELDS) -> List[str]:
+    """Mandatory fields (or the given ones) below the review threshold"""
+    return [field for field in fields
+            if result.get(field, {}).get('conf', 0.0) < REVIEW_CONFIDENCE]
+
+
+def merge_fields(result: Dict[str, Any], candidate: Dict[str, Any], tier: str) -> List[str]:
+    """
+    Take fields from a later tier where it is more confident
+    
+    Args:
+        result: Merged fields so far (updated in place)
+        candidate: Fields extracted from the tier's text
+        tier: Tier name recorded on the fields taken
+    
+    Returns:
+        Names of the fields taken from candidate
+    """
+    taken = []
+    for field, value in candidate.items():
+        if value.get('conf', 0.0) > result.get(field, {}).get('conf', 0.0):
+            result[field] = dict(value, ocr_tier=tier)
+            taken.append(field)
+    return taken
+
+
+def fast_image(img: Image.Image) -> Image.Image:
+    """Grayscale copy no larger than OCR_FAST_MAX_SIDE"""
+    small = ImageOps.grayscale(img)
+    if max(small.size) > OCR_FAST_MAX_SIDE:
+        small.thumbnail((OCR_FAST_MAX_SIDE, OCR_FAST_MAX_SIDE), Image.BILINEAR)
+    return small
+
+
+def _lines(words: Dict[str, List]) -> List[Tuple[str, Tuple[int, int, int, int]]]:
+    # image_to_data rows grouped into text lines with their bounding boxes
+    lines = {}
+    for i, text in enumerate(words.get('text', [])):
+        if not str(text).strip():
+            continue
+        key = (words['block_num'][i], words['par_num'][i], words['line_num'][i])
+        left, top = int(words['left'][i]), int(words['top'][i])
+        right, bottom = left + int(words['width'][i]), top + int(words['height'][i])
+        if key in lines:
+            pieces, (l, t, r, b) = lines[key]
+            pieces.append(str(text))
+            lines[key] = (pieces, (min(l, left), min(t, top), max(r, right), max(b, bottom)))
+        else:
+            lines[key] = ([str(text)], (left, top, right, bottom))
+    return [(' '.join(pieces), box) for pieces, box in lines.values()]
+
+
+def anchor_regions(words: Dict[str, List], fields: List[str], name_anchors: List[str],
+                   size: Tuple[int, int]) -> List[Tuple[int, int, int, int]]:
+    """
+    Page bands around the lines that should hold the given fields
+    
+    A band spans the page width from just above an anchor line to about two
+    lines below it, where the value usually sits. Overlapping bands are merged.
+    
+    Args:
+        words: pytesseract image_to_data output (dict form)
+        fields: Weak mandatory fields
+        name_anchors: Phrases that introduce the student name
+        size: Image size (width, height)
+    
+    Returns:
+        Crop boxes (left, top, right, bottom) from top to bottom
+    """
+    width, height = size
+    bands = []
+    for text, (left, top, right, bottom) in _lines(words):
+        lower = text.lower()
+        tokens = set(re.findall(r'[a-z]+', lower))
+        wanted = 'name' in fields and any(anchor in lower for anchor in name_anchors)
+        if any(f in fields for f in ('start_date', 'end_date')):
+            wanted = wanted or bool(tokens & set(DATE_ANCHORS)) or bool(_DATE_LIKE.search(text))
+        if not wanted:
+            continue
+        line_height = max(bottom - top, 1)
+        bands.append([max(0, top - line_height // 2), min(height, bottom + line_height * 2)])
+    
+    merged = []
+    for band in sorted(bands):
+        if merged and band[0] <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], band[1])
+        else:
+            merged.append(band)
+    return [(0, top, width, bottom) for top, bottom in merged]
+
+
+def adaptive_extract(img: Image.Image,
+                     ocr_text: Callable[..., str],
+                     ocr_words: Callable[..., Dict[str, List]],
+                     extract_text: Callable[[str], Dict[str, Any]],
+                     name_anchors: List[str],
+                     fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Extract fields from a certificate image, OCR'ing no harder than needed
+    
+    Tiers run in order until name, start_date and end_date all reach
+    REVIEW_CONFIDENCE: a downscaled grayscale pass, full resolution, the
+    alternative page segmentation modes, then a re-read of upscaled bands
+    around the anchor lines of the fields still missing. A full-page tier
+    that improves no field ends the full-page re-reads. Every field carries
+    the tier that produced it under 'ocr_tier'.
+    
+    Args:
+        img: Certificate image
+        ocr_text: OCR function, ocr_text(image, config=...) -> text
+        ocr_words: Word boxes, ocr_words(image, config=...) -> image_to_data dict
+        extract_text: Field extraction from text (FieldExtractor.extract_from_text)
+        name_anchors: Phrases that introduce the student name
+        fields: Mandatory fields extract_text can find at all (default
+            MANDATORY_FIELDS); OCR is not repeated for the others
+    
+    Returns:
+        Dictionary of fields with values, confidence scores and OCR tiers
+    """
+    fields = MANDATORY_FIELDS if fields is None else fields
+    img.load()
+    small = fast_image(img)
+    result = {field: dict(value, ocr_tier=TIER_FAST) for field, value in extract_text(ocr_text(small)).items()}
+    
+    tiers = []
+    if small.size != img.size:
+        tiers.append((TIER_FULL, img, ''))
+    tiers.extend((psm_tier(psm), img, f'--psm {psm}') for psm in OCR_ESCALATION_PSMS)
+    
+    for tier, image, config in tiers:
+        if not weak_fields(result, fields):
+            return result
+        if not merge_fields(result, extract_text(ocr_text(image, config=config)), tier):
+            break
+    
+    missing = weak_fields(result, fields)
+    if missing:
+        regions = anchor_regions(ocr_words(img), missing, name_anchors, img.size)
+        texts = []
+        for box in regions:
+            crop = ImageOps.grayscale(img.crop(box))
+            crop = crop.resize((crop.width * OCR_REGION_SCALE, crop.height * OCR_REGION_SCALE), Image.LANCZOS)
+            texts.append(ocr_text(crop, config='--psm 6'))
+        if texts:
+            candidate = extract_text('\n'.join(texts))
+            merge_fields(result, {field: candidate[field] for field in missing if field in candidate}, TIER_REGION)
+    
+    return result
@@ -0,0 +1,217 @@
+"""
+Submission Analytics
+Materialized counters by institution and day, updated as records change
+"""
+
+import os
+import sqlite3
+from typing import Dict, Any, Optional
+
+import record_store
+
+ANALYTICS_DB = os.path.join(record_store.DB_FOLDER, 'analytics.sqlite3')
+
+DECISIONS = {
+    'Equivalent': 'equivalent',
+    'Partially Equivalent': 'partially_equivalent',
+    'Not Equivalent': 'not_equivalent',
+}
+UNKNOWN_INSTITUTION = 'UNKNOWN'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS daily_stats (
+    institution_code TEXT NOT NULL,
+    day TEXT NOT NULL,
+    submissions INTEGER NOT NULL DEFAULT 0,
+    equivalent INTEGER NOT NULL DEFAULT 0,
+    partially_equivalent INTEGER NOT NULL DEFAULT 0,
+    not_equivalent INTEGER NOT NULL DEFAULT 0,
+    credits INTEGER NOT NULL DEFAULT 0,
+    needs_review INTEGER NOT NULL DEFAULT 0,
+    composite_sum REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (institution_code, day)
+);
+CREATE TABLE IF NOT EXISTS course_hits (
+    institution_code TEXT NOT NULL,
+    day TEXT NOT NULL,
+    course_id TEXT NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (institution_code, day, course_id)
+);
+'''
+
+_COUNTERS = ['submissions', 'equivalent', 'partially_equivalent', 'not_equivalent',
+             'credits', 'needs_review', 'composite_sum']
+
+
+def _connect() -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(ANALYTICS_DB) or '.', exist_ok=True)
+    conn = sqlite3.connect(ANALYTICS_DB, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def contribution(record: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    What one record adds to the counters
+    
+    Records are counted under their institution and submission day; the top
+    match counts as the record's matched course.
+    """
+    if not record:
+        return None
+    
+    form_data = record.get('form_data') or {}
+    counts = dict.fromkeys(_COUNTERS, 0)
+    counts['submissions'] = 1
+    decision = DECISIONS.get(record.get('decision'))
+    if decision:
+        counts[decision] = 1
+    counts['credits'] = int(record.get('credits') or 0)
+    counts['needs_review'] = 1 if record.get('needs_review') else 0
+    counts['composite_sum'] = float(record.get('wmd_composite') or 0.0)
+    
+    matches = record.get('wmd_matches') or []
+    return {
+        'institution_code': (form_data.get('institution_code') or '').strip().upper() or UNKNOWN_INSTITUTION,
+        'day': (record.get('timestamp') or '')[:10] or 'unknown',
+        'counts': counts,
+        'course_id': matches[0]['course_id'] if matches else None,
+    }
+
+
+def _apply(conn: sqlite3.Connection, contrib: Optional[Dict[str, Any]], sign: int):
+    if contrib is None:
+        return
+    key = (contrib['institution_code'], contrib['day'])
+    values = [sign * contrib['counts'][name] for name in _COUNTERS]
+    conn.execute(
+        f"INSERT INTO daily_stats (institution_code, day, {', '.join(_COUNTERS)}) "
+        f"VALUES (?, ?, {', '.join('?' * len(_COUNTERS))}) "
+        f"ON CONFLICT (institution_code, day) DO UPDATE SET "
+        + ', '.join(f"{name} = {name} + excluded.{name}" for name in _COUNTERS),
+        (*key, *values)
+    )
+    if contrib['course_id']:
+        conn.execute(
+            'INSERT INTO course_hits (institution_code, day, course_id, hits) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT (institution_code, day, course_id) DO UPDATE SET hits = hits + excluded.hits',
+            (*key, contrib['course_id'], sign)
+        )
+
+
+def record_updated(before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]):
+    """
+    Move the counters from a record's old state to its new state
+    
+    Args:
+        before: Record (or contribution()) before the change; None on submit
+        after: Record after the change; None on delete
+    """
+    old = before if before is None or 'counts' in before else contribution(before)
+    new = contribution(after)
+    if old == new:
+        return
+    
+    conn = _connect()
+    try:
+        with conn:
+            _apply(conn, old, -1)
+            _apply(conn, new, 1)
+    except sqlite3.Error as e:
+        # Counters are advisory; never fail the request over them
+        print(f"Analytics update error: {e}")
+    finally:
+        conn.close()
+
+
+def _summarize(row: sqlite3.Row) -> Dict[str, Any]:
+    submissions = row['submissions'] or 0
+    return {
+        'submissions': submissions,
+        'decisions': {label: row[column] or 0 for label, column in DECISIONS.items()},
+        'credits_awarded': row['credits'] or 0,
+        'needs_review_rate': round((row['needs_review'] or 0) / submissions, 3) if submissions else 0.0,
+        'avg_wmd_composite': round((row['composite_sum'] or 0.0) / submissions, 3) if submissions else 0.0,
+    }
+
+
+def get_summary(institution_code: Optional[str] = None, start_day: Optional[str] = None,
+                end_day: Optional[str] = None, top_n: int = 10) -> Dict[str, Any]:
+    """
+    Aggregate view over the counters (never reads individual records)
+    
+    Args:
+        institution_code: Restrict to one institution
+        start_day: First day included (YYYY-MM-DD)
+        end_day: Last day included (YYYY-MM-DD)
+        top_n: Number of top matched courses listed
+    
+    Returns:
+        Totals plus breakdowns by institution, by day and top matched courses
+    """
+    where, params = [], []
+    if institution_code:
+        where.append('institution_code = ?')
+        params.append(institution_code.strip().upper())
+    if start_day:
+        where.append('day >= ?')
+        params.append(start_day)
+    if end_day:
+        where.append('day <= ?')
+        params.append(end_day)
+    clause = f"WHERE {' AND '.join(where)}" if where else ''
+    sums = ', '.join(f"SUM({name}) AS {name}" for name in _COUNTERS)
+    
+    conn = _connect()
+    try:
+        total = conn.execute(f"SELECT {sums} FROM daily_stats {clause}", params).fetchone()
+        by_institution = conn.execute(
+            f"SELECT institution_code, {sums} FROM daily_stats {clause} "
+            f"GROUP BY institution_code HAVING SUM(submissions) > 0 ORDER BY institution_code", params
+        ).fetchall()
+        by_day = conn.execute(
+            f"SELECT day, {sums} FROM daily_stats {clause} GROUP BY day HAVING SUM(submissions) > 0 ORDER BY day",
+            params
+        ).fetchall()
+        top_courses = conn.execute(
+            f"SELECT course_id, SUM(hits) AS hits FROM course_hits {clause} "
+            f"GROUP BY course_id HAVING SUM(hits) > 0 ORDER BY hits DESC, course_id LIMIT ?", params + [top_n]
+        ).fetchall()
+    finally:
+        conn.close()
+    
+    return {
+        'totals': _summarize(total),
+        'by_institution': [{'institution_code': row['institution_code'], **_summarize(row)} for row in by_institution],
+        'by_day': [{'day': row['day'], **_summarize(row)} for row in by_day],
+        'top_courses': [{'course_id': row['course_id'], 'matches': row['hits']} for row in top_courses],
+    }
+
+
+def rebuild() -> int:
+    """
+    Recompute all counters from the stored records (one-off backfill)
+    
+    Returns:
+        Number of records counted
+    """
+    conn = _connect()
+    count = 0
+    try:
+        with conn:
+            conn.execute('DELETE FROM daily_stats')
+            conn.execute('DELETE FROM course_hits')
+            for summary in record_store.iter_record_summaries():
+                _apply(conn, contribution(record_store.load_record(summary['internship_id'])), 1)
+                count += 1
+    finally:
+        conn.close()
+    return count
+
+
+if __name__ == '__main__':
+    # Backfill counters for records created before analytics existed
+    print(f"Counted {rebuild()} records")
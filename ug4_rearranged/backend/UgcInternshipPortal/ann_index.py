@@ -0,0 +1,288 @@
+"""
+Approximate Nearest-Neighbour Course Retrieval
+Inverted-file (IVF) index over course vectors, used as a candidate stage before exact scoring
+"""
+
+import os
+import json
+import time
+import zlib
+import shutil
+import tempfile
+import numpy as np
+from typing import List, Dict, Set, Optional
+
+ANN_FORMAT_VERSION = 2
+ANN_ARRAYS = ('centroids', 'list_indptr', 'list_members')
+
+# Dimension of the hashed bag-of-words part of retrieval vectors
+HASH_DIM = 256
+
+
+def hashed_bow(word_sets: List[Set[str]], dim: int = HASH_DIM) -> np.ndarray:
+    """
+    L2-normalized hashed bag-of-words vectors
+    
+    crc32 is used instead of hash() so vectors are stable across processes
+    (persisted indexes are reused by every worker).
+    """
+    vectors = np.zeros((len(word_sets), dim), dtype=np.float32)
+    for row, words in enumerate(word_sets):
+        for word in words:
+            vectors[row, zlib.crc32(word.encode('utf-8')) % dim] += 1.0
+    return normalize_rows(vectors)
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length (zero rows stay zero)"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0).astype(np.float32)
+
+
+def retrieval_vectors(semantic: np.ndarray, word_sets: List[Set[str]]) -> np.ndarray:
+    """
+    Vectors whose inner product approximates the exact similarity score
+    
+    Semantic (spaCy) and lexical (hashed word) parts are weighted 0.7/0.3
+    like WMDMatcher.calculate_similarity; without spaCy only the lexical part is used.
+    """
+    lexical = hashed_bow(word_sets)
+    if not semantic.size:
+        return lexical
+    return np.hstack([np.sqrt(0.7) * normalize_rows(semantic), np.sqrt(0.3) * lexical]).astype(np.float32)
+
+
+class IVFIndex:
+    """Spherical k-means inverted file over unit-length course vectors"""
+    
+    def __init__(self, centroids: np.ndarray, list_indptr: np.ndarray, list_members: np.ndarray, meta: Dict):
+        self.centroids = centroids
+        self.list_indptr = list_indptr
+        self.list_members = list_members
+        self.meta = meta
+    
+    @property
+    def n_lists(self) -> int:
+        return self.centroids.shape[0]
+    
+    @classmethod
+    def build(cls, vectors: np.ndarray, n_lists: Optional[int] = None, n_iter: int = 15,
+              seed: int = 0) -> 'IVFIndex':
+        """
+        Cluster course vectors into inverted lists
+        
+        Args:
+            vectors: M x D course retrieval vectors
+            n_lists: Number of clusters (defaults to ~sqrt(M))
+            n_iter: k-means iterations
+            seed: Random seed for reproducible indexes
+        """
+        data = normalize_rows(np.asarray(vectors, dtype=np.float32))
+        count = data.shape[0]
+        n_lists = max(1, min(n_lists or int(np.sqrt(count)), count))
+        rng = np.random.default_rng(seed)
+        
+        centroids = data[rng.choice(count, n_lists, replace=False)].copy()
+        assign = np.zeros(count, dtype=np.int64)
+        for _ in range(n_iter):
+            assign = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, data)
+            sizes = np.bincount(assign, minlength=n_lists)
+            # Re-seed empty clusters with random points
+            empty = np.flatnonzero(sizes == 0)
+            if empty.size:
+                sums[empty] = data[rng.choice(count, empty.size, replace=False)]
+            centroids = normalize_rows(sums)
+        
+        order = np.argsort(assign, kind='stable')
+        sizes = np.bincount(assign, minlength=n_lists)
+        list_indptr = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(sizes, out=list_indptr[1:])
+        
+        meta = {
+            'format_version': ANN_FORMAT_VERSION,
+            'count': int(count),
+            'dim': int(data.shape[1]),
+            'n_lists': int(n_lists),
+        }
+        return cls(centroids.astype(np.float32), list_indptr, order.astype(np.int64), meta)
+    
+    def search(self, queries: np.ndarray, n_probe: int = 8) -> List[np.ndarray]:
+        """
+        Candidate course positions for each query
+        
+        Args:
+            queries: N x D query retrieval vectors
+            n_probe: Number of closest lists scanned per query
+        
+        Returns:
+            Sorted array of candidate course positions per query
+        """
+        queries = normalize_rows(np.asarray(queries, dtype=np.float32))
+        n_probe = max(1, min(n_probe, self.n_lists))
+        sims = queries @ np.asarray(self.centroids).T
+        if n_probe < self.n_lists:
+            probes = np.argpartition(-sims, n_probe - 1, axis=1)[:, :n_probe]
+        else:
+            probes = np.tile(np.arange(self.n_lists), (queries.shape[0], 1))
+        
+        results = []
+        for row in probes:
+            parts = [self.list_members[self.list_indptr[l]:self.list_indptr[l + 1]] for l in row]
+            results.append(np.unique(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.int64))
+        return results
+    
+    def save(self, folder: str):
+        """
+        Persist as .npy arrays plus a JSON header
+        
+        Everything is written to a temporary folder that is renamed into
+        place, so a loading worker never mixes arrays of two generations.
+        The header records each file's size and mtime for load() to check.
+        """
+        parent = os.path.dirname(os.path.abspath(folder))
+        os.makedirs(parent, exist_ok=True)
+        tmp_folder = tempfile.mkdtemp(prefix=os.path.basename(folder.rstrip(os.sep)) + '.tmp-', dir=parent)
+        try:
+            files = {}
+            for name in ANN_ARRAYS:
+                path = os.path.join(tmp_folder, f'{name}.npy')
+                np.save(path, getattr(self, name))
+                stat = os.stat(path)
+                files[name] = {'bytes': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+            with open(os.path.join(tmp_folder, 'ann.json'), 'w') as f:
+                json.dump({**self.meta, 'files': files}, f, indent=2)
+        except Exception:
+            shutil.rmtree(tmp_folder, ignore_errors=True)
+            raise
+        
+        if os.path.exists(folder):
+            # Workers mapping the old arrays keep their pages after the unlink
+            stale_folder = f"{tmp_folder}.stale"
+            try:
+                os.rename(folder, stale_folder)
+                shutil.rmtree(stale_folder, ignore_errors=True)
+            except OSError:
+                pass
+        
+        try:
+            os.rename(tmp_folder, folder)
+        except OSError:
+            # Another writer swapped in its copy first
+            shutil.rmtree(tmp_folder, ignore_errors=True)
+    
+    @classmethod
+    def load(cls, folder: str, mmap: bool = True) -> Optional['IVFIndex']:
+        """Load a persisted index (memory-mapped by default); None if absent, incompatible or corrupt"""
+        header = os.path.join(folder, 'ann.json')
+        if not os.path.exists(header):
+            return None
+        
+        mode = 'r' if mmap else None
+        try:
+            with open(header, 'r') as f:
+                meta = json.load(f)
+            if meta.get('format_version') != ANN_FORMAT_VERSION:
+                return None
+            files = meta.pop('files')
+            arrays = {}
+            for name in ANN_ARRAYS:
+                path = os.path.join(folder, f'{name}.npy')
+                stat = os.stat(path)
+                if (stat.st_size, stat.st_mtime_ns) != (files[name]['bytes'], files[name]['mtime_ns']):
+                    raise ValueError(f"{name}: modified after saving")
+                arrays[name] = np.load(path, mmap_mode=mode)
+            
+            index = cls(arrays['centroids'], arrays['list_indptr'], arrays['list_members'], meta)
+            if (index.centroids.shape != (meta['n_lists'], meta['dim'])
+                    or len(index.list_indptr) != meta['n_lists'] + 1
+                    or len(index.list_members) != meta['count']
+                    or int(index.list_indptr[-1]) != meta['count']):
+                raise ValueError("array shapes do not match the header")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"ANN index load error ({folder}): {e}")
+            return None
+        return index
+
+
+def evaluate_recall(matcher, queries: List[List[str]], n_probes=(1, 2, 4, 8, 16),
+                    threshold: float = 0.3, top_k: int = 10) -> List[Dict]:
+    """
+    Recall-vs-latency of ANN candidates against the exact scorer
+    
+    Recall is the share of the exact top-k matches (above threshold) that
+    the candidate stage keeps.
+    
+    Args:
+        matcher: WMDMatcher whose course_index has an ANN index built
+        queries: CEESCM token lists
+        n_probes: Probe counts to evaluate
+        threshold: Similarity threshold passed to find_matches
+        top_k: Number of exact matches checked per query
+    
+    Returns:
+        One row per probe count (plus an 'exact' baseline row)
+    """
+    index = matcher.course_index
+    if index.ann is None:
+        raise ValueError("Course index has no ANN stage built")
+    
+    start = time.perf_counter()
+    exact = [matcher.find_matches(tokens, threshold, use_ann=False)[:top_k] for tokens in queries]
+    exact_ms = (time.perf_counter() - start) * 1000 / max(len(queries), 1)
+    
+    rows = [{'n_probe': 'exact', 'recall': 1.0, 'ms_per_query': round(exact_ms, 3), 'candidates': len(index)}]
+    for n_probe in n_probes:
+        start = time.perf_counter()
+        approx = [matcher.find_matches(tokens, threshold, n_probe=n_probe)[:top_k] for tokens in queries]
+        ann_ms = (time.perf_counter() - start) * 1000 / max(len(queries), 1)
+        
+        found = total = 0
+        for exact_matches, approx_matches in zip(exact, approx):
+            wanted = {m['course_id'] for m in exact_matches}
+            found += len(wanted & {m['course_id'] for m in approx_matches})
+            total += len(wanted)
+        
+        candidates = index.candidate_positions([' '.join(t) for t in queries], n_probe)
+        rows.append({
+            'n_probe': n_probe,
+            'recall': round(found / total, 4) if total else 1.0,
+            'ms_per_query': round(ann_ms, 3),
+            'candidates': round(float(np.mean([len(c) for c in candidates])), 1),
+        })
+    return rows
+
+
+if __name__ == '__main__':
+    # Recall/latency report on a synthetic catalogue
+    import sys
+    from course_index import CourseIndex
+    from wmd_matcher import WMDMatcher, nlp
+    
+    n_courses = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rng = np.random.default_rng(0)
+    topics = [[f"topic{t}term{w}" for w in range(40)] for t in range(200)]
+    shared = [f"common{w}" for w in range(300)]
+    
+    def sample_words(topic, count):
+        words = list(rng.choice(topics[topic], count // 2)) + list(rng.choice(shared, count - count // 2))
+        return [str(w) for w in words]
+    
+    catalogue = {}
+    for c in range(n_courses):
+        topic = int(rng.integers(len(topics)))
+        catalogue[f"C{c:06d}"] = {
+            'title': f"Course {c}",
+            'keywords': sample_words(topic, 12),
+            'description': ' '.join(sample_words(topic, 20)),
+        }
+    queries = [sample_words(int(rng.integers(len(topics))), 30) for _ in range(50)]
+    
+    course_index = CourseIndex(catalogue, nlp, ann_min_courses=0)
+    matcher = WMDMatcher(curriculum_db=catalogue, course_index=course_index)
+    
+    print(f"{n_courses} courses, {course_index.ann.n_lists} lists, {len(queries)} queries")
+    print(f"{'n_probe':>8} {'recall':>8} {'ms/query':>10} {'candidates':>11}")
+    for row in evaluate_recall(matcher, queries, threshold=0.05):
+        print(f"{row['n_probe']:>8} {row['recall']:>8} {row['ms_per_query']:>10} {row['candidates']:>11}")
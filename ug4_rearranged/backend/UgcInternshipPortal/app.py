@@ -3,7 +3,7 @@ UGC Internship Credit Portal - Main Flask Application
 Full-stack demo with certificate auto-extraction and credit matching
 """
 
-from flask import Flask, request, jsonify, render_template, session, redirect, url_for, send_file
+from flask import Flask, Response, request, jsonify, render_template, session, redirect, url_for, stream_with_context
 from werkzeug.utils import secure_filename
 import os
 import json
@@ -13,9 +13,23 @@ import uuid
 
 from extractor import extract_from_file, extract_from_text
 from ceescm import get_sample_ceescm_tokens
-from wmd_matcher import match_internship, WMDMatcher
+from wmd_matcher import match_internship, rematch_with_overrides
+from curriculum_store import get_curriculum_store
 from report_generator import generate_pdf_report
-from abc_portal import abc_bp, save_to_abc
+from abc_portal import abc_bp
+from assets import assets_bp, asset_url
+import file_serving
+from file_serving import files_bp, signed_url, serve_file
+from thumbnails import get_thumbnail, pregenerate as pregenerate_thumbnails
+from abc_outbox import save_record_with_outbox, start_delivery_worker, outbox_status, purge as purge_outbox
+import record_store
+from audit_log import record_change, append_events, query_events, DEFAULT_PAGE_SIZE
+import analytics
+import duplicate_index
+from export import FORMATS as EXPORT_FORMATS, export_stream, export_filename
+from nlp_cache import nlp_cache_stats, cache_owner, purge_owners
+from http_cache import (file_validators, conditional_response, RenderedCache, RESULT_CACHE_CONTROL,
+                        RECORD_CACHE_CONTROL, UPLOAD_CACHE_CONTROL)
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('SESSION_SECRET', 'dev-secret-key-change-in-production')
@@ -23,10 +37,17 @@ app.secret_key = os.environ.get('SESSION_SECRET', 'dev-secret-key-change-in-prod
 # Register ABC Portal Blueprint
 app.register_blueprint(abc_bp)
 
+# Fingerprinted static assets (built offline by assets.py)
+app.register_blueprint(assets_bp)
+app.add_template_global(asset_url)
+
+# Signed certificate/report downloads
+app.register_blueprint(files_bp)
+
 # Configuration
-UPLOAD_FOLDER = 'uploads/files'
-DB_FOLDER = 'uploads/db'
-REPORTS_FOLDER = 'uploads/reports'
+UPLOAD_FOLDER = file_serving.UPLOAD_FOLDER
+DB_FOLDER = record_store.DB_FOLDER
+REPORTS_FOLDER = file_serving.REPORTS_FOLDER
 ALLOWED_EXTENSIONS = {'txt', 'pdf', 'png', 'jpg', 'jpeg', 'docx'}
 
 # Ensure directories exist
@@ -37,6 +58,26 @@ for folder in [UPLOAD_FOLDER, DB_FOLDER, REPORTS_FOLDER]:
 MENTOR_USERNAME = 'mentor'
 MENTOR_PASSWORD = 'mentorpass'
 
+# Rendered result pages, reused until the record changes
+result_pages = RenderedCache()
+
+# Upload metadata left out of the student-facing upload API
+UPLOAD_PRIVATE_FIELDS = ('phash', 'near_duplicates')
+# Record fields left out of the (unauthenticated) record API
+RECORD_PRIVATE_FIELDS = ('near_duplicates', 'match_state')
+
+
+@app.before_request
+def start_background_workers():
+    """
+    Deliver queued approvals in the background (simulator unless ABC_API_URL is set)
+    
+    Started by the first request of each process rather than at import, so
+    workers forked from a preloaded app each run their own thread.
+    """
+    if not app.testing:
+        start_delivery_worker(push_to_abc_simulator)
+
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
@@ -105,32 +146,43 @@ def mentor_dashboard():
     if 'mentor_logged_in' not in session or not session['mentor_logged_in']:
         return redirect(url_for('mentor_page'))
     
-    # Load submissions that need review
-    submissions = []
-    for filename in os.listdir(DB_FOLDER):
-        if filename.endswith('.json'):
-            with open(os.path.join(DB_FOLDER, filename), 'r') as f:
-                data = json.load(f)
-                if data.get('needs_review', False):
-                    submissions.append(data)
+    # Load submissions that need review (summaries: large fields stay encoded)
+    submissions = [data for data in record_store.iter_record_summaries() if data.get('needs_review', False)]
     
     # Sort by timestamp descending
     submissions.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
     
-    return render_template('mentor_dashboard.html', submissions=submissions)
+    # Render certificate previews of submissions no mentor has opened yet
+    # (older records without upload_file look it up in the upload metadata)
+    pending = [sub for sub in submissions if (sub.get('last_change') or {}).get('action') != 'mentor_review']
+    upload_files = [sub.get('upload_file') or _upload_file(sub.get('upload_id')) for sub in pending]
+    pregenerate_thumbnails([path for path in upload_files if path])
+    
+    # Aggregate panel reads the materialized counters only
+    summary = analytics.get_summary(top_n=5)
+    
+    return render_template('mentor_dashboard.html', submissions=submissions, analytics=summary)
 
 
 @app.route('/result/<internship_id>')
 def result_page(internship_id):
-    """Student result page"""
-    filepath = os.path.join(DB_FOLDER, f"{internship_id}.json")
-    if not os.path.exists(filepath):
+    """Student result page (revalidated by ETag; rendered once per record version)"""
+    validators = file_validators(record_store.record_file(internship_id))
+    if validators is None:
         return "Internship not found", 404
+    etag = validators[0]
     
-    with open(filepath, 'r') as f:
-        data = json.load(f)
+    def render():
+        page = result_pages.get(internship_id, etag)
+        if page is None:
+            data = record_store.load_record(internship_id)
+            if data is None:
+                return "Internship not found", 404
+            page = render_template('result.html', data=data, internship_id=internship_id)
+            result_pages.put(internship_id, etag, page)
+        return page
     
-    return render_template('result.html', data=data, internship_id=internship_id)
+    return conditional_response(validators, RESULT_CACHE_CONTROL, render)
 
 
 # ============ API ENDPOINTS ============
@@ -159,8 +211,12 @@ def upload_certificate():
                 filepath = os.path.join(UPLOAD_FOLDER, filename)
                 file.save(filepath)
                 
-                # Extract fields from file
-                extracted_fields = extract_from_file(filepath)
+                # Extract fields from file (parses are tagged for deletion)
+                with cache_owner(upload_id):
+                    extracted_fields = extract_from_file(filepath)
+                
+                # Earlier uploads of the same (or a lightly edited) certificate
+                duplicates = duplicate_index.index_upload(upload_id, filepath, extracted_fields)
                 
                 # Store metadata
                 metadata = {
@@ -168,13 +224,16 @@ def upload_certificate():
                     'filename': filename,
                     'filepath': filepath,
                     'timestamp': timestamp,
-                    'extracted_fields': extracted_fields
+                    'extracted_fields': extracted_fields,
+                    'phash': duplicates['phash'],
+                    'near_duplicates': duplicates['near_duplicates']
                 }
         
         elif request.is_json and 'text' in request.json:
             # Text paste
             text = request.json['text']
-            extracted_fields = extract_from_text(text)
+            with cache_owner(upload_id):
+                extracted_fields = extract_from_text(text)
             
             # Store text
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -195,9 +254,7 @@ def upload_certificate():
             return jsonify({'error': 'No file or text provided'}), 400
         
         # Save metadata
-        metadata_path = os.path.join(DB_FOLDER, f"{upload_id}_upload.json")
-        with open(metadata_path, 'w') as f:
-            json.dump(metadata, f, indent=2)
+        record_store.save_upload(metadata)
         
         return jsonify({
             'upload_id': upload_id,
@@ -212,15 +269,39 @@ def upload_certificate():
 @app.route('/api/upload/<upload_id>', methods=['GET'])
 def get_upload(upload_id):
     """Get upload metadata and extracted fields"""
-    metadata_path = os.path.join(DB_FOLDER, f"{upload_id}_upload.json")
-    
-    if not os.path.exists(metadata_path):
+    validators = file_validators(record_store.upload_path(upload_id))
+    if validators is None:
         return jsonify({'error': 'Upload not found'}), 404
     
-    with open(metadata_path, 'r') as f:
-        metadata = json.load(f)
+    def build():
+        metadata = record_store.load_upload(upload_id)
+        if metadata is None:
+            return jsonify({'error': 'Upload not found'}), 404
+        # Duplicate checks are for mentors (they reach them through the record)
+        return jsonify({key: value for key, value in metadata.items() if key not in UPLOAD_PRIVATE_FIELDS})
+    
+    return conditional_response(validators, UPLOAD_CACHE_CONTROL, build)
+
+
+def _upload_file(upload_id):
+    """Stored file of an upload (None for missing uploads)"""
+    metadata = record_store.load_upload(upload_id) if upload_id else None
+    return metadata.get('filepath') if metadata else None
+
+
+@app.route('/api/upload/<upload_id>/thumbnail', methods=['GET'])
+def get_upload_thumbnail(upload_id):
+    """Small preview of the certificate's first page (mentor only)"""
+    if 'mentor_logged_in' not in session or not session['mentor_logged_in']:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    path = _upload_file(upload_id)
+    thumbnail = get_thumbnail(path) if path else None
+    if thumbnail is None:
+        return jsonify({'error': 'Thumbnail not available'}), 404
     
-    return jsonify(metadata)
+    # Uploads never change, so neither does their preview
+    return serve_file(thumbnail, max_age=31536000)
 
 
 @app.route('/api/submit_internship', methods=['POST'])
@@ -253,11 +334,14 @@ def submit_internship():
         # Get field confidences if available
         field_confidences = data.get('field_confidences', {})
         
-        # CEESCM Tokenization
-        ceescm_tokens = get_sample_ceescm_tokens(form_data)
-        
-        # WMD Matching
-        matches, wmd_composite, decision = match_internship(ceescm_tokens)
+        with cache_owner(internship_id):
+            # CEESCM Tokenization
+            ceescm_tokens = get_sample_ceescm_tokens(form_data)
+            
+            # WMD Matching (against the institution's current catalogue snapshot)
+            matcher = get_curriculum_store(form_data['institution_code']).matcher()
+            matches, wmd_composite, decision = match_internship(ceescm_tokens, matcher)
+            match_state = matcher.match_state(ceescm_tokens)
         
         # Calculate credits based on hours and decision
         hours = int(form_data.get('hours', 0)) if form_data.get('hours') else 0
@@ -277,13 +361,19 @@ def submit_internship():
         # Check if needs review
         needs_review = check_needs_review(field_confidences, wmd_composite)
         
+        # A certificate that was uploaded before always goes to a mentor
+        upload = record_store.load_upload(data['upload_id']) if data.get('upload_id') else None
+        near_duplicates = (upload or {}).get('near_duplicates') or []
+        if near_duplicates:
+            needs_review = True
+        
         # Determine auto-push to ABC
         auto_push = False
-        abc_token = None
         abc_status = None
+        abc_payload = None
         
         if decision == 'Equivalent' and eligible and not needs_review:
-            # Auto push to ABC simulator
+            # Auto push to ABC (queued; delivered by the outbox worker)
             min_conf = min(get_all_confidences(field_confidences)) if field_confidences else 1.0
             if min_conf >= 0.75:
                 abc_payload = {
@@ -293,12 +383,10 @@ def submit_internship():
                     'internship_id': internship_id,
                     'timestamp': timestamp
                 }
-                abc_response = push_to_abc_simulator(abc_payload)
-                abc_token = abc_response['abc_token']
-                abc_status = abc_response['status']
+                abc_status = 'queued'
                 auto_push = True
                 
-                # Save to ABC Portal for student access
+                # Saved to ABC Portal for student access once delivered
                 approval_data = {
                     'credits': credits,
                     'top_match': matches[0]['course_id'] if matches else 'Unknown',
@@ -307,7 +395,6 @@ def submit_internship():
                     'report_path': f'uploads/reports/{internship_id}.pdf',
                     'notes': 'Automatically approved - high confidence submission'
                 }
-                save_to_abc(internship_id, abc_token, form_data, approval_data)
         
         # Create internship record
         record = {
@@ -316,29 +403,30 @@ def submit_internship():
             'form_data': form_data,
             'field_confidences': field_confidences,
             'upload_id': data.get('upload_id', ''),
+            'upload_file': (upload or {}).get('filepath'),
             'ceescm_tokens': ceescm_tokens,
             'wmd_matches': matches,
             'wmd_composite': wmd_composite,
+            'catalogue_version': matcher.catalogue_version,
+            'match_state': match_state,
             'decision': decision,
             'credits': credits,
             'eligible': eligible,
             'needs_review': needs_review,
+            'near_duplicates': near_duplicates,
             'auto_push': auto_push,
-            'abc_token': abc_token,
+            'abc_token': None,
             'abc_status': abc_status,
-            'changelog': [
-                {
-                    'timestamp': timestamp,
-                    'action': 'created',
-                    'by': 'student'
-                }
-            ]
         }
         
-        # Save record
-        record_path = os.path.join(DB_FOLDER, f"{internship_id}.json")
-        with open(record_path, 'w') as f:
-            json.dump(record, f, indent=2)
+        # Save record (and its ABC delivery, atomically); the audit entry
+        # commits only once the record is saved
+        with record_change(record, 'created', 'student'):
+            if abc_payload:
+                save_record_with_outbox(record, abc_payload, approval_data)
+            else:
+                record_store.save_record(record)
+        analytics.record_updated(None, record)
         
         # Generate PDF report
         generate_pdf_report(record, os.path.join(REPORTS_FOLDER, f"{internship_id}.pdf"))
@@ -348,7 +436,8 @@ def submit_internship():
             'decision': decision,
             'credits': credits,
             'needs_review': needs_review,
-            'abc_token': abc_token,
+            'abc_token': None,
+            'abc_status': abc_status,
             'redirect_url': f'/result/{internship_id}'
         })
     
@@ -357,20 +446,53 @@ def submit_internship():
         return jsonify({'error': str(e)}), 500
 
 
+def _flag(name):
+    return request.args.get(name, '').lower() in ('1', 'true', 'yes')
+
+
 @app.route('/api/internship/<internship_id>', methods=['GET'])
 def get_internship(internship_id):
-    """Get internship record with full audit trail"""
-    record_path = os.path.join(DB_FOLDER, f"{internship_id}.json")
+    """
+    Get internship record
+    Query: include_trail=1 adds the first page of the audit trail as 'changelog'
+    """
+    if not _flag('include_trail'):
+        validators = file_validators(record_store.record_file(internship_id))
+        if validators is None:
+            return jsonify({'error': 'Internship not found'}), 404
+        
+        def build():
+            record_json = record_store.load_record_json(internship_id, exclude=['changelog', *RECORD_PRIVATE_FIELDS])
+            if record_json is None:
+                return jsonify({'error': 'Internship not found'}), 404
+            return Response(record_json, mimetype='application/json')
+        
+        return conditional_response(validators, RECORD_CACHE_CONTROL, build)
     
-    if not os.path.exists(record_path):
+    record = record_store.load_record(internship_id)
+    if record is None:
         return jsonify({'error': 'Internship not found'}), 404
+    for field in RECORD_PRIVATE_FIELDS:
+        record.pop(field, None)
     
-    with open(record_path, 'r') as f:
-        record = json.load(f)
-    
+    # Records not yet migrated still carry an embedded changelog
+    entries, next_cursor = query_events(internship_id, limit=request.args.get('limit', DEFAULT_PAGE_SIZE, type=int))
+    record['changelog'] = record.get('changelog', []) + entries
+    record['changelog_next_cursor'] = next_cursor
     return jsonify(record)
 
 
+@app.route('/api/internship/<internship_id>/audit', methods=['GET'])
+def get_internship_audit(internship_id):
+    """Paginated audit trail (query: cursor, limit)"""
+    entries, next_cursor = query_events(
+        internship_id,
+        cursor=request.args.get('cursor', 0, type=int),
+        limit=request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    )
+    return jsonify({'internship_id': internship_id, 'entries': entries, 'next_cursor': next_cursor})
+
+
 @app.route('/api/mentor/login', methods=['POST'])
 def mentor_login():
     """Mentor login"""
@@ -404,82 +526,103 @@ def mentor_run_and_push():
         custom_keywords = data.get('custom_keywords', [])
         push_to_abc = data.get('push_to_abc', False)
         
-        # Load record
-        record_path = os.path.join(DB_FOLDER, f"{internship_id}.json")
-        with open(record_path, 'r') as f:
-            record = json.load(f)
-        
-        # Add custom keywords to matcher if provided
-        if custom_keywords:
-            matcher = WMDMatcher()
-            # Add keywords to relevant courses
-            for match in record.get('wmd_matches', []):
-                matcher.add_custom_keywords(match['course_id'], custom_keywords)
+        # Hold the record lock until it is saved (the delivery worker updates records too)
+        with record_store.record_lock(internship_id):
+            # Load record
+            record = record_store.load_record(internship_id)
+            if record is None:
+                return jsonify({'error': 'Internship not found'}), 404
+            counted_before = analytics.contribution(record)
             
-            # Re-run matching
-            ceescm_tokens = record['ceescm_tokens'] + custom_keywords
-            matches, wmd_composite, decision = match_internship(ceescm_tokens)
-            
-            # Update record
-            record['wmd_matches'] = matches
-            record['wmd_composite'] = wmd_composite
-            record['decision'] = decision
-            record['needs_review'] = False
+            # Mentor keywords are overrides on this record only, applied at scoring
+            # time; the shared catalogue (and other submissions) stay as they are
+            if custom_keywords:
+                matcher = get_curriculum_store(record['form_data'].get('institution_code')).matcher()
+                relevant_courses = [match['course_id'] for match in record.get('wmd_matches', [])]
+                
+                # Keywords of earlier reviews of this record still apply
+                added = list(record.get('custom_keywords') or [])
+                added.extend(keyword for keyword in custom_keywords if keyword not in added)
+                overrides = {course_id: list(keywords)
+                             for course_id, keywords in (record.get('keyword_overrides') or {}).items()}
+                for course_id in relevant_courses:
+                    keywords = overrides.setdefault(course_id, [])
+                    keywords.extend(keyword for keyword in custom_keywords if keyword not in keywords)
+                
+                with cache_owner(internship_id):
+                    # Rescore only the keyword delta against the stored match state
+                    result = rematch_with_overrides(record.get('match_state'), record['ceescm_tokens'],
+                                                    added, overrides, matcher)
+                    if result is None:
+                        # No state, or the catalogue changed since submission: full re-run
+                        record['match_state'] = matcher.match_state(record['ceescm_tokens'])
+                        
+                        # Add keywords to their courses (this request's matcher only)
+                        for course_id, keywords in overrides.items():
+                            matcher.add_custom_keywords(course_id, keywords)
+                        
+                        # Re-run matching
+                        result = match_internship(record['ceescm_tokens'] + added, matcher)
+                    matches, wmd_composite, decision = result
+                
+                record['custom_keywords'] = added
+                record['keyword_overrides'] = overrides
+                
+                # Update record
+                record['wmd_matches'] = matches
+                record['wmd_composite'] = wmd_composite
+                record['catalogue_version'] = matcher.catalogue_version
+                record['decision'] = decision
+                record['needs_review'] = False
+                
+                # Recalculate credits
+                hours = int(record['form_data'].get('hours', 0)) if record['form_data'].get('hours') else 0
+                if decision == 'Equivalent':
+                    record['credits'] = min(hours // 40, 4)
+                    record['eligible'] = True
+                elif decision == 'Partially Equivalent':
+                    record['credits'] = min(hours // 60, 2)
+                    record['eligible'] = False
+                else:
+                    record['credits'] = 0
+                    record['eligible'] = False
             
-            # Recalculate credits
-            hours = int(record['form_data'].get('hours', 0)) if record['form_data'].get('hours') else 0
-            if decision == 'Equivalent':
-                record['credits'] = min(hours // 40, 4)
-                record['eligible'] = True
-            elif decision == 'Partially Equivalent':
-                record['credits'] = min(hours // 60, 2)
-                record['eligible'] = False
-            else:
-                record['credits'] = 0
-                record['eligible'] = False
-        
-        # Push to ABC if requested
-        if push_to_abc:
-            abc_payload = {
-                'student_name': record['form_data']['name'],
-                'apaar_id': record['form_data']['apaar_id'],
-                'credits': record['credits'],
-                'internship_id': internship_id,
-                'timestamp': datetime.now().isoformat()
-            }
-            abc_response = push_to_abc_simulator(abc_payload)
-            record['abc_token'] = abc_response['abc_token']
-            record['abc_status'] = abc_response['status']
-            record['auto_push'] = False
-            record['needs_review'] = False
+            # Queue push to ABC if requested
+            abc_payload = None
+            if push_to_abc:
+                abc_payload = {
+                    'student_name': record['form_data']['name'],
+                    'apaar_id': record['form_data']['apaar_id'],
+                    'credits': record['credits'],
+                    'internship_id': internship_id,
+                    'timestamp': datetime.now().isoformat()
+                }
+                record['abc_status'] = 'queued'
+                record['auto_push'] = False
+                record['needs_review'] = False
+                
+                # Save to ABC Portal for student access
+                approval_data = {
+                    'credits': record['credits'],
+                    'top_match': record['wmd_matches'][0]['course_id'] if record.get('wmd_matches') else 'Unknown',
+                    'composite_score': record['wmd_composite'],
+                    'approved_by': 'Mentor',
+                    'report_path': record.get('report_path', ''),
+                    'notes': 'Reviewed and approved by mentor'
+                }
             
-            # Save to ABC Portal for student access
-            approval_data = {
-                'credits': record['credits'],
-                'top_match': record['wmd_matches'][0]['course_id'] if record.get('wmd_matches') else 'Unknown',
-                'composite_score': record['wmd_composite'],
-                'approved_by': 'Mentor',
-                'report_path': record.get('report_path', ''),
-                'notes': 'Reviewed and approved by mentor'
-            }
-            save_to_abc(internship_id, record['abc_token'], record['form_data'], approval_data)
-        
-        # Add changelog
-        record['changelog'].append({
-            'timestamp': datetime.now().isoformat(),
-            'action': 'mentor_review',
-            'by': 'mentor',
-            'changes': {
+            # Save updated record, with its audit entry
+            with record_change(record, 'mentor_review', 'mentor', {
                 'custom_keywords': custom_keywords,
                 'pushed_to_abc': push_to_abc
-            }
-        })
-        
-        # Save updated record
-        with open(record_path, 'w') as f:
-            json.dump(record, f, indent=2)
-        
-        return jsonify({'success': True, 'record': record})
+            }):
+                if abc_payload:
+                    save_record_with_outbox(record, abc_payload, approval_data)
+                else:
+                    record_store.save_record(record)
+            analytics.record_updated(counted_before, record)
+            
+            return jsonify({'success': True, 'record': record})
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -502,20 +645,95 @@ def abc_status(abc_token):
     })
 
 
+@app.route('/api/abc/outbox/<internship_id>', methods=['GET'])
+def abc_outbox_status(internship_id):
+    """ABC delivery state of an internship (mentor only)"""
+    if 'mentor_logged_in' not in session or not session['mentor_logged_in']:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    return jsonify({'internship_id': internship_id, 'deliveries': outbox_status(internship_id)})
+
+
+@app.route('/api/analytics', methods=['GET'])
+def analytics_summary():
+    """
+    Aggregate credits/decisions/throughput (mentor only)
+    Query: institution_code, from, to (YYYY-MM-DD), top
+    """
+    if 'mentor_logged_in' not in session or not session['mentor_logged_in']:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    return jsonify(analytics.get_summary(
+        institution_code=request.args.get('institution_code'),
+        start_day=request.args.get('from'),
+        end_day=request.args.get('to'),
+        top_n=request.args.get('top', 10, type=int)
+    ))
+
+
+@app.route('/api/export/<fmt>', methods=['GET'])
+def export_records(fmt):
+    """
+    Stream records as CSV or NDJSON for reporting (mentor only)
+    Query: from, to (YYYY-MM-DD), institution_code, decision, gzip=1
+    """
+    if 'mentor_logged_in' not in session or not session['mentor_logged_in']:
+        return jsonify({'error': 'Unauthorized'}), 401
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"Unsupported format; use one of {sorted(EXPORT_FORMATS)}"}), 400
+    
+    compress = _flag('gzip')
+    stream = export_stream(
+        fmt, compress,
+        start_day=request.args.get('from'),
+        end_day=request.args.get('to'),
+        institution_code=request.args.get('institution_code'),
+        decision=request.args.get('decision')
+    )
+    return Response(
+        stream_with_context(stream),
+        mimetype='application/gzip' if compress else EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f"attachment; filename={export_filename(fmt, compress)}"}
+    )
+
+
+@app.route('/api/nlp_cache/stats', methods=['GET'])
+def nlp_cache_status():
+    """NLP parse cache hit rates (mentor only)"""
+    if 'mentor_logged_in' not in session or not session['mentor_logged_in']:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    return jsonify({'caches': nlp_cache_stats()})
+
+
 @app.route('/api/delete_data/<internship_id>', methods=['DELETE'])
 def delete_data(internship_id):
     """Delete internship data (student privacy)"""
     try:
-        # Delete record
-        record_path = os.path.join(DB_FOLDER, f"{internship_id}.json")
-        if os.path.exists(record_path):
-            os.remove(record_path)
+        # Delete record (under its lock, so no pending update writes it back)
+        with record_store.record_lock(internship_id):
+            record = record_store.load_record(internship_id)
+            if record_store.delete_record(internship_id):
+                analytics.record_updated(record, None)
+                # The audit trail is kept (it holds no personal data); note the deletion
+                append_events(internship_id, [{'action': 'data_deleted', 'by': 'student'}])
+            # Queued ABC deliveries carry the student's name and APAAR ID
+            purge_outbox(internship_id)
+        result_pages.invalidate(internship_id)
         
         # Delete report
         report_path = os.path.join(REPORTS_FOLDER, f"{internship_id}.pdf")
         if os.path.exists(report_path):
             os.remove(report_path)
         
+        # Cached parses of the certificate and submission text
+        upload_id = (record or {}).get('upload_id')
+        purge_owners([internship_id, upload_id])
+        
+        # The certificate's perceptual hash
+        if upload_id:
+            duplicate_index.remove(upload_id)
+        
         return jsonify({'success': True, 'message': 'Data deleted successfully'})
     
     except Exception as e:
@@ -530,7 +748,27 @@ def download_report(internship_id):
     if not os.path.exists(report_path):
         return "Report not found", 404
     
-    return send_file(report_path, as_attachment=True, download_name=f"internship_report_{internship_id}.pdf")
+    return serve_file(report_path, download_name=f"internship_report_{internship_id}.pdf")
+
+
+@app.route('/api/internship/<internship_id>/files', methods=['GET'])
+def internship_file_urls(internship_id):
+    """Signed, expiring URLs of the original certificate and the report (mentor only)"""
+    if 'mentor_logged_in' not in session or not session['mentor_logged_in']:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    record = record_store.load_stored_record(internship_id)
+    if record is None:
+        return jsonify({'error': 'Internship not found'}), 404
+    
+    urls = {'certificate_url': None, 'report_url': None, 'expires_in': file_serving.SIGNED_URL_TTL}
+    metadata = record_store.load_upload(record.get('upload_id')) if record.get('upload_id') else None
+    if metadata and file_serving.resolve_path('certificate', metadata['filename']):
+        urls['certificate_url'] = signed_url('certificate', metadata['filename'])
+    if file_serving.resolve_path('report', f"{internship_id}.pdf"):
+        urls['report_url'] = signed_url('report', f"{internship_id}.pdf",
+                                        download_name=f"internship_report_{internship_id}.pdf")
+    return jsonify(urls)
 
 
 # ============ ABC SIMULATOR ============
@@ -0,0 +1,160 @@
+"""
+Static Asset Pipeline
+Offline build of fingerprinted, precompressed assets and the route/template helper that serve them
+"""
+
+import os
+import gzip
+import json
+import hashlib
+import mimetypes
+import threading
+from typing import Dict, Optional
+
+from flask import Blueprint, request, send_file, url_for, abort
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Source assets (Flask's static folder) and the build output; the output can
+# also be served directly by the front proxy (gzip_static / brotli_static).
+ASSET_SOURCE_FOLDER = os.environ.get('ASSET_SOURCE_FOLDER', os.path.join(_HERE, 'static'))
+ASSET_BUILD_FOLDER = os.environ.get('ASSET_BUILD_FOLDER', os.path.join(_HERE, 'static_build'))
+MANIFEST_NAME = 'manifest.json'
+
+# Only text assets benefit from compression
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.txt', '.html', '.map'}
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+assets_bp = Blueprint('assets', __name__, url_prefix='/assets')
+
+
+def fingerprint_name(filename: str, data: bytes) -> str:
+    """css/style.css -> css/style.<hash>.css"""
+    root, ext = os.path.splitext(filename)
+    return f"{root}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+
+
+def _write(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def build_assets(source: str = ASSET_SOURCE_FOLDER, output: str = ASSET_BUILD_FOLDER) -> Dict[str, str]:
+    """
+    Fingerprint every static file and write gzip (and brotli, when installed) variants
+    
+    Args:
+        source: Folder of source assets
+        output: Folder receiving the built files and manifest
+    
+    Returns:
+        Manifest mapping source names to fingerprinted names
+    """
+    manifest = {}
+    for root, _, files in os.walk(source):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            filename = os.path.relpath(path, source).replace(os.sep, '/')
+            with open(path, 'rb') as f:
+                data = f.read()
+            
+            built_name = fingerprint_name(filename, data)
+            built_path = os.path.join(output, built_name)
+            _write(built_path, data)
+            
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                # mtime=0 keeps the gzip output reproducible
+                _write(built_path + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+                if brotli is not None:
+                    _write(built_path + '.br', brotli.compress(data, quality=11))
+            
+            manifest[filename] = built_name
+    
+    _write(os.path.join(output, MANIFEST_NAME), json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return manifest
+
+
+_manifest: Optional[Dict[str, str]] = None
+_served: Optional[set] = None
+_manifest_lock = threading.Lock()
+
+
+def load_manifest() -> Dict[str, str]:
+    """Manifest of the last build (empty when assets have not been built)"""
+    global _manifest, _served
+    with _manifest_lock:
+        if _manifest is None:
+            try:
+                with open(os.path.join(ASSET_BUILD_FOLDER, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+                    _manifest = json.load(f)
+            except (OSError, ValueError):
+                _manifest = {}
+            _served = set(_manifest.values())
+        return _manifest
+
+
+def reload_manifest():
+    """Forget the loaded manifest (after a rebuild)"""
+    global _manifest, _served
+    with _manifest_lock:
+        _manifest = None
+        _served = None
+
+
+def asset_url(filename: str) -> str:
+    """
+    URL of a static asset for templates
+    
+    Fingerprinted once assets are built; falls back to the plain static route
+    in development.
+    """
+    built_name = load_manifest().get(filename)
+    if built_name is None:
+        return url_for('static', filename=filename)
+    return url_for('assets.serve_asset', filename=built_name)
+
+
+def _accepted_encodings():
+    # Preference order; a variant is used only if the build wrote it
+    accepted = request.accept_encodings
+    return [(name, suffix) for name, suffix in (('br', '.br'), ('gzip', '.gz')) if accepted[name]]
+
+
+@assets_bp.route('/<path:filename>')
+def serve_asset(filename):
+    """Serve a fingerprinted asset, precompressed when the client accepts it"""
+    load_manifest()
+    if filename not in _served:
+        abort(404)
+    
+    path = os.path.join(ASSET_BUILD_FOLDER, filename)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    
+    encoding = None
+    for name, suffix in _accepted_encodings():
+        if os.path.exists(path + suffix):
+            path, encoding = path + suffix, name
+            break
+    
+    response = send_file(path, mimetype=mimetype, conditional=True, etag=True)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+
+if __name__ == '__main__':
+    # Run at deploy time, before starting the workers
+    built = build_assets()
+    print(f"Built {len(built)} assets into {ASSET_BUILD_FOLDER}"
+          f"{'' if brotli is not None else ' (brotli not installed: gzip only)'}")
@@ -0,0 +1,171 @@
+"""
+Internship Audit Log
+Append-only change history, indexed per internship, kept out of the record files
+
+Retention: entries are kept when a student deletes their data, as the
+record of how credits were decided. They hold no personal data - the
+internship id is a random UUID, actors are roles ('student', 'mentor') and
+changes are mentor keywords and flags - so once the record is deleted they
+no longer identify anyone. The deletion itself is logged as 'data_deleted'.
+"""
+
+import os
+import json
+import sqlite3
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+import record_store
+
+AUDIT_DB = os.path.join(record_store.DB_FOLDER, 'audit.sqlite3')
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS audit (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    internship_id TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    action TEXT NOT NULL,
+    actor TEXT NOT NULL,
+    changes TEXT
+);
+CREATE INDEX IF NOT EXISTS audit_by_internship ON audit (internship_id, seq);
+CREATE TRIGGER IF NOT EXISTS audit_no_update BEFORE UPDATE ON audit
+BEGIN SELECT RAISE(ABORT, 'audit log is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS audit_no_delete BEFORE DELETE ON audit
+BEGIN SELECT RAISE(ABORT, 'audit log is append-only'); END;
+'''
+
+
+def _connect() -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(AUDIT_DB) or '.', exist_ok=True)
+    conn = sqlite3.connect(AUDIT_DB, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _entry(row: sqlite3.Row) -> Dict[str, Any]:
+    """Audit row in the shape of the old changelog entries"""
+    entry = {
+        'seq': row['seq'],
+        'timestamp': row['timestamp'],
+        'action': row['action'],
+        'by': row['actor'],
+    }
+    if row['changes'] is not None:
+        entry['changes'] = json.loads(row['changes'])
+    return entry
+
+
+def append_events(internship_id: str, events: List[Dict[str, Any]],
+                  conn: Optional[sqlite3.Connection] = None) -> List[Dict[str, Any]]:
+    """
+    Append changelog-style events ({'timestamp', 'action', 'by', 'changes'})
+    
+    Args:
+        internship_id: Internship the events belong to
+        events: Events to append
+        conn: Connection of an open transaction (committed here if omitted)
+    
+    Returns:
+        The stored entries with their sequence numbers
+    """
+    own = conn is None
+    conn = conn or _connect()
+    try:
+        with conn if own else nullcontext():
+            seqs = []
+            for event in events:
+                changes = event.get('changes')
+                cursor = conn.execute(
+                    'INSERT INTO audit (internship_id, timestamp, action, actor, changes) VALUES (?, ?, ?, ?, ?)',
+                    (internship_id, event.get('timestamp') or datetime.now().isoformat(), event['action'],
+                     event.get('by', ''), json.dumps(changes) if changes is not None else None)
+                )
+                seqs.append(cursor.lastrowid)
+        rows = conn.execute(
+            f"SELECT * FROM audit WHERE seq IN ({','.join('?' * len(seqs))}) ORDER BY seq", seqs
+        ).fetchall() if seqs else []
+        return [_entry(row) for row in rows]
+    finally:
+        if own:
+            conn.close()
+
+
+@contextmanager
+def record_change(record: Dict[str, Any], action: str, by: str,
+                  changes: Optional[Dict[str, Any]] = None):
+    """
+    Log a change to a record and update its last_change summary
+    
+    Wrap the record save in the block: the entry is written in a transaction
+    that commits only when the block completes, so a failed save leaves no
+    orphan entry.
+    
+        with record_change(record, 'mentor_review', 'mentor', changes):
+            record_store.save_record(record)
+    
+    Yields:
+        The entry, with its sequence number
+    """
+    conn = _connect()
+    try:
+        with conn:
+            migrate_changelog(record, conn)
+            entry = append_events(record['internship_id'], [{
+                'timestamp': datetime.now().isoformat(),
+                'action': action,
+                'by': by,
+                'changes': changes,
+            }], conn)[0]
+            
+            record['last_change'] = {key: entry[key] for key in ('seq', 'timestamp', 'action', 'by')}
+            record['change_count'] = record.get('change_count', 0) + 1
+            yield entry
+    finally:
+        conn.close()
+
+
+def migrate_changelog(record: Dict[str, Any], conn: Optional[sqlite3.Connection] = None):
+    """Move an embedded changelog (records written before the audit log) into the log"""
+    changelog = record.pop('changelog', None)
+    if not changelog:
+        return
+    
+    entries = append_events(record['internship_id'], changelog, conn)
+    last = entries[-1]
+    record['last_change'] = {key: last[key] for key in ('seq', 'timestamp', 'action', 'by')}
+    record['change_count'] = record.get('change_count', 0) + len(entries)
+
+
+def query_events(internship_id: str, cursor: int = 0,
+                 limit: int = DEFAULT_PAGE_SIZE) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """
+    One page of a record's audit trail, oldest first
+    
+    Args:
+        internship_id: Internship whose trail is read
+        cursor: Return entries after this sequence number (0 for the start)
+        limit: Page size (capped at MAX_PAGE_SIZE)
+    
+    Returns:
+        (entries, next_cursor) - next_cursor is None on the last page
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            'SELECT * FROM audit WHERE internship_id = ? AND seq > ? ORDER BY seq LIMIT ?',
+            (internship_id, cursor, limit + 1)
+        ).fetchall()
+    finally:
+        conn.close()
+    
+    entries = [_entry(row) for row in rows[:limit]]
+    next_cursor = entries[-1]['seq'] if len(rows) > limit else None
+    return entries, next_cursor
@@ -3,21 +3,63 @@ CEESCM - Certificate Experience Education Skill Credit Matching
 Tokenization module for internship descriptions
 """
 
+import os
 import re
-from typing import List, Set
+import itertools
+from typing import List, Set, Iterable, Iterator
 import spacy
 
+from nlp_cache import get_nlp_cache
+
 try:
     nlp = spacy.load("en_core_web_sm")
 except OSError:
     nlp = None
 
+# Texts longer than this are tokenized in windows of this many characters
+CHUNK_CHARS = int(os.environ.get('CEESCM_CHUNK_CHARS', '20000'))
+# Input beyond this many characters is ignored
+MAX_INPUT_CHARS = int(os.environ.get('CEESCM_MAX_INPUT_CHARS', '2000000'))
+# Tokenization stops after this many unique tokens
+MAX_TOKENS = int(os.environ.get('CEESCM_MAX_TOKENS', '5000'))
+
+
+def iter_chunks(text: str, chunk_chars: int = CHUNK_CHARS, max_chars: int = MAX_INPUT_CHARS) -> Iterator[str]:
+    """
+    Split text into windows of at most chunk_chars characters
+    
+    Windows end at a line break (or else a space) so words are not cut;
+    text beyond max_chars is dropped.
+    """
+    if not text:
+        return
+    limit = min(len(text), max_chars)
+    if limit < len(text):
+        print(f"CEESCM: input truncated from {len(text)} to {limit} characters")
+    
+    start = 0
+    while start < limit:
+        end = min(start + chunk_chars, limit)
+        if end < limit:
+            cut = text.rfind('\n', start, end)
+            if cut <= start + chunk_chars // 2:
+                cut = max(cut, text.rfind(' ', start, end))
+            if cut > start:
+                end = cut
+        yield text[start:end]
+        start = end
+
 
 class CEESCMTokenizer:
     """Tokenize and normalize internship descriptions"""
     
-    def __init__(self):
+    def __init__(self, chunk_chars: int = CHUNK_CHARS, max_input_chars: int = MAX_INPUT_CHARS,
+                 max_tokens: int = MAX_TOKENS):
         self.nlp = nlp
+        self.nlp_cache = get_nlp_cache(nlp)
+        self.chunk_chars = chunk_chars
+        self.max_input_chars = max_input_chars
+        self.max_tokens = max_tokens
         
         # Stop words to remove
         self.stop_words = {
@@ -48,27 +90,60 @@ class CEESCMTokenizer:
         if not text:
             return []
         
-        # Normalize text
-        text = text.lower()
-        text = re.sub(r'[^\w\s]', ' ', text)  # Remove punctuation
-        text = re.sub(r'\s+', ' ', text).strip()  # Normalize whitespace
+        if len(text) > self.chunk_chars:
+            # Large input (e.g. months of logs): bounded windows
+            return self.tokenize_stream(iter_chunks(text, self.chunk_chars, self.max_input_chars))
+        
+        text = self._normalize(text)
+        doc = self.nlp_cache(text) if self.nlp else None
+        return self._merge_unique([self._filter_tokens(text, doc)])
+    
+    def tokenize_stream(self, pieces: Iterable[str]) -> List[str]:
+        """
+        Tokenize a stream of text pieces (each at most chunk_chars long)
+        
+        Pieces are parsed one batch at a time and merged into a single
+        deduplicated token list, so memory stays bounded by the chunk size
+        and max_tokens rather than the input size.
+        
+        Args:
+            pieces: Text pieces in order, e.g. from iter_chunks()
+            
+        Returns:
+            List of normalized tokens (same order as tokenize)
+        """
+        normalized = (text for text in (self._normalize(p) for p in pieces) if text)
         
-        # Tokenize
         if self.nlp:
-            doc = self.nlp(text)
-            tokens = [token.lemma_ for token in doc if not token.is_stop and len(token.text) > 2]
+            # Parsed directly: large chunks would only crowd out the parse cache
+            token_lists = (self._filter_tokens(doc.text, doc) for doc in self.nlp.pipe(normalized, batch_size=4))
         else:
-            # Simple tokenization without spaCy
-            words = text.split()
-            tokens = [w for w in words if w not in self.stop_words and len(w) > 2]
+            token_lists = (self._filter_tokens(text) for text in normalized)
         
-        # Remove duplicates while preserving order
+        return self._merge_unique(token_lists)
+    
+    def _normalize(self, text: str) -> str:
+        text = text.lower()
+        text = re.sub(r'[^\w\s]', ' ', text)  # Remove punctuation
+        return re.sub(r'\s+', ' ', text).strip()  # Normalize whitespace
+    
+    def _filter_tokens(self, text: str, doc=None) -> List[str]:
+        if doc is not None:
+            return [token.lemma_ for token in doc if not token.is_stop and len(token.text) > 2]
+        # Simple tokenization without spaCy
+        return [w for w in text.split() if w not in self.stop_words and len(w) > 2]
+    
+    def _merge_unique(self, token_lists: Iterable[List[str]]) -> List[str]:
+        """Remove duplicates while preserving order, stopping at max_tokens"""
         seen = set()
         unique_tokens = []
-        for token in tokens:
-            if token not in seen:
-                seen.add(token)
-                unique_tokens.append(token)
+        for tokens in token_lists:
+            for token in tokens:
+                if token not in seen:
+                    seen.add(token)
+                    unique_tokens.append(token)
+                    if len(unique_tokens) >= self.max_tokens:
+                        return unique_tokens
         
         return unique_tokens
     
@@ -82,8 +157,6 @@ class CEESCMTokenizer:
         Returns:
             List of key terms
         """
-        tokens = self.tokenize(text)
-        
         # Filter for meaningful terms
         key_terms = []
         text_lower = text.lower()
@@ -95,12 +168,18 @@ class CEESCMTokenizer:
         
         # Add noun chunks if spaCy available
         if self.nlp:
-            doc = self.nlp(text)
-            for chunk in doc.noun_chunks:
-                if len(chunk.text.split()) <= 3:  # Max 3 words
-                    normalized = chunk.text.lower().replace(' ', '_')
-                    if normalized not in key_terms:
-                        key_terms.append(normalized)
+            if len(text) > self.chunk_chars:
+                docs = self.nlp.pipe(iter_chunks(text, self.chunk_chars, self.max_input_chars), batch_size=4)
+            else:
+                docs = [self.nlp_cache(text)]
+            for doc in docs:
+                for chunk in doc.noun_chunks:
+                    if len(chunk.text.split()) <= 3:  # Max 3 words
+                        normalized = chunk.text.lower().replace(' ', '_')
+                        if normalized not in key_terms:
+                            key_terms.append(normalized)
+                if len(key_terms) >= 20:
+                    break
         
         return key_terms[:20]  # Limit to top 20 terms
     
@@ -129,10 +208,14 @@ def get_sample_ceescm_tokens(internship_data: dict) -> List[str]:
     tokenizer = CEESCMTokenizer()
     
     # Combine relevant fields
-    text = ' '.join([
-        internship_data.get('organization', ''),
-        internship_data.get('internship_title', ''),
-        internship_data.get('logs', ''),
-    ])
+    organization = internship_data.get('organization', '')
+    title = internship_data.get('internship_title', '')
+    logs = internship_data.get('logs', '')
     
-    return tokenizer.tokenize(text)
+    if len(organization) + len(title) + len(logs) + 2 <= tokenizer.chunk_chars:
+        return tokenizer.tokenize(' '.join([organization, title, logs]))
+    
+    # Long logs are streamed in windows instead of being parsed as one string
+    pieces = itertools.chain([organization, title],
+                             iter_chunks(logs, tokenizer.chunk_chars, tokenizer.max_input_chars))
+    return tokenizer.tokenize_stream(pieces)
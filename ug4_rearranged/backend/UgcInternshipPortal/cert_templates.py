@@ -0,0 +1,230 @@
+"""
+Certificate Template Registry
+Known certificate layouts, recognised by perceptual hash, with the page regions holding each field
+"""
+
+import os
+import sys
+import json
+import argparse
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from perceptual_hash import phash, file_phash, hamming, to_hex, from_hex
+
+CERT_TEMPLATES_FILE = os.environ.get('CERT_TEMPLATES_FILE', 'uploads/cert_templates.json')
+# Bits (of 64) an upload may differ from a template and still count as that template
+TEMPLATE_MAX_DISTANCE = int(os.environ.get('TEMPLATE_MAX_DISTANCE', '8'))
+
+# Field crops are short lines or blocks of text
+TEMPLATE_OCR_CONFIG = '--psm 6'
+# Crops shorter than this are upscaled before OCR
+TEMPLATE_MIN_CROP_HEIGHT = 48
+# Share of a value's OCR confidence lost when the upload is TEMPLATE_MAX_DISTANCE
+# bits from its template (less certain that the regions line up)
+TEMPLATE_DISTANCE_PENALTY = 0.25
+TIER_TEMPLATE = 'template'
+
+
+class TemplateRegistry:
+    """
+    Templates stored as JSON, reloaded when the file changes
+    
+    Each template: {'id', 'name', 'phash' (hex), 'fields': {field: [x0, y0, x1, y1]}}
+    with regions as fractions of the page width and height.
+    """
+    
+    def __init__(self, path: str = None):
+        self.path = path or CERT_TEMPLATES_FILE
+        self._templates: List[Dict[str, Any]] = []
+        self._mtime = None
+        self._lock = threading.Lock()
+    
+    def _load(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            self._templates, self._mtime = [], None
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, 'r') as f:
+                templates = json.load(f).get('templates', [])
+            for template in templates:
+                template['_hash'] = from_hex(template['phash'])
+            self._templates, self._mtime = templates, mtime
+        except Exception as e:
+            print(f"Template registry load error: {e}")
+    
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        templates = [{k: v for k, v in t.items() if not k.startswith('_')} for t in self._templates]
+        tmp_path = f"{self.path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        with open(tmp_path, 'w') as f:
+            json.dump({'templates': templates}, f, indent=2)
+        os.replace(tmp_path, self.path)
+        self._mtime = os.stat(self.path).st_mtime_ns
+    
+    def templates(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._load()
+            return list(self._templates)
+    
+    def add(self, template_id: str, name: str, image_path: str,
+            fields: Dict[str, List[float]]) -> Dict[str, Any]:
+        """
+        Register (or replace) a template from a sample image
+        
+        Args:
+            template_id: Short identifier, e.g. 'canva-internship-01'
+            name: Human readable name
+            image_path: A filled-in certificate of this template
+            fields: Field name -> [x0, y0, x1, y1] as fractions of the page
+        
+        Returns:
+            The stored template
+        """
+        for field, box in fields.items():
+            x0, y0, x1, y1 = box
+            if not (0 <= x0 < x1 <= 1 and 0 <= y0 < y1 <= 1):
+                raise ValueError(f"Region of {field} must be fractions of the page: {box}")
+        
+        value = file_phash(image_path)
+        template = {
+            'id': template_id,
+            'name': name,
+            'phash': to_hex(value),
+            'fields': {field: [float(v) for v in box] for field, box in fields.items()},
+            'added': datetime.now().isoformat(),
+            '_hash': value,
+        }
+        with self._lock:
+            self._load()
+            self._templates = [t for t in self._templates if t['id'] != template_id] + [template]
+            self._save()
+        return template
+    
+    def remove(self, template_id: str) -> bool:
+        with self._lock:
+            self._load()
+            kept = [t for t in self._templates if t['id'] != template_id]
+            if len(kept) == len(self._templates):
+                return False
+            self._templates = kept
+            self._save()
+            return True
+    
+    def match(self, img: Image.Image) -> Optional[Tuple[Dict[str, Any], int]]:
+        """
+        Closest registered template within TEMPLATE_MAX_DISTANCE
+        
+        Returns:
+            (template, distance in bits), or None for an unknown layout
+        """
+        templates = self.templates()
+        if not templates:
+            return None
+        value = phash(img)
+        best = min(templates, key=lambda t: hamming(value, t['_hash']))
+        distance = hamming(value, best['_hash'])
+        return (best, distance) if distance <= TEMPLATE_MAX_DISTANCE else None
+
+
+def template_crops(img: Image.Image, template: Dict[str, Any]) -> Iterator[Tuple[str, Image.Image]]:
+    """Grayscale crop of each field region, upscaled when small"""
+    width, height = img.size
+    for field, (x0, y0, x1, y1) in template['fields'].items():
+        box = (int(x0 * width), int(y0 * height), int(round(x1 * width)), int(round(y1 * height)))
+        crop = ImageOps.grayscale(img.crop(box))
+        if 0 < crop.height < TEMPLATE_MIN_CROP_HEIGHT:
+            scale = -(-TEMPLATE_MIN_CROP_HEIGHT // crop.height)
+            crop = crop.resize((crop.width * scale, crop.height * scale), Image.LANCZOS)
+        yield field, crop
+
+
+def region_text(words: Dict[str, List]) -> Tuple[str, float]:
+    """
+    Text of a field region and its confidence
+    
+    Args:
+        words: OCR word boxes of the crop (image_to_data dict layout)
+    
+    Returns:
+        (words joined by spaces, mean word confidence in 0..1)
+    """
+    texts, confs = [], []
+    for text, conf in zip(words.get('text', []), words.get('conf', [])):
+        text, conf = str(text).strip(), float(conf)
+        # Layout rows (blocks, lines) carry conf -1
+        if text and conf >= 0:
+            texts.append(text)
+            confs.append(min(conf, 100.0) / 100.0)
+    return ' '.join(texts), (sum(confs) / len(confs) if confs else 0.0)
+
+
+def layout_factor(distance: int) -> float:
+    """Scale on region confidences for an upload distance bits from its template"""
+    return 1.0 - TEMPLATE_DISTANCE_PENALTY * min(distance, TEMPLATE_MAX_DISTANCE) / max(TEMPLATE_MAX_DISTANCE, 1)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_template_registry() -> TemplateRegistry:
+    """Shared registry over CERT_TEMPLATES_FILE"""
+    global _registry
+    
+    with _registry_lock:
+        if _registry is None or _registry.path != CERT_TEMPLATES_FILE:
+            _registry = TemplateRegistry(CERT_TEMPLATES_FILE)
+        return _registry
+
+
+def _parse_region(text: str) -> Tuple[str, List[float]]:
+    field, _, box = text.partition('=')
+    values = [float(v) for v in box.split(',')]
+    if not field or len(values) != 4:
+        raise argparse.ArgumentTypeError(f"expected field=x0,y0,x1,y1, got {text!r}")
+    return field, values
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Manage certificate templates')
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    add = commands.add_parser('add', help='register a template from a sample image')
+    add.add_argument('template_id')
+    add.add_argument('image')
+    add.add_argument('--name', help='display name (default: the id)')
+    add.add_argument('--field', dest='fields', action='append', type=_parse_region, required=True,
+                     help='field region as fractions of the page, e.g. name=0.25,0.42,0.75,0.48')
+    
+    remove = commands.add_parser('remove', help='delete a template')
+    remove.add_argument('template_id')
+    
+    commands.add_parser('list', help='show registered templates')
+    
+    match = commands.add_parser('match', help='show the template an image is recognised as')
+    match.add_argument('image')
+    args = parser.parse_args()
+    
+    registry = get_template_registry()
+    if args.command == 'add':
+        template = registry.add(args.template_id, args.name or args.template_id, args.image, dict(args.fields))
+        print(f"Registered {template['id']} ({template['phash']}) with fields {', '.join(template['fields'])}")
+    elif args.command == 'remove':
+        if not registry.remove(args.template_id):
+            print(f"No template {args.template_id}")
+            sys.exit(1)
+    elif args.command == 'list':
+        for template in registry.templates():
+            print(f"{template['id']:<32} {template['phash']}  {template['name']}  [{', '.join(template['fields'])}]")
+    else:
+        with Image.open(args.image) as img:
+            found = registry.match(img)
+        print(f"{found[0]['id']} (distance {found[1]})" if found else "Unknown layout")
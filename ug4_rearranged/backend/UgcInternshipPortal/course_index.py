@@ -0,0 +1,252 @@
+"""
+Precomputed Curriculum Index
+Course vectors and sparse word postings used for batch (N x M) matching
+"""
+
+import os
+import hashlib
+import numpy as np
+from typing import List, Dict, Set, Optional
+
+from keyword_index import KeywordIndex
+from ann_index import IVFIndex, retrieval_vectors
+from nlp_cache import get_nlp_cache
+
+# Catalogues at least this large get an ANN candidate stage
+ANN_MIN_COURSES = int(os.environ.get('ANN_MIN_COURSES', '5000'))
+# Inverted lists scanned per query by the ANN stage
+ANN_N_PROBE = int(os.environ.get('ANN_N_PROBE', '16'))
+
+
+def course_text(course_data: Dict) -> str:
+    """Text a course is scored on: its keywords followed by its description"""
+    return ' '.join(course_data['keywords']) + ' ' + course_data['description']
+
+
+def word_set(text: str) -> Set[str]:
+    """Word set used for the overlap part of the similarity score"""
+    return set(text.lower().split())
+
+
+def catalogue_digest(course_ids: List[str], texts: List[str]) -> str:
+    """Digest of the course ids and scored texts, in order (what the ANN index was built from)"""
+    digest = hashlib.sha256()
+    for course_id, text in zip(course_ids, texts):
+        digest.update(course_id.encode('utf-8') + b'\0' + text.encode('utf-8') + b'\0')
+    return digest.hexdigest()
+
+
+class CourseIndex:
+    """Immutable precomputed representation of a curriculum database"""
+    
+    def __init__(self, curriculum_db: Dict[str, Dict], nlp=None,
+                 ann_min_courses: int = ANN_MIN_COURSES, ann_folder: Optional[str] = None):
+        self.nlp = nlp
+        self.course_ids = list(curriculum_db.keys())
+        self.course_titles = [curriculum_db[cid]['title'] for cid in self.course_ids]
+        self.course_keywords = [list(curriculum_db[cid]['keywords']) for cid in self.course_ids]
+        
+        texts = [course_text(curriculum_db[cid]) for cid in self.course_ids]
+        course_words = [word_set(text) for text in texts]
+        self._course_word_sets = [frozenset(words) for words in course_words]
+        self._course_positions = None
+        self.mapped_nbytes = None
+        self.keyword_index = KeywordIndex(curriculum_db)
+        
+        # Vocabulary over course words only; submission words outside it
+        # can never contribute to an intersection
+        self.vocab = {}
+        for words in course_words:
+            for word in sorted(words):
+                if word not in self.vocab:
+                    self.vocab[word] = len(self.vocab)
+        self.terms = list(self.vocab)
+        
+        # CSR course -> terms (lets a persisted index rebuild word sets)
+        course_terms = [sorted(self.vocab[w] for w in words) for words in course_words]
+        self.course_term_indptr = np.zeros(len(course_terms) + 1, dtype=np.int64)
+        np.cumsum([len(t) for t in course_terms], out=self.course_term_indptr[1:])
+        self.course_term_ids = np.array([t for terms in course_terms for t in terms], dtype=np.int64)
+        
+        # CSR postings: term -> courses containing it
+        postings = [[] for _ in range(len(self.vocab))]
+        for course_idx, words in enumerate(course_words):
+            for word in words:
+                postings[self.vocab[word]].append(course_idx)
+        
+        lengths = np.array([len(p) for p in postings], dtype=np.int64)
+        self.term_indptr = np.zeros(len(postings) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self.term_indptr[1:])
+        self.term_courses = np.array(
+            [course_idx for p in postings for course_idx in p], dtype=np.int64
+        )
+        self.course_word_counts = np.array([len(w) for w in course_words], dtype=np.int64)
+        
+        # Document vectors (only when a spaCy pipeline is available)
+        if self.nlp and texts:
+            self.vectors = np.array([doc.vector for doc in self.nlp.pipe(texts)], dtype=np.float32)
+        else:
+            self.vectors = np.zeros((len(texts), 0), dtype=np.float32)
+        self.vector_norms = np.linalg.norm(self.vectors, axis=1) if self.vectors.size else np.zeros(len(texts), dtype=np.float32)
+        
+        # ANN candidate stage for large catalogues (reused from disk when built
+        # from these same courses; an edit keeping the course count is caught
+        # by the content digest)
+        self.ann = None
+        if texts and len(texts) >= ann_min_courses:
+            digest = catalogue_digest(self.course_ids, texts)
+            self.ann = IVFIndex.load(ann_folder) if ann_folder else None
+            if self.ann is None or self.ann.meta.get('catalogue_digest') != digest:
+                self.ann = IVFIndex.build(retrieval_vectors(self.vectors, course_words))
+                self.ann.meta['catalogue_digest'] = digest
+                if ann_folder:
+                    self.ann.save(ann_folder)
+    
+    @classmethod
+    def from_parts(cls, nlp=None, **parts) -> 'CourseIndex':
+        """Assemble an index from previously computed parts (see index_store)"""
+        index = cls.__new__(cls)
+        index.nlp = nlp
+        index._course_word_sets = None
+        index._course_positions = None
+        index.mapped_nbytes = None
+        index.ann = None
+        for name, value in parts.items():
+            setattr(index, name, value)
+        return index
+    
+    def __len__(self) -> int:
+        return len(self.course_ids)
+    
+    @property
+    def course_word_sets(self) -> List[frozenset]:
+        """Word set per course, rebuilt from the course -> terms CSR on first use"""
+        if self._course_word_sets is None:
+            terms, indptr, ids = self.terms, self.course_term_indptr, self.course_term_ids
+            self._course_word_sets = [
+                frozenset(terms[t] for t in ids[indptr[c]:indptr[c + 1]])
+                for c in range(len(self.course_ids))
+            ]
+        return self._course_word_sets
+    
+    @property
+    def course_positions(self) -> Dict[str, int]:
+        """Course id -> position in course_ids"""
+        if self._course_positions is None:
+            self._course_positions = {cid: i for i, cid in enumerate(self.course_ids)}
+        return self._course_positions
+    
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the index (arrays plus Python-side tables)"""
+        ann = 0
+        if self.ann is not None:
+            ann = self.ann.centroids.nbytes + self.ann.list_indptr.nbytes + self.ann.list_members.nbytes
+        if self.mapped_nbytes is not None:
+            # Loaded from index_store: every table is a mapped array
+            return self.mapped_nbytes + ann
+        
+        arrays = (self.term_indptr.nbytes + self.term_courses.nbytes + self.course_word_counts.nbytes
+                  + self.course_term_indptr.nbytes + self.course_term_ids.nbytes
+                  + self.vectors.nbytes + self.vector_norms.nbytes)
+        # Rough per-entry costs of dict/set/tuple storage
+        tables = 120 * len(self.vocab) + 80 * len(self.course_term_ids)
+        postings = 150 * sum(len(p) for p in self.keyword_index.postings.values())
+        return arrays + ann + tables + postings
+    
+    def term_ids(self, words: Set[str]) -> List[int]:
+        """Vocabulary ids of the words found in some course"""
+        if isinstance(self.vocab, dict):
+            return [self.vocab[w] for w in words if w in self.vocab]
+        # Sorted term table of a loaded index (index_store.SortedLookup)
+        return self.vocab.lookup(words).tolist()
+    
+    def intersection_counts(self, words: Set[str]) -> np.ndarray:
+        """Number of shared words between one submission and every course"""
+        ids = self.term_ids(words)
+        if not ids:
+            return np.zeros(len(self.course_ids), dtype=np.int64)
+        cols = np.concatenate([self.term_courses[self.term_indptr[t]:self.term_indptr[t + 1]] for t in ids])
+        return np.bincount(cols, minlength=len(self.course_ids))
+    
+    def overlap_matrix(self, submission_words: List[Set[str]]) -> np.ndarray:
+        """
+        Word-overlap (Jaccard) scores for many submissions at once
+        
+        Args:
+            submission_words: Word set per submission
+        
+        Returns:
+            N x M matrix of overlap scores
+        """
+        n, m = len(submission_words), len(self.course_ids)
+        rows, terms = [], []
+        for row, words in enumerate(submission_words):
+            ids = self.term_ids(words)
+            rows.extend([row] * len(ids))
+            terms.extend(ids)
+        
+        rows = np.asarray(rows, dtype=np.int64)
+        terms = np.asarray(terms, dtype=np.int64)
+        
+        # Expand every (submission, term) pair into the term's posting list
+        counts = self.term_indptr[terms + 1] - self.term_indptr[terms]
+        total = int(counts.sum())
+        row_rep = np.repeat(rows, counts)
+        starts = np.repeat(self.term_indptr[terms], counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        cols = self.term_courses[starts + offsets]
+        
+        intersection = np.bincount(row_rep * m + cols, minlength=n * m).reshape(n, m).astype(np.float64)
+        sizes = np.array([len(w) for w in submission_words], dtype=np.float64)
+        union = sizes[:, None] + self.course_word_counts[None, :] - intersection
+        
+        return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+    
+    def vector_similarity_matrix(self, submission_vectors: np.ndarray) -> np.ndarray:
+        """Cosine similarity between submission vectors and course vectors"""
+        n, m = submission_vectors.shape[0], len(self.course_ids)
+        if not self.vectors.size or not submission_vectors.size:
+            return np.zeros((n, m))
+        
+        norms = np.linalg.norm(submission_vectors, axis=1)
+        dots = submission_vectors.astype(np.float64) @ self.vectors.T.astype(np.float64)
+        denom = norms[:, None] * self.vector_norms[None, :]
+        
+        return np.divide(dots, denom, out=np.zeros_like(dots), where=denom > 0)
+    
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Document vectors for submission texts"""
+        if not self.nlp or not texts:
+            return np.zeros((len(texts), 0), dtype=np.float32)
+        return np.array([doc.vector for doc in get_nlp_cache(self.nlp).pipe(texts)], dtype=np.float32)
+    
+    def candidate_positions(self, texts: List[str], n_probe: int = ANN_N_PROBE) -> List[np.ndarray]:
+        """
+        Course positions worth scoring exactly for each text
+        
+        Every course is a candidate when no ANN stage is built.
+        """
+        if self.ann is None:
+            return [np.arange(len(self.course_ids)) for _ in texts]
+        
+        queries = retrieval_vectors(self.embed(texts), [word_set(text) for text in texts])
+        return self.ann.search(queries, n_probe)
+    
+    def similarity_matrix(self, texts: List[str]) -> np.ndarray:
+        """
+        Full N x M similarity matrix, same scoring as WMDMatcher.calculate_similarity
+        
+        Args:
+            texts: Submission texts
+        
+        Returns:
+            N x M matrix of similarity scores
+        """
+        overlap = self.overlap_matrix([word_set(text) for text in texts])
+        
+        if not self.nlp:
+            return overlap
+        
+        semantic = self.vector_similarity_matrix(self.embed(texts))
+        return np.minimum(0.7 * semantic + 0.3 * overlap, 1.0)
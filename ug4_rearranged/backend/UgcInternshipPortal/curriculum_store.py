@@ -0,0 +1,488 @@
+"""
+Curriculum Catalogue Store
+File-backed, versioned curriculum catalogue with hot-reloadable immutable snapshots
+"""
+
+import os
+import re
+import csv
+import json
+import fcntl
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from types import MappingProxyType
+from typing import Dict, List, Optional, Union
+
+from course_index import CourseIndex
+from index_store import load_course_index, save_course_index
+from wmd_matcher import WMDMatcher, DEFAULT_CURRICULUM, nlp
+
+CURRICULUM_FOLDER = os.environ.get('CURRICULUM_FOLDER', 'uploads/curriculum')
+CURRICULUM_FILE = os.path.join(CURRICULUM_FOLDER, 'catalogue.json')
+INSTITUTIONS_FOLDER = os.path.join(CURRICULUM_FOLDER, 'institutions')
+
+# Memory budget for cached per-institution indexes
+MEMORY_BUDGET_MB = float(os.environ.get('CURRICULUM_MEMORY_BUDGET_MB', '256'))
+
+GLOBAL_PARTITION = 'global'
+INSTITUTION_CODE_RE = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+# How often a worker re-checks the catalogue file for a newer version
+POLL_INTERVAL = float(os.environ.get('CURRICULUM_POLL_INTERVAL', '5'))
+# Archived versions kept under versions/ (older ones and their indexes are pruned on publish)
+KEEP_VERSIONS = int(os.environ.get('CURRICULUM_KEEP_VERSIONS', '10'))
+
+_INDEX_FOLDER_RE = re.compile(r'^[0-9a-f]{16}$')
+
+
+class CurriculumSnapshot:
+    """Immutable catalogue version with its precomputed index"""
+    
+    def __init__(self, version: int, checksum: str, courses: Dict[str, Dict], index: CourseIndex,
+                 partition: str = GLOBAL_PARTITION):
+        self.partition = partition
+        self.version = version
+        self.checksum = checksum
+        self.courses = MappingProxyType(courses)
+        self.index = index
+        self.loaded_at = datetime.now().isoformat()
+    
+    @property
+    def label(self) -> str:
+        """Version label stored on records scored with this snapshot"""
+        return f"{self.partition}/v{self.version}-{self.checksum[:8]}"
+    
+    def matcher(self) -> WMDMatcher:
+        """Matcher bound to this snapshot (shares the prebuilt index)"""
+        return WMDMatcher(curriculum_db=self.courses, course_index=self.index,
+                          catalogue_version=self.label)
+
+
+def _write_atomic(path: str, data: Dict):
+    """Write JSON via temp file + rename so readers never see a partial file"""
+    folder = os.path.dirname(path) or '.'
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_catalogue_file(path: str) -> Dict[str, Dict]:
+    """
+    Read a course catalogue from JSON or CSV
+    
+    JSON: {"courses": {course_id: {title, keywords, description}}} or the bare mapping
+    CSV: course_id,title,keywords,description with keywords separated by ';'
+    """
+    if path.lower().endswith('.csv'):
+        courses = {}
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                course_id = row['course_id'].strip()
+                if not course_id:
+                    continue
+                courses[course_id] = {
+                    'title': row.get('title', '').strip(),
+                    'keywords': [k.strip().lower() for k in row.get('keywords', '').split(';') if k.strip()],
+                    'description': row.get('description', '').strip(),
+                }
+        return courses
+    
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    
+    if isinstance(data.get('courses'), dict):
+        return data['courses']
+    return data
+
+
+class CurriculumStore:
+    """
+    Versioned curriculum catalogue backed by a JSON file
+    
+    Every change is written as a new version (archived under versions/).
+    Workers poll the file; a newer version is indexed in a background
+    thread and swapped in atomically once ready.
+    """
+    
+    def __init__(self, path: str = CURRICULUM_FILE, poll_interval: float = POLL_INTERVAL,
+                 seed: Optional[Dict[str, Dict]] = None, partition: str = GLOBAL_PARTITION,
+                 keep_versions: int = KEEP_VERSIONS):
+        self.path = path
+        self.partition = partition
+        self.poll_interval = poll_interval
+        self.keep_versions = max(1, keep_versions)
+        self._snapshot: Optional[CurriculumSnapshot] = None
+        self._loaded_signature = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self._rebuild_thread: Optional[threading.Thread] = None
+        
+        if not os.path.exists(self.path):
+            self._write_version(seed if seed is not None else DEFAULT_CURRICULUM, 1)
+    
+    @property
+    def versions_folder(self) -> str:
+        return os.path.join(os.path.dirname(self.path) or '.', 'versions')
+    
+    @property
+    def index_folder(self) -> str:
+        return os.path.join(os.path.dirname(self.path) or '.', 'index')
+    
+    def current(self) -> CurriculumSnapshot:
+        """Latest fully indexed snapshot (loads synchronously on first use)"""
+        if self._snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = self._build_snapshot()
+        else:
+            self.check_for_updates()
+        return self._snapshot
+    
+    def matcher(self) -> WMDMatcher:
+        """Matcher bound to the current snapshot"""
+        return self.current().matcher()
+    
+    def check_for_updates(self, force: bool = False) -> bool:
+        """
+        Start a background rebuild if the catalogue file changed
+        
+        Returns:
+            True if a rebuild was started
+        """
+        now = time.monotonic()
+        if not force and now - self._last_check < self.poll_interval:
+            return False
+        self._last_check = now
+        
+        try:
+            signature = self._file_signature()
+        except OSError:
+            return False
+        
+        if signature == self._loaded_signature:
+            return False
+        return self.reload(background=True)
+    
+    def reload(self, background: bool = True) -> bool:
+        """Rebuild the snapshot from disk, swapping it in when the index is ready"""
+        with self._lock:
+            if self._rebuild_thread is not None and self._rebuild_thread.is_alive():
+                return False
+            if not background:
+                self._swap()
+                return True
+            self._rebuild_thread = threading.Thread(target=self._swap, daemon=True)
+            self._rebuild_thread.start()
+            return True
+    
+    def wait(self, timeout: Optional[float] = None):
+        """Block until a pending background rebuild has finished"""
+        thread = self._rebuild_thread
+        if thread is not None:
+            thread.join(timeout)
+    
+    def _file_signature(self):
+        # os.replace gives every published version a new inode
+        stat = os.stat(self.path)
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    
+    def _swap(self):
+        # Rebuild until the indexed version is the one on disk, so a version
+        # published mid-rebuild is not missed
+        while True:
+            try:
+                snapshot = self._build_snapshot()
+            except Exception as e:
+                # Keep serving the previous snapshot
+                print(f"Curriculum reload error: {e}")
+                return
+            if self._snapshot is None or snapshot.version >= self._snapshot.version:
+                self._snapshot = snapshot
+            try:
+                if self._file_signature() == self._loaded_signature:
+                    return
+            except OSError:
+                return
+    
+    def _build_snapshot(self) -> CurriculumSnapshot:
+        signature = self._file_signature()
+        with open(self.path, 'rb') as f:
+            raw = f.read()
+        data = json.loads(raw)
+        
+        courses = data['courses']
+        checksum = hashlib.sha256(raw).hexdigest()
+        # Persisted index is keyed by catalogue content and memory-mapped,
+        # so only the first worker pays for building it
+        index_folder = os.path.join(self.index_folder, checksum[:16])
+        index = load_course_index(index_folder, nlp, checksum)
+        if index is None:
+            index = CourseIndex(courses, nlp)
+            save_course_index(index, index_folder, checksum)
+        snapshot = CurriculumSnapshot(data.get('version', 1), checksum, courses, index,
+                                      partition=self.partition)
+        self._loaded_signature = signature
+        return snapshot
+    
+    def _read_version(self) -> Dict:
+        with open(self.path, 'r') as f:
+            return json.load(f)
+    
+    def _write_version(self, courses: Dict[str, Dict], version: int):
+        data = {
+            'version': version,
+            'updated_at': datetime.now().isoformat(),
+            'courses': courses,
+        }
+        _write_atomic(os.path.join(self.versions_folder, f"v{version:06d}.json"), data)
+        _write_atomic(self.path, data)
+        self.prune()
+    
+    def prune(self) -> int:
+        """
+        Delete archived versions beyond the newest keep_versions, and the
+        persisted indexes of catalogues no longer kept
+        
+        Workers still serving a pruned snapshot keep their memory-mapped
+        arrays (the files stay readable until unmapped).
+        
+        Returns:
+            Number of versions and index folders removed
+        """
+        removed = 0
+        try:
+            archived = sorted(name for name in os.listdir(self.versions_folder)
+                              if name.startswith('v') and name.endswith('.json'))
+        except OSError:
+            archived = []
+        for name in archived[:-self.keep_versions]:
+            try:
+                os.remove(os.path.join(self.versions_folder, name))
+                removed += 1
+            except OSError:
+                pass
+        
+        # Index folders are keyed by the checksum of the catalogue file bytes,
+        # which the archived copy of each version shares
+        kept = set()
+        for path in [self.path] + [os.path.join(self.versions_folder, n) for n in archived[-self.keep_versions:]]:
+            try:
+                with open(path, 'rb') as f:
+                    kept.add(hashlib.sha256(f.read()).hexdigest()[:16])
+            except OSError:
+                pass
+        if self._snapshot is not None:
+            kept.add(self._snapshot.checksum[:16])
+        try:
+            folders = os.listdir(self.index_folder)
+        except OSError:
+            folders = []
+        for name in folders:
+            if _INDEX_FOLDER_RE.match(name) and name not in kept:
+                shutil.rmtree(os.path.join(self.index_folder, name), ignore_errors=True)
+                removed += 1
+        return removed
+    
+    @contextmanager
+    def _publish_lock(self):
+        """Exclusive across threads and worker processes for read-modify-write of the catalogue"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with self._lock, open(self.path + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def publish(self, courses: Dict[str, Dict]) -> int:
+        """
+        Publish a new catalogue version
+        
+        Args:
+            courses: Complete course mapping for the new version
+        
+        Returns:
+            New version number
+        """
+        with self._publish_lock():
+            version = self._read_version().get('version', 0) + 1
+            self._write_version(courses, version)
+        self.reload(background=True)
+        return version
+    
+    def import_file(self, path: str) -> int:
+        """Publish a catalogue read from a JSON or CSV file"""
+        return self.publish(load_catalogue_file(path))
+    
+    def add_custom_keywords(self, course_ids: Union[str, List[str]], keywords: List[str]) -> Optional[int]:
+        """
+        Add keywords to one or more courses as a new catalogue version
+        
+        A catalogue edit affecting every submission; mentor reviews keep
+        their keywords as overrides on the record instead. The catalogue is
+        re-read under the publish lock, so concurrent edits from other
+        requests or workers are not lost.
+        
+        Returns:
+            New version number, or None if none of the courses exist
+        """
+        if isinstance(course_ids, str):
+            course_ids = [course_ids]
+        
+        with self._publish_lock():
+            data = self._read_version()
+            courses = dict(data['courses'])
+            changed = False
+            for course_id in course_ids:
+                if course_id not in courses:
+                    continue
+                course = dict(courses[course_id])
+                existing = list(course['keywords'])
+                existing.extend(k for k in keywords if k not in existing)
+                course['keywords'] = existing
+                courses[course_id] = course
+                changed = True
+            if not changed:
+                return None
+            version = data.get('version', 0) + 1
+            self._write_version(courses, version)
+        
+        self.reload(background=True)
+        return version
+    
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the loaded snapshot (0 if not loaded)"""
+        snapshot = self._snapshot
+        return snapshot.index.nbytes if snapshot is not None else 0
+
+
+class InstitutionCurriculumRegistry:
+    """
+    Per-institution curriculum partitions
+    
+    Each institution with a catalogue under institutions/<code>/ gets its own
+    CurriculumStore (and index), loaded on first use and evicted least
+    recently used first once the memory budget is exceeded. Institutions
+    without their own catalogue are matched against the global one.
+    """
+    
+    def __init__(self, folder: str = CURRICULUM_FOLDER, memory_budget_mb: float = MEMORY_BUDGET_MB,
+                 poll_interval: float = POLL_INTERVAL):
+        self.folder = folder
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self.poll_interval = poll_interval
+        self.global_store = CurriculumStore(os.path.join(folder, 'catalogue.json'), poll_interval)
+        self._partitions: 'OrderedDict[str, CurriculumStore]' = OrderedDict()
+        # Codes without a catalogue -> when to look on disk again
+        self._missing: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    def partition_path(self, institution_code: str) -> str:
+        return os.path.join(self.folder, 'institutions', institution_code.upper(), 'catalogue.json')
+    
+    def store_for(self, institution_code: Optional[str] = None) -> CurriculumStore:
+        """Catalogue store for an institution (global store if it has none)"""
+        code = (institution_code or '').strip().upper()
+        if not code or not INSTITUTION_CODE_RE.match(code):
+            return self.global_store
+        
+        now = time.monotonic()
+        with self._lock:
+            store = self._partitions.get(code)
+            if store is not None:
+                self._partitions.move_to_end(code)
+                return store
+            if self._missing.get(code, 0.0) > now:
+                return self.global_store
+        
+        path = self.partition_path(code)
+        if not os.path.exists(path):
+            # Most institutions have no catalogue of their own; skip the stat until the next poll
+            with self._lock:
+                if len(self._missing) > 4096:
+                    self._missing.clear()
+                self._missing[code] = now + self.poll_interval
+            return self.global_store
+        
+        store = CurriculumStore(path, self.poll_interval, partition=code)
+        store.current()
+        
+        with self._lock:
+            store = self._partitions.setdefault(code, store)
+            self._partitions.move_to_end(code)
+            self._evict()
+        return store
+    
+    def create_partition(self, institution_code: str, courses: Dict[str, Dict]) -> int:
+        """Publish a catalogue version for an institution"""
+        code = institution_code.strip().upper()
+        if not INSTITUTION_CODE_RE.match(code):
+            raise ValueError(f"Invalid institution code: {institution_code}")
+        
+        path = self.partition_path(code)
+        with self._lock:
+            self._missing.pop(code, None)
+        if not os.path.exists(path):
+            CurriculumStore(path, self.poll_interval, seed=courses, partition=code)
+            return 1
+        return self.store_for(code).publish(courses)
+    
+    def loaded_partitions(self) -> List[str]:
+        """Institution codes currently held in memory, least recently used first"""
+        with self._lock:
+            return list(self._partitions)
+    
+    def memory_usage(self) -> int:
+        with self._lock:
+            return sum(store.nbytes for store in self._partitions.values())
+    
+    def _evict(self):
+        # Caller holds the lock; the most recently used partition always stays
+        total = sum(store.nbytes for store in self._partitions.values())
+        while total > self.memory_budget and len(self._partitions) > 1:
+            _, evicted = self._partitions.popitem(last=False)
+            total -= evicted.nbytes
+
+
+_default_registry = None
+
+
+def get_curriculum_registry() -> InstitutionCurriculumRegistry:
+    """Process-wide institution registry"""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = InstitutionCurriculumRegistry()
+    return _default_registry
+
+
+def get_curriculum_store(institution_code: Optional[str] = None) -> CurriculumStore:
+    """Catalogue store used to score a submission from the given institution"""
+    return get_curriculum_registry().store_for(institution_code)
+
+
+if __name__ == '__main__':
+    import sys
+    
+    if len(sys.argv) not in (3, 4) or sys.argv[1] != 'import':
+        print("Usage: python curriculum_store.py import <catalogue.json|catalogue.csv> [institution_code]")
+        sys.exit(1)
+    
+    if len(sys.argv) == 4:
+        new_version = get_curriculum_registry().create_partition(sys.argv[3], load_catalogue_file(sys.argv[2]))
+    else:
+        new_version = get_curriculum_store().import_file(sys.argv[2])
+    print(f"Published curriculum catalogue version {new_version}")
@@ -0,0 +1,153 @@
+"""
+Streaming DOCX Reader
+Text of paragraphs, tables, text boxes, headers and footers, parsed incrementally from the ZIP
+"""
+
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import Iterator, List
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+MC = '{http://schemas.openxmlformats.org/markup-compatibility/2006}'
+
+_P, _TC, _TR, _T = W + 'p', W + 'tc', W + 'tr', W + 't'
+_BREAKS = {W + 'br': '\n', W + 'cr': '\n', W + 'tab': '\t', W + 'noBreakHyphen': '-'}
+# Text boxes appear twice: DrawingML in mc:Choice and a VML copy in mc:Fallback
+_FALLBACK = MC + 'Fallback'
+
+CELL_SEPARATOR = '\t'
+
+_PART_NUMBER = re.compile(r'(\d+)')
+
+
+def _part_order(name: str):
+    return [int(piece) if piece.isdigit() else piece for piece in _PART_NUMBER.split(name)]
+
+
+def docx_parts(archive: zipfile.ZipFile) -> List[str]:
+    """Text-bearing parts in reading order: headers, body, footers"""
+    names = archive.namelist()
+    headers = sorted((n for n in names if re.fullmatch(r'word/header\d*\.xml', n)), key=_part_order)
+    footers = sorted((n for n in names if re.fullmatch(r'word/footer\d*\.xml', n)), key=_part_order)
+    return headers + [n for n in ['word/document.xml'] if n in names] + footers
+
+
+def iter_part_lines(stream) -> Iterator[str]:
+    """
+    Lines of one WordprocessingML part, in document order
+    
+    Each paragraph is a line; each table row is a line of its cells joined by
+    CELL_SEPARATOR. Paragraphs inside text boxes become lines of their own.
+    Elements are discarded as soon as they are read.
+    """
+    # Open containers: ['p', [text pieces]] / ['tc', [paragraphs]] / ['tr', [cells]]
+    stack = []
+    skip_depth = 0
+    
+    def deliver(text):
+        # Finished paragraph/row goes to the enclosing cell, otherwise out as a line
+        if stack and stack[-1][0] == 'tc':
+            stack[-1][1].append(text)
+            return None
+        return text
+    
+    for event, elem in ET.iterparse(stream, events=('start', 'end')):
+        tag = elem.tag
+        if tag == _FALLBACK:
+            skip_depth += 1 if event == 'start' else -1
+            if event == 'end':
+                elem.clear()
+            continue
+        if skip_depth:
+            if event == 'end':
+                elem.clear()
+            continue
+        
+        if event == 'start':
+            if tag == _P:
+                stack.append(['p', []])
+            elif tag == _TC:
+                stack.append(['tc', []])
+            elif tag == _TR:
+                stack.append(['tr', []])
+            continue
+        
+        line = None
+        if tag == _T or tag in _BREAKS:
+            for frame in reversed(stack):
+                if frame[0] == 'p':
+                    frame[1].append((elem.text or '') if tag == _T else _BREAKS[tag])
+                    break
+        elif tag == _P:
+            line = deliver(''.join(stack.pop()[1]))
+        elif tag == _TC:
+            cell = ' '.join(text for text in stack.pop()[1] if text.strip())
+            if stack and stack[-1][0] == 'tr':
+                stack[-1][1].append(cell)
+        elif tag == _TR:
+            line = deliver(CELL_SEPARATOR.join(stack.pop()[1]))
+        
+        elem.clear()
+        if line is not None:
+            yield line
+
+
+def iter_docx_lines(path: str) -> Iterator[str]:
+    """Non-empty text lines of a DOCX file (headers, body, footers)"""
+    with zipfile.ZipFile(path) as archive:
+        seen_parts = set()
+        for name in docx_parts(archive):
+            with archive.open(name) as stream:
+                lines = [line for line in iter_part_lines(stream) if line.strip()]
+            if name != 'word/document.xml':
+                # Sections often repeat the same header/footer
+                key = tuple(lines)
+                if key in seen_parts:
+                    continue
+                seen_parts.add(key)
+            yield from lines
+
+
+def read_docx_text(path: str) -> str:
+    """Full text of a DOCX file, one paragraph or table row per line"""
+    return '\n'.join(iter_docx_lines(path))
+
+
+def _python_docx_text(path: str) -> str:
+    # Previous reader: body paragraphs only, via the python-docx object model
+    from docx import Document
+    return '\n'.join(para.text for para in Document(path).paragraphs)
+
+
+if __name__ == '__main__':
+    # Speed and coverage against the python-docx reader: python docx_reader.py [file.docx] [repeats]
+    import os
+    import sys
+    import time
+    import tempfile
+    from docx import Document
+    
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    if len(sys.argv) > 1:
+        path = sys.argv[1]
+    else:
+        # Synthetic certificate: header, body paragraphs, a details table, footer
+        document = Document()
+        document.sections[0].header.paragraphs[0].text = 'ACME Technologies Pvt Ltd - CIN U72200KA2015PTC012345'
+        document.sections[0].footer.paragraphs[0].text = 'Certificate ID: CERT-2024-00123'
+        for i in range(200):
+            document.add_paragraph(f"Paragraph {i}: the intern worked on React, Flask and REST APIs.")
+        table = document.add_table(rows=60, cols=2)
+        for i, row in enumerate(table.rows):
+            row.cells[0].text = f"Field {i}"
+            row.cells[1].text = f"Value {i}"
+        path = os.path.join(tempfile.mkdtemp(), 'benchmark.docx')
+        document.save(path)
+    
+    for label, reader in (('python-docx', _python_docx_text), ('streaming', read_docx_text)):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            text = reader(path)
+        elapsed = (time.perf_counter() - start) / repeats * 1000
+        print(f"{label:>12}: {elapsed:8.2f} ms/doc  {len(text):>7} chars  {len(text.splitlines()):>5} lines")
@@ -0,0 +1,291 @@
+"""
+Near-duplicate Certificate Index
+Perceptual hashes of uploads in locality-sensitive buckets, so lookups touch a few candidates, not every upload
+"""
+
+import os
+import re
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import record_store
+from perceptual_hash import HASH_BITS, phash, file_phash, hamming, to_hex, from_hex
+
+DUPLICATE_DB = os.path.join(record_store.DB_FOLDER, 'duplicates.sqlite3')
+# Uploads whose hashes differ in at most this many bits are near-duplicates
+DUPLICATE_MAX_DISTANCE = int(os.environ.get('DUPLICATE_MAX_DISTANCE', '6'))
+
+# The hash is cut into BANDS bands of BAND_BITS bits; every band is a bucket key.
+# Probing each band's bucket and its 1-bit neighbours finds every hash within
+# 2 * BANDS - 1 bits (some band then differs in at most one bit).
+BANDS = 4
+BAND_BITS = HASH_BITS // BANDS
+_BAND_MASK = (1 << BAND_BITS) - 1
+MAX_GUARANTEED_DISTANCE = 2 * BANDS - 1
+
+# Extracted fields compared between near-duplicates, for the mentor to see
+IDENTITY_FIELDS = ('name', 'cert_id')
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tiff', '.bmp')
+DOCUMENT_EXTENSIONS = ('.pdf', '.docx')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS upload_hashes (
+    upload_id TEXT PRIMARY KEY,
+    phash TEXT NOT NULL,
+    added TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS hash_buckets (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    upload_id TEXT NOT NULL,
+    PRIMARY KEY (band, bucket, upload_id)
+);
+CREATE TABLE IF NOT EXISTS upload_identity (
+    upload_id TEXT PRIMARY KEY,
+    name TEXT,
+    cert_id TEXT
+);
+'''
+
+
+def _connect() -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(DUPLICATE_DB) or '.', exist_ok=True)
+    conn = sqlite3.connect(DUPLICATE_DB, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def bands(value: int) -> List[int]:
+    """Bucket key of each band, most significant band first"""
+    return [(value >> (BAND_BITS * (BANDS - 1 - band))) & _BAND_MASK for band in range(BANDS)]
+
+
+def _probes(bucket: int) -> List[int]:
+    return [bucket] + [bucket ^ (1 << bit) for bit in range(BAND_BITS)]
+
+
+def identity(fields: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """Normalised name and certificate id from extracted fields (unread ones left out)"""
+    found = {}
+    for field in IDENTITY_FIELDS:
+        value = ((fields or {}).get(field) or {}).get('value') or ''
+        value = re.sub(r'[^a-z0-9]', '', str(value).lower())
+        if value:
+            found[field] = value
+    return found
+
+
+def identity_match(a: Dict[str, str], b: Dict[str, str]) -> Optional[bool]:
+    """Whether the fields read from both uploads agree (None when none can be compared)"""
+    compared = [a[field] == b[field] for field in IDENTITY_FIELDS if a.get(field) and b.get(field)]
+    return all(compared) if compared else None
+
+
+def add(upload_id: str, value: int, conn: Optional[sqlite3.Connection] = None,
+        fields: Optional[Dict[str, str]] = None):
+    """Index (or re-index) an upload's hash and its identity fields"""
+    own = conn is None
+    conn = conn or _connect()
+    try:
+        with conn:
+            conn.execute('DELETE FROM hash_buckets WHERE upload_id = ?', (upload_id,))
+            conn.execute('INSERT OR REPLACE INTO upload_hashes (upload_id, phash, added) VALUES (?, ?, ?)',
+                         (upload_id, to_hex(value), datetime.now().isoformat()))
+            conn.executemany('INSERT INTO hash_buckets (band, bucket, upload_id) VALUES (?, ?, ?)',
+                             [(band, bucket, upload_id) for band, bucket in enumerate(bands(value))])
+            conn.execute('DELETE FROM upload_identity WHERE upload_id = ?', (upload_id,))
+            if fields:
+                conn.execute('INSERT INTO upload_identity (upload_id, name, cert_id) VALUES (?, ?, ?)',
+                             (upload_id, fields.get('name'), fields.get('cert_id')))
+    finally:
+        if own:
+            conn.close()
+
+
+def remove(upload_id: str, conn: Optional[sqlite3.Connection] = None) -> bool:
+    """Drop an upload from the index (student data deletion)"""
+    own = conn is None
+    conn = conn or _connect()
+    try:
+        with conn:
+            conn.execute('DELETE FROM hash_buckets WHERE upload_id = ?', (upload_id,))
+            conn.execute('DELETE FROM upload_identity WHERE upload_id = ?', (upload_id,))
+            return conn.execute('DELETE FROM upload_hashes WHERE upload_id = ?', (upload_id,)).rowcount > 0
+    finally:
+        if own:
+            conn.close()
+
+
+def _identities(upload_ids: List[str], conn: sqlite3.Connection) -> Dict[str, Dict[str, str]]:
+    rows = conn.execute(
+        f"SELECT upload_id, name, cert_id FROM upload_identity WHERE upload_id IN ({','.join('?' * len(upload_ids))})",
+        upload_ids
+    ) if upload_ids else []
+    return {upload_id: {'name': name, 'cert_id': cert_id} for upload_id, name, cert_id in rows}
+
+
+def query(value: int, max_distance: Optional[int] = None, exclude: Iterable[str] = (),
+          conn: Optional[sqlite3.Connection] = None) -> List[Tuple[str, int]]:
+    """
+    Indexed uploads within max_distance bits of a hash
+    
+    Only uploads sharing a probed bucket are compared, so the cost follows
+    the bucket sizes rather than the number of uploads. Recall is exact up to
+    MAX_GUARANTEED_DISTANCE bits.
+    
+    Args:
+        value: Perceptual hash to look up
+        max_distance: Hamming distance limit (default DUPLICATE_MAX_DISTANCE)
+        exclude: Upload ids left out of the result
+    
+    Returns:
+        (upload_id, distance) pairs, closest first
+    """
+    max_distance = DUPLICATE_MAX_DISTANCE if max_distance is None else max_distance
+    excluded = set(exclude)
+    own = conn is None
+    conn = conn or _connect()
+    try:
+        candidates = {}
+        for band, bucket in enumerate(bands(value)):
+            probes = _probes(bucket)
+            rows = conn.execute(
+                f'''SELECT h.upload_id, h.phash FROM hash_buckets b JOIN upload_hashes h USING (upload_id)
+                    WHERE b.band = ? AND b.bucket IN ({','.join('?' * len(probes))})''',
+                [band] + probes
+            )
+            for upload_id, text in rows:
+                candidates[upload_id] = text
+    finally:
+        if own:
+            conn.close()
+    
+    found = []
+    for upload_id, text in candidates.items():
+        distance = hamming(value, from_hex(text))
+        if distance <= max_distance and upload_id not in excluded:
+            found.append((upload_id, distance))
+    found.sort(key=lambda item: (item[1], item[0]))
+    return found
+
+
+def upload_phash(path: str) -> Optional[int]:
+    """Perceptual hash of an uploaded certificate's first page (None for text uploads)"""
+    lower = path.lower()
+    if lower.endswith(IMAGE_EXTENSIONS):
+        return file_phash(path)
+    if lower.endswith(DOCUMENT_EXTENSIONS):
+        from thumbnails import render_first_page
+        return phash(render_first_page(path))
+    return None
+
+
+def index_upload(upload_id: str, path: str, extracted_fields: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Hash an upload, look up earlier near-duplicates and add it to the index
+    
+    Every close hash is reported. Each match also says whether the name and
+    certificate id read from both uploads agree: a mismatch may be another
+    student's certificate on the same template, or the same certificate
+    submitted under another student's name, so the mentor decides.
+    
+    Args:
+        upload_id: Upload being indexed
+        path: Stored upload file
+        extracted_fields: Fields extracted from the upload
+    
+    Returns:
+        {'phash': hex or None, 'near_duplicates': [{'upload_id', 'distance', 'identity_match'}]}
+    """
+    try:
+        value = upload_phash(path)
+    except Exception as e:
+        print(f"Perceptual hash error for {os.path.basename(path)}: {e}")
+        value = None
+    if value is None:
+        return {'phash': None, 'near_duplicates': []}
+    
+    fields = identity(extracted_fields)
+    conn = _connect()
+    try:
+        matches = query(value, exclude=[upload_id], conn=conn)
+        others = _identities([other for other, _ in matches], conn) if fields else {}
+        add(upload_id, value, conn=conn, fields=fields)
+    finally:
+        conn.close()
+    return {
+        'phash': to_hex(value),
+        'near_duplicates': [{'upload_id': other, 'distance': distance,
+                             'identity_match': identity_match(fields, others.get(other, {}))}
+                            for other, distance in matches],
+    }
+
+
+def rebuild() -> int:
+    """
+    Index every stored upload (one-off backfill for uploads made before the index)
+    
+    Returns:
+        Number of uploads indexed
+    """
+    count = 0
+    if not os.path.isdir(record_store.DB_FOLDER):
+        return count
+    conn = _connect()
+    try:
+        for entry in os.scandir(record_store.DB_FOLDER):
+            if not entry.name.endswith('_upload.json'):
+                continue
+            metadata = record_store.load_upload(entry.name[:-len('_upload.json')])
+            if not metadata:
+                continue
+            if metadata.get('phash'):
+                value = from_hex(metadata['phash'])
+            else:
+                try:
+                    value = upload_phash(metadata.get('filepath') or '')
+                except Exception as e:
+                    print(f"Perceptual hash error for {metadata['upload_id']}: {e}")
+                    value = None
+            if value is not None:
+                add(metadata['upload_id'], value, conn=conn, fields=identity(metadata.get('extracted_fields')))
+                count += 1
+    finally:
+        conn.close()
+    return count
+
+
+if __name__ == '__main__':
+    # Rebuild from stored uploads, or measure lookups: python duplicate_index.py [benchmark N]
+    import sys
+    import time
+    import random
+    
+    if len(sys.argv) > 1 and sys.argv[1] == 'benchmark':
+        import tempfile
+        size = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+        DUPLICATE_DB = os.path.join(tempfile.mkdtemp(), 'benchmark.sqlite3')
+        rng = random.Random(7)
+        hashes = [rng.getrandbits(HASH_BITS) for _ in range(size)]
+        conn = _connect()
+        for i, value in enumerate(hashes):
+            add(f"upload-{i}", value, conn=conn)
+        probes = [value ^ (1 << rng.randrange(HASH_BITS)) ^ (1 << rng.randrange(HASH_BITS)) for value in hashes[:200]]
+        
+        start = time.perf_counter()
+        for value in probes:
+            query(value, conn=conn)
+        indexed = (time.perf_counter() - start) / len(probes) * 1000
+        
+        stored = [from_hex(text) for (text,) in conn.execute('SELECT phash FROM upload_hashes')]
+        start = time.perf_counter()
+        for value in probes:
+            [other for other in stored if hamming(value, other) <= DUPLICATE_MAX_DISTANCE]
+        linear = (time.perf_counter() - start) / len(probes) * 1000
+        conn.close()
+        print(f"{size} uploads: LSH lookup {indexed:.2f} ms, linear scan {linear:.2f} ms")
+    else:
+        print(f"Indexed {rebuild()} uploads")
@@ -0,0 +1,171 @@
+"""
+Bulk Record Export
+Streams internship records as CSV or NDJSON (optionally gzipped) in constant memory
+"""
+
+import io
+import csv
+import sys
+import zlib
+import argparse
+from typing import Dict, Any, Iterator, Iterable, Optional
+
+import record_store
+from serialization import StoredRecord, dumps
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+EXPORT_COLUMNS = [
+    'internship_id', 'timestamp', 'apaar_id', 'name', 'institution_code', 'organization',
+    'internship_title', 'start_date', 'end_date', 'hours', 'decision', 'credits',
+    'wmd_composite', 'top_match', 'needs_review', 'abc_status', 'abc_token',
+]
+
+# Flush the encoder/compressor roughly every this many bytes
+CHUNK_SIZE = 64 * 1024
+
+
+def _matches_filters(fields: Dict[str, Any], start_day: Optional[str], end_day: Optional[str],
+                     institution_code: Optional[str], decision: Optional[str]) -> bool:
+    day = (fields.get('timestamp') or '')[:10]
+    if start_day and day < start_day:
+        return False
+    if end_day and day > end_day:
+        return False
+    if institution_code:
+        code = ((fields.get('form_data') or {}).get('institution_code') or '').strip().upper()
+        if code != institution_code.strip().upper():
+            return False
+    if decision and fields.get('decision') != decision:
+        return False
+    return True
+
+
+def export_row(stored: StoredRecord) -> Dict[str, Any]:
+    """Flat export row of one record"""
+    form_data = stored.get('form_data') or {}
+    matches = stored.get('wmd_matches') or []
+    return {
+        'internship_id': stored.get('internship_id'),
+        'timestamp': stored.get('timestamp', ''),
+        'apaar_id': form_data.get('apaar_id', ''),
+        'name': form_data.get('name', ''),
+        'institution_code': form_data.get('institution_code', ''),
+        'organization': form_data.get('organization', ''),
+        'internship_title': form_data.get('internship_title', ''),
+        'start_date': form_data.get('start_date', ''),
+        'end_date': form_data.get('end_date', ''),
+        'hours': form_data.get('hours', ''),
+        'decision': stored.get('decision', ''),
+        'credits': stored.get('credits', 0),
+        'wmd_composite': stored.get('wmd_composite', 0.0),
+        'top_match': matches[0]['course_id'] if matches else '',
+        'needs_review': bool(stored.get('needs_review', False)),
+        'abc_status': stored.get('abc_status') or '',
+        'abc_token': stored.get('abc_token') or '',
+    }
+
+
+def iter_export_rows(start_day: Optional[str] = None, end_day: Optional[str] = None,
+                     institution_code: Optional[str] = None,
+                     decision: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Export rows of the records matching the filters
+    
+    Args:
+        start_day: First submission day included (YYYY-MM-DD)
+        end_day: Last submission day included (YYYY-MM-DD)
+        institution_code: Restrict to one institution
+        decision: Restrict to one decision (e.g. 'Equivalent')
+    """
+    for stored in record_store.iter_stored_records():
+        # Filters read only small fields; large ones are decoded for matching rows
+        if _matches_filters(stored.fields, start_day, end_day, institution_code, decision):
+            yield export_row(stored)
+
+
+def _csv_chunks(rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS, extrasaction='ignore')
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def _ndjson_chunks(rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    pending, size = [], 0
+    for row in rows:
+        line = dumps(row) + b'\n'
+        pending.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield b''.join(pending)
+            pending, size = [], 0
+    if pending:
+        yield b''.join(pending)
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Gzip a byte stream on the fly"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_stream(fmt: str, compress: bool = False, **filters) -> Iterator[bytes]:
+    """
+    Encoded export as a stream of byte chunks
+    
+    Args:
+        fmt: 'csv' or 'ndjson'
+        compress: Gzip the output
+        **filters: Passed to iter_export_rows()
+    
+    Returns:
+        Generator of byte chunks (suitable for a streamed response)
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    
+    rows = iter_export_rows(**filters)
+    chunks = _csv_chunks(rows) if fmt == 'csv' else _ndjson_chunks(rows)
+    return gzip_chunks(chunks) if compress else chunks
+
+
+def export_filename(fmt: str, compress: bool = False) -> str:
+    return f"internship_records.{fmt}{'.gz' if compress else ''}"
+
+
+if __name__ == '__main__':
+    # Offline export, e.g. python export.py csv --decision Equivalent --gzip -o credits.csv.gz
+    parser = argparse.ArgumentParser(description='Export internship records')
+    parser.add_argument('format', choices=sorted(FORMATS))
+    parser.add_argument('--from', dest='start_day', help='first day (YYYY-MM-DD)')
+    parser.add_argument('--to', dest='end_day', help='last day (YYYY-MM-DD)')
+    parser.add_argument('--institution', dest='institution_code')
+    parser.add_argument('--decision')
+    parser.add_argument('--gzip', action='store_true')
+    parser.add_argument('-o', '--output', help='output file (default: stdout)')
+    args = parser.parse_args()
+    
+    stream = export_stream(args.format, args.gzip, start_day=args.start_day, end_day=args.end_day,
+                           institution_code=args.institution_code, decision=args.decision)
+    out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        for chunk in stream:
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
@@ -6,13 +6,20 @@ Handles OCR and intelligent field extraction from certificates with confidence s
 import re
 from datetime import datetime
 from typing import Dict, Any, List, Tuple
-import pytesseract
 from PIL import Image
 import pdfplumber
 from pdf2image.pdf2image import convert_from_path
-from docx import Document
 import spacy
 
+from nlp_cache import get_nlp_cache
+from docx_reader import read_docx_text
+from adaptive_ocr import adaptive_extract, weak_fields, MANDATORY_FIELDS
+from cert_templates import (get_template_registry, template_crops, TEMPLATE_OCR_CONFIG, region_text, layout_factor,
+                            TIER_TEMPLATE)
+from ocr_backend import get_ocr_backend
+from pdf_inspect import (inspect_pdf, page_count, MODE_TEXT, MODE_OCR, MODE_SKIP, PDF_PAGE_BUDGET, PDF_OCR_PAGE_BUDGET,
+                         OCR_MIN_IMAGE_COVERAGE)
+
 # Load spaCy model
 try:
     nlp = spacy.load("en_core_web_sm")
@@ -26,6 +33,8 @@ class FieldExtractor:
     
     def __init__(self):
         self.nlp = nlp
+        # Parses are memoized across requests (repeated boilerplate text)
+        self.nlp_cache = get_nlp_cache(nlp)
         
         # Regex patterns for field detection
         self.patterns = {
@@ -45,6 +54,9 @@ class FieldExtractor:
             r'((?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{1,2},?\s+\d{4})',  # Month dd, yyyy
         ]
         
+        # Mandatory fields OCR can find (the name needs NER)
+        self.ocr_fields = [field for field in MANDATORY_FIELDS if field != 'name' or self.nlp]
+        
         # Context keywords for boosting confidence
         self.name_anchors = ['certify that', 'awarded to', 'presented to', 'this is to certify', 'student name']
         self.org_anchors = ['organization', 'company', 'at', 'with']
@@ -81,7 +93,7 @@ class FieldExtractor:
         
         # Use spaCy NER if available
         if self.nlp:
-            doc = self.nlp(text)
+            doc = self.nlp_cache(text)
             
             # Extract person name (student name)
             result['name'] = self._extract_person_name(doc, text)
@@ -130,8 +142,8 @@ class FieldExtractor:
             
             # Handle image files
             elif file_path_lower.endswith(('.png', '.jpg', '.jpeg', '.tiff', '.bmp')):
-                text = self._read_image_ocr(file_path)
-                return self.extract_from_text(text)
+                with Image.open(file_path) as img:
+                    return self._extract_image(img)
             
             # Handle text files
             elif file_path_lower.endswith('.txt'):
@@ -146,45 +158,150 @@ class FieldExtractor:
             print(f"Error extracting from file: {e}")
             return self._empty_result()
     
+    def _extract_image(self, img) -> Dict[str, Any]:
+        """
+        Extract fields from a certificate image
+        
+        Known templates are read from their field regions only. Other layouts,
+        and template fields whose region could not be read, go through adaptive
+        OCR (cheap pass first, escalating for uncertain mandatory fields).
+        """
+        img.load()
+        found = get_template_registry().match(img)
+        if not found:
+            return adaptive_extract(img, self._ocr_image, self._ocr_words, self.extract_from_text,
+                                    self.name_anchors, self.ocr_fields)
+        
+        template, distance = found
+        result = self._extract_template(img, template, distance)
+        missing = weak_fields(result, self.ocr_fields)
+        if not missing:
+            return result
+        
+        print(f"Template {template['id']} (distance {distance}) left {', '.join(missing)} unread; running full OCR")
+        full = adaptive_extract(img, self._ocr_image, self._ocr_words, self.extract_from_text,
+                                self.name_anchors, self.ocr_fields)
+        for field, value in result.items():
+            if value['conf'] > full.get(field, {}).get('conf', 0.0):
+                full[field] = value
+        return full
+    
+    def _extract_template(self, img, template: Dict[str, Any], distance: int = 0) -> Dict[str, Any]:
+        """
+        OCR only the field regions of a known template and map them to fields
+        
+        A value's confidence is the mean OCR confidence of its words, lowered
+        as the upload's layout drifts from the template (hash distance).
+        """
+        layout = layout_factor(distance)
+        result = self._empty_result()
+        for field, crop in template_crops(img, template):
+            text, word_conf = region_text(self._ocr_words(crop, config=TEMPLATE_OCR_CONFIG))
+            value = self._template_value(field, text)
+            if value:
+                result[field] = {'value': value, 'conf': round(word_conf * layout, 2),
+                                 'ocr_tier': TIER_TEMPLATE, 'template': template['id']}
+        return result
+    
+    def _template_value(self, field: str, text: str) -> str:
+        """Value of a field from the text of its region ('' if it does not look like one)"""
+        if field in ('start_date', 'end_date'):
+            for pattern in self.date_patterns:
+                for match in re.findall(pattern, text, re.IGNORECASE):
+                    normalized = self._normalize_date(match)
+                    if normalized:
+                        return normalized
+            return ''
+        if field == 'hours':
+            match = re.search(r'\d+', text)
+            return match.group(0) if match else ''
+        if field == 'signatory_email':
+            field = 'email'
+        if field in self.patterns:
+            match = re.search(self.patterns[field], text, re.IGNORECASE)
+            if match:
+                return match.group(1).strip()
+            if field in ('gst', 'cin', 'email'):
+                return ''
+        # Regions are drawn around the value; drop stray separators OCR picks up at the edges
+        value = text.strip(' :;|-_.,')
+        if field == 'name':
+            # Letters only (initials, hyphens, apostrophes), given and family name at least
+            if not re.fullmatch(r"[A-Za-z][A-Za-z.'\- ]*", value) or len(value.split()) < 2:
+                return ''
+        elif field in ('organization', 'internship_title', 'signatory_name') and not re.search(r'[A-Za-z]{2}', value):
+            return ''
+        return value
+    
     def _read_docx(self, file_path: str) -> str:
-        """Read text from DOCX file"""
-        doc = Document(file_path)
-        return '\n'.join([para.text for para in doc.paragraphs])
+        """Read text from DOCX file (body, tables, text boxes, headers and footers)"""
+        return read_docx_text(file_path)
     
     def _read_pdf(self, file_path: str) -> str:
-        """Read text from PDF (searchable or scanned)"""
-        text = ""
+        """
+        Read text from PDF (searchable, scanned or mixed)
         
-        # Try reading searchable PDF first
+        Pages are pre-inspected so each one goes through the text layer or OCR,
+        not both; pages past the page budget are skipped. Pages with neither
+        text nor images are OCR'd only when nothing else yields text, since
+        they may carry text drawn as vector outlines.
+        """
         try:
-            with pdfplumber.open(file_path) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
+            plan = inspect_pdf(file_path)
+            total_pages = page_count(file_path)
+            if total_pages > len(plan):
+                print(f"PDF has {total_pages} pages; reading the first {len(plan)}")
         except Exception as e:
-            print(f"PDFPlumber error: {e}")
+            print(f"PDF inspection error: {e}")
+            # Unknown layout: try the text layer of the budgeted pages, then OCR
+            plan = None
         
-        # If no text extracted, try OCR
-        if not text.strip():
+        page_texts = {}
+        text_pages = [p.number for p in plan if p.mode == MODE_TEXT] if plan else list(range(1, PDF_PAGE_BUDGET + 1))
+        if text_pages:
             try:
-                images = convert_from_path(file_path)
-                for img in images:
-                    text += pytesseract.image_to_string(img) + "\n"
+                with pdfplumber.open(file_path, pages=text_pages) as pdf:
+                    for page in pdf.pages:
+                        page_texts[page.page_number] = page.extract_text() or ''
+            except Exception as e:
+                print(f"PDFPlumber error: {e}")
+        
+        # Scanned pages, plus text pages whose text layer is only a caption over a scan
+        ocr_pages = []
+        for info in plan or []:
+            if info.mode == MODE_OCR:
+                ocr_pages.append(info.number)
+            elif (info.mode == MODE_TEXT and info.image_coverage >= OCR_MIN_IMAGE_COVERAGE
+                  and len(page_texts.get(info.number, '').strip()) < 40):
+                ocr_pages.append(info.number)
+        if plan is None and not ''.join(page_texts.values()).strip():
+            ocr_pages = list(range(1, PDF_OCR_PAGE_BUDGET + 1))
+        
+        ocr_pages = ocr_pages[:PDF_OCR_PAGE_BUDGET]
+        self._ocr_pdf_pages(file_path, ocr_pages, page_texts)
+        
+        # No text anywhere: the remaining OCR budget goes to the skipped pages
+        if plan and not ''.join(page_texts.values()).strip():
+            skipped = [info.number for info in plan if info.mode == MODE_SKIP]
+            self._ocr_pdf_pages(file_path, skipped[:PDF_OCR_PAGE_BUDGET - len(ocr_pages)], page_texts)
+        
+        return '\n'.join(page_texts[number] for number in sorted(page_texts) if page_texts[number])
+    
+    def _ocr_pdf_pages(self, file_path: str, numbers: List[int], page_texts: Dict[int, str]):
+        """OCR the given PDF pages into page_texts"""
+        for number in numbers:
+            try:
+                for img in convert_from_path(file_path, first_page=number, last_page=number):
+                    page_texts[number] = self._ocr_image(img)
             except Exception as e:
                 print(f"OCR error: {e}")
-        
-        return text
     
-    def _read_image_ocr(self, file_path: str) -> str:
-        """Read text from image using OCR"""
-        try:
-            img = Image.open(file_path)
-            text = pytesseract.image_to_string(img)
-            return text
-        except Exception as e:
-            print(f"OCR error: {e}")
-            return ""
+    # OCR goes through the process's shared backend (pooled engines or pytesseract)
+    def _ocr_image(self, img, config: str = '') -> str:
+        return get_ocr_backend().image_to_string(img, config=config)
+    
+    def _ocr_words(self, img, config: str = '') -> Dict[str, List]:
+        return get_ocr_backend().image_to_data(img, config=config)
     
     def _extract_pattern(self, text: str, pattern_name: str) -> Dict[str, Any]:
         """Extract field using regex pattern"""
@@ -328,7 +445,7 @@ class FieldExtractor:
         last_50_lines = '\n'.join(lines[-50:])
         
         if self.nlp:
-            doc_end = self.nlp(last_50_lines)
+            doc_end = self.nlp_cache(last_50_lines)
             persons = [ent.text for ent in doc_end.ents if ent.label_ == 'PERSON']
             
             if persons:
@@ -0,0 +1,117 @@
+"""
+Protected File Serving
+Signed, expiring URLs for certificates and reports, with range requests and optional proxy offload
+"""
+
+import os
+import hmac
+import time
+import base64
+import hashlib
+import mimetypes
+from typing import Optional
+
+from flask import Blueprint, Response, request, send_file, url_for, abort
+
+UPLOAD_FOLDER = 'uploads/files'
+REPORTS_FOLDER = 'uploads/reports'
+
+# '' serves through the worker (sendfile via wsgi.file_wrapper where available);
+# 'x-accel' hands the transfer to nginx, 'x-sendfile' to Apache/lighttpd.
+FILE_OFFLOAD = os.environ.get('FILE_OFFLOAD', '').lower()
+# nginx 'internal' location mapped onto the uploads directory
+X_ACCEL_PREFIX = os.environ.get('X_ACCEL_PREFIX', '/protected/')
+
+FILE_URL_SECRET = os.environ.get('FILE_URL_SECRET', os.environ.get('SESSION_SECRET', 'dev-secret-key-change-in-production'))
+SIGNED_URL_TTL = int(os.environ.get('SIGNED_URL_TTL', '900'))
+
+# URL kind -> folder holding those files
+FILE_KINDS = {
+    'certificate': UPLOAD_FOLDER,
+    'report': REPORTS_FOLDER,
+}
+
+files_bp = Blueprint('files', __name__, url_prefix='/files')
+
+
+def _signature(kind: str, name: str, expires: int, download_name: str = '') -> str:
+    # The download name is signed too, so a link cannot be re-labelled
+    message = f"{kind}\n{name}\n{expires}\n{download_name}".encode('utf-8')
+    digest = hmac.new(FILE_URL_SECRET.encode('utf-8'), message, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:18]).decode('ascii')
+
+
+def signed_url(kind: str, name: str, ttl: int = SIGNED_URL_TTL, download_name: Optional[str] = None) -> str:
+    """
+    Time-limited URL for one stored file
+    
+    Args:
+        kind: 'certificate' or 'report'
+        name: File name inside that kind's folder
+        ttl: Seconds until the URL stops working
+        download_name: Offer the file as a download under this name
+    """
+    expires = int(time.time()) + ttl
+    params = {'expires': expires, 'sig': _signature(kind, name, expires, download_name or '')}
+    if download_name:
+        params['dl'] = download_name
+    return url_for('files.serve_signed', kind=kind, name=name, **params)
+
+
+def verify_signature(kind: str, name: str, expires: int, sig: str, download_name: Optional[str] = None) -> bool:
+    if expires < time.time():
+        return False
+    return hmac.compare_digest(_signature(kind, name, expires, download_name or ''), sig or '')
+
+
+def resolve_path(kind: str, name: str) -> Optional[str]:
+    """Path of a stored file, refusing anything outside its folder"""
+    folder = FILE_KINDS.get(kind)
+    if folder is None or not name or name != os.path.basename(name) or name.startswith('.'):
+        return None
+    path = os.path.join(folder, name)
+    return path if os.path.isfile(path) else None
+
+
+def serve_file(path: str, download_name: Optional[str] = None, max_age: int = 0):
+    """
+    Send a stored file, offloading the transfer to the front proxy when configured
+    
+    Without offload, Werkzeug answers Range and conditional requests itself.
+    """
+    mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    
+    if FILE_OFFLOAD in ('x-accel', 'x-sendfile'):
+        response = Response(mimetype=mimetype)
+        if FILE_OFFLOAD == 'x-accel':
+            # nginx resolves the internal location and handles ranges itself
+            relative = os.path.relpath(path, os.path.dirname(UPLOAD_FOLDER)).replace(os.sep, '/')
+            response.headers['X-Accel-Redirect'] = X_ACCEL_PREFIX.rstrip('/') + '/' + relative
+        else:
+            response.headers['X-Sendfile'] = os.path.abspath(path)
+        if download_name:
+            response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+    else:
+        # Stored paths are relative to the working directory, not the app root
+        response = send_file(os.path.abspath(path), mimetype=mimetype, as_attachment=bool(download_name),
+                             download_name=download_name, conditional=True)
+    
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.headers['Cache-Control'] = f"private, max-age={max_age}" if max_age else 'private, no-cache'
+    return response
+
+
+@files_bp.route('/<kind>/<name>')
+def serve_signed(kind, name):
+    """Serve a certificate or report through a signed URL (query: expires, sig, dl)"""
+    expires = request.args.get('expires', 0, type=int)
+    download_name = request.args.get('dl')
+    if not verify_signature(kind, name, expires, request.args.get('sig'), download_name):
+        abort(403)
+    
+    path = resolve_path(kind, name)
+    if path is None:
+        abort(404)
+    
+    # Clients may reuse the file until the link expires
+    return serve_file(path, download_name=download_name, max_age=max(0, expires - int(time.time())))
@@ -0,0 +1,104 @@
+"""
+HTTP Caching Helpers
+ETag/Last-Modified validators from file versions, 304 handling and a rendered page cache
+"""
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, Optional, Tuple
+
+from flask import request, make_response
+from werkzeug.http import is_resource_modified
+
+# Cache-Control per endpoint: records change on review, so clients always
+# revalidate; upload metadata is written once.
+RESULT_CACHE_CONTROL = 'private, no-cache'
+RECORD_CACHE_CONTROL = 'private, no-cache'
+UPLOAD_CACHE_CONTROL = 'private, max-age=3600'
+STATUS_CACHE_CONTROL = 'private, no-cache'
+
+RENDERED_CACHE_ENTRIES = int(os.environ.get('RENDERED_CACHE_ENTRIES', '256'))
+
+Validators = Tuple[str, datetime]
+
+
+def file_validators(path: Optional[str], *variant: str) -> Optional[Validators]:
+    """
+    ETag and Last-Modified of a stored file, from its stat only
+    
+    Records are replaced atomically on every save, so (inode, mtime, size)
+    changes with each version. Works across worker processes.
+    
+    Args:
+        path: Stored file (None or missing gives None)
+        *variant: Distinguishes representations of the same file
+    """
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    
+    version = f"{stat.st_ino}:{stat.st_mtime_ns}:{stat.st_size}:{':'.join(variant)}"
+    etag = hashlib.sha1(version.encode('utf-8')).hexdigest()[:20]
+    return etag, datetime.fromtimestamp(int(stat.st_mtime), tz=timezone.utc)
+
+
+def conditional_response(validators: Validators, cache_control: str, build: Callable):
+    """
+    304 when the client's copy is current, otherwise build() with validators set
+    
+    Args:
+        validators: (etag, last_modified) of the current version
+        cache_control: Cache-Control header value
+        build: Produces the full response (only called on a cache miss)
+    """
+    etag, last_modified = validators
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = make_response('', 304)
+    else:
+        response = make_response(build())
+        if response.status_code != 200:
+            return response
+    
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+
+class RenderedCache:
+    """
+    Small LRU of rendered pages, each tagged with the version it was rendered from
+    
+    A lookup with a newer version misses, so a record change invalidates its
+    page without any coordination between processes.
+    """
+    
+    def __init__(self, max_entries: int = RENDERED_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str, etag: str) -> Optional[str]:
+        with self._lock:
+            entry = self._pages.get(key)
+            if entry is None or entry[0] != etag:
+                return None
+            self._pages.move_to_end(key)
+            return entry[1]
+    
+    def put(self, key: str, etag: str, page: str):
+        with self._lock:
+            self._pages[key] = (etag, page)
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.max_entries:
+                self._pages.popitem(last=False)
+    
+    def invalidate(self, key: str):
+        with self._lock:
+            self._pages.pop(key, None)
@@ -0,0 +1,366 @@
+"""
+Persisted Course Index Store
+On-disk, memory-mapped format for CourseIndex so forked workers share pages
+
+A loaded index keeps no per-worker copies of its tables: strings, the term
+vocabulary and keyword postings are all read straight from the mapped arrays.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+from collections.abc import Mapping, Sequence
+from datetime import datetime
+from typing import List, Dict, Iterable, Tuple, Optional
+
+from course_index import CourseIndex
+from keyword_index import normalize_tokens
+from ann_index import IVFIndex
+
+INDEX_FORMAT_VERSION = 2
+MANIFEST_FILE = 'manifest.json'
+
+
+def vector_model_name(nlp) -> str:
+    """Identifies the pipeline that produced the course vectors"""
+    if not nlp:
+        return 'none'
+    meta = getattr(nlp, 'meta', {}) or {}
+    return f"{meta.get('lang', 'xx')}_{meta.get('name', 'pipeline')}-{meta.get('version', '0')}"
+
+
+def _encode_strings(values: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """String table as a UTF-8 blob plus offsets"""
+    encoded = [v.encode('utf-8') for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    blob = np.frombuffer(b''.join(encoded), dtype=np.uint8) if encoded else np.zeros(0, dtype=np.uint8)
+    return blob, offsets
+
+
+def _sorted_keys(values: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Fixed-width byte keys in sorted order, plus the position each key came from"""
+    encoded = [v.encode('utf-8') for v in values]
+    order = sorted(range(len(encoded)), key=encoded.__getitem__)
+    width = max((len(e) for e in encoded), default=0) or 1
+    keys = np.array([encoded[i] for i in order], dtype=f'S{width}')
+    return keys, np.array(order, dtype=np.int64)
+
+
+class StringTable(Sequence):
+    """Strings over a mapped UTF-8 blob and offsets, decoded on access"""
+    
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+    
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+    
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('string table index out of range')
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode('utf-8')
+
+
+class RaggedStrings(Sequence):
+    """Per-course string lists (CSR rows over a StringTable)"""
+    
+    def __init__(self, strings: StringTable, indptr: np.ndarray):
+        self.strings = strings
+        self.indptr = indptr
+    
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+    
+    def __getitem__(self, row) -> List[str]:
+        if not 0 <= row < len(self):
+            raise IndexError('row index out of range')
+        return self.strings[self.indptr[row]:self.indptr[row + 1]]
+
+
+class TermSets(Sequence):
+    """Per-course word sets from the course -> terms CSR"""
+    
+    def __init__(self, terms: StringTable, indptr: np.ndarray, term_ids: np.ndarray):
+        self.terms = terms
+        self.indptr = indptr
+        self.term_ids = term_ids
+    
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+    
+    def __getitem__(self, row) -> frozenset:
+        if not 0 <= row < len(self):
+            raise IndexError('row index out of range')
+        return frozenset(self.terms[t] for t in self.term_ids[self.indptr[row]:self.indptr[row + 1]])
+
+
+class SortedLookup(Mapping):
+    """String -> id over sorted fixed-width keys, found with np.searchsorted"""
+    
+    def __init__(self, sorted_keys: np.ndarray, ids: np.ndarray):
+        self.sorted_keys = sorted_keys
+        self.ids = ids
+    
+    def __len__(self) -> int:
+        return len(self.sorted_keys)
+    
+    def __iter__(self):
+        for key in self.sorted_keys:
+            yield key.decode('utf-8')
+    
+    def __getitem__(self, value: str) -> int:
+        found = self.lookup([value])
+        if not len(found):
+            raise KeyError(value)
+        return int(found[0])
+    
+    def lookup(self, values: Iterable[str]) -> np.ndarray:
+        """Ids of the values present (absent values are skipped)"""
+        width = self.sorted_keys.dtype.itemsize
+        # Longer values cannot be keys (and would be truncated by the cast)
+        encoded = [e for e in (v.encode('utf-8') for v in values) if len(e) <= width]
+        if not encoded or not len(self.sorted_keys):
+            return np.zeros(0, dtype=np.int64)
+        query = np.array(encoded, dtype=self.sorted_keys.dtype)
+        positions = np.minimum(np.searchsorted(self.sorted_keys, query), len(self.sorted_keys) - 1)
+        return np.asarray(self.ids[positions[self.sorted_keys[positions] == query]], dtype=np.int64)
+
+
+class MappedKeywordIndex:
+    """KeywordIndex.match over mapped postings (grams looked up by binary search)"""
+    
+    def __init__(self, course_ids: StringTable, course_keywords: RaggedStrings, grams: SortedLookup,
+                 gram_indptr: np.ndarray, gram_course: np.ndarray, gram_keyword_pos: np.ndarray,
+                 max_ngram: int):
+        self.course_ids = course_ids
+        self.course_keywords = course_keywords
+        self.grams = grams
+        self.gram_indptr = gram_indptr
+        self.gram_course = gram_course
+        self.gram_keyword_pos = gram_keyword_pos
+        self.max_ngram = max_ngram
+    
+    def match_tokens(self, tokens: List[str]) -> Dict[str, List[str]]:
+        """Same result as KeywordIndex.match_tokens"""
+        grams = {
+            ' '.join(tokens[start:start + size])
+            for start in range(len(tokens))
+            for size in range(1, min(self.max_ngram, len(tokens) - start) + 1)
+        }
+        
+        hits: Dict[int, Dict[int, str]] = {}
+        for gram in self.grams.lookup(grams):
+            for i in range(self.gram_indptr[gram], self.gram_indptr[gram + 1]):
+                course, position = int(self.gram_course[i]), int(self.gram_keyword_pos[i])
+                if position not in hits.setdefault(course, {}):
+                    hits[course][position] = self.course_keywords[course][position]
+        
+        return {
+            self.course_ids[course]: [matched[pos] for pos in sorted(matched)]
+            for course, matched in hits.items()
+        }
+    
+    def match(self, text: str) -> Dict[str, List[str]]:
+        return self.match_tokens(normalize_tokens(text))
+
+
+def _index_arrays(index: CourseIndex) -> Dict[str, np.ndarray]:
+    """Flatten a CourseIndex into named arrays"""
+    arrays = {
+        'vectors': np.ascontiguousarray(index.vectors, dtype=np.float32),
+        'vector_norms': np.asarray(index.vector_norms, dtype=np.float32),
+        'term_indptr': np.asarray(index.term_indptr, dtype=np.int64),
+        'term_courses': np.asarray(index.term_courses, dtype=np.int64),
+        'course_word_counts': np.asarray(index.course_word_counts, dtype=np.int64),
+        'course_term_indptr': np.asarray(index.course_term_indptr, dtype=np.int64),
+        'course_term_ids': np.asarray(index.course_term_ids, dtype=np.int64),
+    }
+    
+    keywords = [kw for course in index.course_keywords for kw in course]
+    keyword_indptr = np.zeros(len(index.course_keywords) + 1, dtype=np.int64)
+    np.cumsum([len(course) for course in index.course_keywords], out=keyword_indptr[1:])
+    
+    # Keyword postings CSR: gram -> (course position, keyword position), grams in key order
+    position_of = {cid: i for i, cid in enumerate(index.course_ids)}
+    postings = index.keyword_index.postings
+    gram_keys, gram_order = _sorted_keys([' '.join(g) for g in postings])
+    grams = list(postings)
+    posting_lists = [postings[grams[i]] for i in gram_order]
+    gram_indptr = np.zeros(len(grams) + 1, dtype=np.int64)
+    np.cumsum([len(p) for p in posting_lists], out=gram_indptr[1:])
+    
+    for name, values in [('course_ids', index.course_ids), ('course_titles', index.course_titles),
+                         ('terms', index.terms), ('keywords', keywords)]:
+        arrays[f'{name}_blob'], arrays[f'{name}_offsets'] = _encode_strings(values)
+    
+    # Sorted keys replace the vocabulary and course position dicts
+    arrays['term_keys'], arrays['term_key_ids'] = _sorted_keys(index.terms)
+    arrays['course_keys'], arrays['course_key_ids'] = _sorted_keys(index.course_ids)
+    arrays['gram_keys'] = gram_keys
+    arrays['keyword_indptr'] = keyword_indptr
+    arrays['gram_indptr'] = gram_indptr
+    arrays['gram_course'] = np.array([position_of[c] for p in posting_lists for c, _, _ in p], dtype=np.int64)
+    arrays['gram_keyword_pos'] = np.array([pos for p in posting_lists for _, pos, _ in p], dtype=np.int64)
+    return arrays
+
+
+def _sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def save_course_index(index: CourseIndex, folder: str, catalogue_checksum: str):
+    """
+    Write a CourseIndex as raw arrays plus a manifest
+    
+    The index is written to a temporary folder and renamed into place, so
+    readers only ever see complete indexes. Checksums are computed here, once;
+    loads compare sizes and modification times (see load_course_index).
+    """
+    parent = os.path.dirname(folder) or '.'
+    os.makedirs(parent, exist_ok=True)
+    # Unique per writer: threads of one worker may build the same index
+    tmp_folder = tempfile.mkdtemp(prefix=os.path.basename(folder) + '.tmp-', dir=parent)
+    
+    manifest = {
+        'format_version': INDEX_FORMAT_VERSION,
+        'catalogue_checksum': catalogue_checksum,
+        'vector_model': vector_model_name(index.nlp),
+        'created_at': datetime.now().isoformat(),
+        'course_count': len(index),
+        'max_ngram': index.keyword_index.max_ngram,
+        'ann': index.ann is not None,
+        'arrays': {},
+    }
+    for name, array in _index_arrays(index).items():
+        path = os.path.join(tmp_folder, f"{name}.bin")
+        array.tofile(path)
+        manifest['arrays'][name] = {
+            'dtype': array.dtype.str,
+            'shape': list(array.shape),
+            'bytes': int(array.nbytes),
+            'mtime_ns': os.stat(path).st_mtime_ns,
+            'sha256': _sha256_file(path),
+        }
+    
+    if index.ann is not None:
+        index.ann.save(os.path.join(tmp_folder, 'ann'))
+    
+    with open(os.path.join(tmp_folder, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    
+    if os.path.exists(folder):
+        # Stale or corrupt index: move it aside (workers mapping it keep their pages)
+        stale_folder = f"{tmp_folder}.stale"
+        try:
+            os.rename(folder, stale_folder)
+            shutil.rmtree(stale_folder, ignore_errors=True)
+        except OSError:
+            pass
+    
+    try:
+        os.rename(tmp_folder, folder)
+    except OSError:
+        # Another worker published the same index first
+        shutil.rmtree(tmp_folder, ignore_errors=True)
+
+
+def _open_array(folder: str, name: str, spec: Dict, verify: bool) -> np.ndarray:
+    path = os.path.join(folder, f"{name}.bin")
+    stat = os.stat(path)
+    if stat.st_size != spec['bytes']:
+        raise ValueError(f"{name}: size mismatch")
+    # Files are never rewritten in place, so any change shows in the mtime
+    if stat.st_mtime_ns != spec['mtime_ns']:
+        raise ValueError(f"{name}: modified after publishing")
+    if verify and _sha256_file(path) != spec['sha256']:
+        raise ValueError(f"{name}: checksum mismatch")
+    
+    shape = tuple(spec['shape'])
+    if spec['bytes'] == 0:
+        # numpy cannot map an empty file
+        return np.zeros(shape, dtype=np.dtype(spec['dtype']))
+    return np.memmap(path, dtype=np.dtype(spec['dtype']), mode='r', shape=shape)
+
+
+def load_course_index(folder: str, nlp=None, catalogue_checksum: Optional[str] = None,
+                      verify: bool = False) -> Optional[CourseIndex]:
+    """
+    Load a persisted CourseIndex with its arrays memory-mapped read-only
+    
+    Every table stays in the mapped files, so forked workers share them and
+    a load costs no more than opening the arrays.
+    
+    Args:
+        folder: Index folder written by save_course_index
+        nlp: spaCy pipeline used for query vectors
+        catalogue_checksum: Expected catalogue checksum (skip check if None)
+        verify: Also re-hash every array against its SHA-256 (reads the whole index)
+    
+    Returns:
+        CourseIndex, or None if the index is missing, stale or corrupt
+    """
+    manifest_path = os.path.join(folder, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    
+    try:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        if manifest.get('format_version') != INDEX_FORMAT_VERSION:
+            return None
+        if catalogue_checksum and manifest.get('catalogue_checksum') != catalogue_checksum:
+            return None
+        if manifest.get('vector_model') != vector_model_name(nlp):
+            return None
+        
+        arrays = {name: _open_array(folder, name, spec, verify) for name, spec in manifest['arrays'].items()}
+        ann = IVFIndex.load(os.path.join(folder, 'ann')) if manifest['ann'] else None
+        if manifest['ann'] and ann is None:
+            raise ValueError("ann: missing or corrupt")
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Course index load error ({folder}): {e}")
+        return None
+    
+    strings = {
+        name: StringTable(arrays[f'{name}_blob'], arrays[f'{name}_offsets'])
+        for name in ['course_ids', 'course_titles', 'terms', 'keywords']
+    }
+    course_ids = strings['course_ids']
+    course_keywords = RaggedStrings(strings['keywords'], arrays['keyword_indptr'])
+    
+    return CourseIndex.from_parts(
+        nlp=nlp,
+        course_ids=course_ids,
+        course_titles=strings['course_titles'],
+        course_keywords=course_keywords,
+        keyword_index=MappedKeywordIndex(
+            course_ids, course_keywords, SortedLookup(arrays['gram_keys'], np.arange(len(arrays['gram_keys']))),
+            arrays['gram_indptr'], arrays['gram_course'], arrays['gram_keyword_pos'], manifest['max_ngram'],
+        ),
+        terms=strings['terms'],
+        vocab=SortedLookup(arrays['term_keys'], arrays['term_key_ids']),
+        term_indptr=arrays['term_indptr'],
+        term_courses=arrays['term_courses'],
+        course_word_counts=arrays['course_word_counts'],
+        course_term_indptr=arrays['course_term_indptr'],
+        course_term_ids=arrays['course_term_ids'],
+        vectors=arrays['vectors'],
+        vector_norms=arrays['vector_norms'],
+        ann=ann,
+        mapped_nbytes=sum(int(spec['bytes']) for spec in manifest['arrays'].values()),
+        _course_word_sets=TermSets(strings['terms'], arrays['course_term_indptr'], arrays['course_term_ids']),
+        _course_positions=SortedLookup(arrays['course_keys'], arrays['course_key_ids']),
+    )
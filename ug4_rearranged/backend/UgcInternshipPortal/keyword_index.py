@@ -0,0 +1,62 @@
+"""
+Inverted Keyword Index
+Maps normalized keyword n-grams to the courses that list them
+"""
+
+import re
+from typing import List, Dict, Tuple
+
+WORD_RE = re.compile(r'[^\W_]+')
+
+
+def normalize_tokens(text: str) -> List[str]:
+    """Lowercase word tokens, split at word boundaries (underscores included)"""
+    return WORD_RE.findall(text.lower())
+
+
+class KeywordIndex:
+    """Inverted index from keyword n-gram to (course, keyword) postings"""
+    
+    def __init__(self, curriculum_db: Dict[str, Dict]):
+        self.course_ids = list(curriculum_db.keys())
+        self.max_ngram = 1
+        
+        # n-gram tuple -> list of (course_id, keyword position, keyword)
+        self.postings: Dict[Tuple[str, ...], List[Tuple[str, int, str]]] = {}
+        
+        for course_id in self.course_ids:
+            for position, keyword in enumerate(curriculum_db[course_id]['keywords']):
+                gram = tuple(normalize_tokens(keyword))
+                if not gram:
+                    continue
+                self.postings.setdefault(gram, []).append((course_id, position, keyword))
+                self.max_ngram = max(self.max_ngram, len(gram))
+    
+    def match_tokens(self, tokens: List[str]) -> Dict[str, List[str]]:
+        """
+        Find every course keyword present in a token stream
+        
+        Args:
+            tokens: Normalized tokens of the submission
+        
+        Returns:
+            Mapping of course_id to matched keywords (in course keyword order)
+        """
+        hits: Dict[str, Dict[int, str]] = {}
+        
+        for start in range(len(tokens)):
+            for size in range(1, self.max_ngram + 1):
+                if start + size > len(tokens):
+                    break
+                gram = tuple(tokens[start:start + size])
+                for course_id, position, keyword in self.postings.get(gram, ()):
+                    hits.setdefault(course_id, {})[position] = keyword
+        
+        return {
+            course_id: [matched[pos] for pos in sorted(matched)]
+            for course_id, matched in hits.items()
+        }
+    
+    def match(self, text: str) -> Dict[str, List[str]]:
+        """Find every course keyword present in a text"""
+        return self.match_tokens(normalize_tokens(text))
@@ -0,0 +1,379 @@
+"""
+NLP Result Cache
+Memoizes spaCy parses by normalized-text hash and pipeline version (memory + disk LRU)
+
+Parses made on behalf of a submission are tagged with its id (see cache_owner),
+so deleting the submission's data can purge them (see purge_owners).
+"""
+
+import os
+import json
+import hashlib
+import threading
+import unicodedata
+import numpy as np
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterable, Optional, NamedTuple
+
+NLP_CACHE_FOLDER = os.environ.get('NLP_CACHE_FOLDER', 'uploads/nlp_cache')
+NLP_CACHE_MAX_ENTRIES = int(os.environ.get('NLP_CACHE_MAX_ENTRIES', '2048'))
+NLP_CACHE_DISK_MB = float(os.environ.get('NLP_CACHE_DISK_MB', '64'))
+
+# Owner id(s) whose text is being parsed on this thread
+_owners = threading.local()
+
+
+@contextmanager
+def cache_owner(owner_id: str):
+    """
+    Tag parses cached on this thread with the upload or internship they belong to
+    
+    Every entry read or written inside the block is listed under the owner,
+    so purge_owners() can remove it when the owner's data is deleted.
+    """
+    previous = getattr(_owners, 'ids', ())
+    previous_tagged = getattr(_owners, 'tagged', None)
+    _owners.ids = previous + (owner_id,)
+    # Keys already listed in this block (the matcher parses one text per course)
+    _owners.tagged = set()
+    try:
+        yield
+    finally:
+        _owners.ids = previous
+        _owners.tagged = previous_tagged
+
+
+def _entry_path(folder: str, key: str) -> str:
+    return os.path.join(folder, key[:2], f"{key}.json")
+
+
+def _owner_file(folder: str, owner_id: str) -> str:
+    digest = hashlib.sha256(owner_id.encode('utf-8')).hexdigest()
+    return os.path.join(folder, 'owners', f"{digest}.keys")
+
+
+class CachedToken(NamedTuple):
+    text: str
+    lemma_: str
+    is_stop: bool
+
+
+class CachedSpan(NamedTuple):
+    text: str
+    label_: str
+
+
+class ParsedDoc:
+    """
+    Serializable subset of a spaCy Doc
+    
+    Supports what the extractor, tokenizer and matcher read: token text,
+    lemmas and stop flags, entities, noun chunks, the document vector and
+    Doc.similarity.
+    """
+    
+    def __init__(self, tokens: List[CachedToken], ents: List[CachedSpan],
+                 noun_chunks: List[CachedSpan], vector: np.ndarray):
+        self.tokens = tokens
+        self.ents = ents
+        self.noun_chunks = noun_chunks
+        self.vector = vector
+    
+    def __iter__(self):
+        return iter(self.tokens)
+    
+    def __len__(self) -> int:
+        return len(self.tokens)
+    
+    def similarity(self, other: 'ParsedDoc') -> float:
+        """Cosine similarity of document vectors (0.0 if either is empty)"""
+        norm = np.linalg.norm(self.vector) * np.linalg.norm(other.vector)
+        if not self.vector.size or not other.vector.size or norm == 0:
+            return 0.0
+        return float(np.dot(self.vector, other.vector) / norm)
+    
+    @classmethod
+    def from_doc(cls, doc) -> 'ParsedDoc':
+        try:
+            noun_chunks = [CachedSpan(chunk.text, chunk.label_) for chunk in doc.noun_chunks]
+        except ValueError:
+            # Pipeline without a dependency parser
+            noun_chunks = []
+        return cls(
+            [CachedToken(t.text, t.lemma_, bool(t.is_stop)) for t in doc],
+            [CachedSpan(ent.text, ent.label_) for ent in doc.ents],
+            noun_chunks,
+            np.asarray(doc.vector, dtype=np.float32),
+        )
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'tokens': [list(t) for t in self.tokens],
+            'ents': [list(e) for e in self.ents],
+            'noun_chunks': [list(c) for c in self.noun_chunks],
+            'vector': self.vector.tolist(),
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ParsedDoc':
+        return cls(
+            [CachedToken(*t) for t in data['tokens']],
+            [CachedSpan(*e) for e in data['ents']],
+            [CachedSpan(*c) for c in data['noun_chunks']],
+            np.asarray(data['vector'], dtype=np.float32),
+        )
+
+
+def normalize_text(text: str) -> str:
+    """Normalization applied before hashing and parsing (NFC, LF line endings, trimmed)"""
+    return unicodedata.normalize('NFC', text).replace('\r\n', '\n').strip()
+
+
+def pipeline_version(nlp) -> str:
+    """Identifies the pipeline (and spaCy release) that produced a parse"""
+    import spacy
+    meta = getattr(nlp, 'meta', {}) or {}
+    components = ','.join(getattr(nlp, 'pipe_names', []))
+    return (f"{meta.get('lang', 'xx')}_{meta.get('name', 'pipeline')}-{meta.get('version', '0')}"
+            f"/spacy-{spacy.__version__}/{components}")
+
+
+class NLPCache:
+    """
+    Bounded two-level cache of parses for one spaCy pipeline
+    
+    Entries live in an in-memory LRU and in JSON files on disk (shared by
+    worker processes); the disk level is trimmed oldest-access first once it
+    exceeds its budget.
+    """
+    
+    def __init__(self, nlp, folder: str = NLP_CACHE_FOLDER, max_entries: int = NLP_CACHE_MAX_ENTRIES,
+                 disk_mb: float = NLP_CACHE_DISK_MB):
+        self.nlp = nlp
+        self.version = pipeline_version(nlp)
+        self.folder = folder
+        self.max_entries = max_entries
+        self.disk_budget = int(disk_mb * 1024 * 1024)
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+    
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.version}\0{normalize_text(text)}".encode('utf-8')).hexdigest()
+    
+    def _path(self, key: str) -> str:
+        return _entry_path(self.folder, key)
+    
+    def __call__(self, text: str) -> ParsedDoc:
+        """Parse text, reusing a cached result when available"""
+        key = self.key(text)
+        self._tag_owners(key)
+        
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+        
+        parsed = self._read_disk(key)
+        if parsed is not None:
+            with self._lock:
+                self.disk_hits += 1
+        else:
+            parsed = ParsedDoc.from_doc(self.nlp(normalize_text(text)))
+            with self._lock:
+                self.misses += 1
+            self._write_disk(key, parsed)
+        
+        self._remember(key, parsed)
+        return parsed
+    
+    def pipe(self, texts: List[str]) -> List[ParsedDoc]:
+        return [self(text) for text in texts]
+    
+    def _remember(self, key: str, parsed: ParsedDoc):
+        with self._lock:
+            self._memory[key] = parsed
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+    
+    def _tag_owners(self, key: str):
+        owner_ids = getattr(_owners, 'ids', ())
+        if not owner_ids or not self.disk_budget or key in _owners.tagged:
+            return
+        _owners.tagged.add(key)
+        for owner_id in owner_ids:
+            path = _owner_file(self.folder, owner_id)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'a', encoding='utf-8') as f:
+                    f.write(key + '\n')
+            except OSError as e:
+                print(f"NLP cache owner tag error: {e}")
+    
+    def forget(self, keys: Iterable[str]):
+        """Drop entries from the memory level (disk files are removed by purge_owners)"""
+        with self._lock:
+            for key in keys:
+                self._memory.pop(key, None)
+            # Recounted on the next write
+            self._disk_bytes = None
+    
+    def _read_disk(self, key: str) -> Optional[ParsedDoc]:
+        if not self.disk_budget:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            # Access time drives disk eviction
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        if data.get('pipeline') != self.version:
+            return None
+        return ParsedDoc.from_dict(data)
+    
+    def _write_disk(self, key: str, parsed: ParsedDoc):
+        if not self.disk_budget:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'pipeline': self.version, **parsed.to_dict()}, f)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"NLP cache write error: {e}")
+            return
+        
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._scan_disk()[1]
+            else:
+                self._disk_bytes += size
+            over_budget = self._disk_bytes > self.disk_budget
+        if over_budget:
+            self._evict_disk()
+    
+    def _scan_disk(self):
+        entries, total = [], 0
+        for root, _, files in os.walk(self.folder):
+            for name in files:
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        return entries, total
+    
+    def _evict_disk(self):
+        """Remove least recently used files until the disk level is at 90% of budget"""
+        entries, total = self._scan_disk()
+        target = int(self.disk_budget * 0.9)
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        with self._lock:
+            self._disk_bytes = total
+    
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and cache sizes"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'pipeline': self.version,
+                'lookups': lookups,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                'memory_entries': len(self._memory),
+                'disk_bytes': self._disk_bytes,
+            }
+
+
+_caches: Dict[str, NLPCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_nlp_cache(nlp) -> Optional[NLPCache]:
+    """
+    Process-wide cache for a pipeline
+    
+    Modules that load the same model share one cache. Returns None when
+    spaCy is unavailable.
+    """
+    if not nlp:
+        return None
+    version = pipeline_version(nlp)
+    with _caches_lock:
+        if version not in _caches:
+            _caches[version] = NLPCache(nlp)
+        return _caches[version]
+
+
+def purge_owners(owner_ids: Iterable[str], folder: Optional[str] = None) -> int:
+    """
+    Delete every cached parse tagged with one of the owners (student data deletion)
+    
+    Disk entries go for all workers; memory entries only in this process
+    (other workers drop theirs as their LRU turns over).
+    
+    Returns:
+        Number of disk entries removed
+    """
+    folder = folder or NLP_CACHE_FOLDER
+    with _caches_lock:
+        caches = [cache for cache in _caches.values() if cache.folder == folder]
+    
+    removed = 0
+    for owner_id in owner_ids:
+        if not owner_id:
+            continue
+        path = _owner_file(folder, owner_id)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                keys = set(f.read().split())
+        except OSError:
+            continue
+        for cache in caches:
+            cache.forget(keys)
+        for key in keys:
+            try:
+                os.remove(_entry_path(folder, key))
+                removed += 1
+            except OSError:
+                pass
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    return removed
+
+
+def nlp_cache_stats() -> List[Dict[str, Any]]:
+    """Statistics of every cache in this process"""
+    with _caches_lock:
+        caches = list(_caches.values())
+    return [cache.stats() for cache in caches]
@@ -0,0 +1,254 @@
+"""
+OCR Backends
+pytesseract (a tesseract process per call) or a pool of warmed in-process Tesseract engines
+"""
+
+import os
+import re
+import abc
+import queue
+import threading
+from typing import Dict, List, Optional
+
+import pytesseract
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+# auto: pooled engines when tesserocr is installed, pytesseract otherwise
+OCR_BACKEND = os.environ.get('OCR_BACKEND', 'auto')
+OCR_POOL_SIZE = int(os.environ.get('OCR_POOL_SIZE', str(min(4, os.cpu_count() or 1))))
+OCR_LANG = os.environ.get('OCR_LANG', 'eng')
+TESSDATA_PREFIX = os.environ.get('TESSDATA_PREFIX')
+
+_PSM = re.compile(r'--psm\s+(\d+)')
+
+
+class OCRBackend(abc.ABC):
+    """Interface used by the extractor; mirrors the pytesseract calls it needs"""
+    
+    name = 'base'
+    
+    @abc.abstractmethod
+    def image_to_string(self, img, config: str = '') -> str:
+        """Recognised text of an image"""
+    
+    @abc.abstractmethod
+    def image_to_data(self, img, config: str = '') -> Dict[str, List]:
+        """Word boxes in pytesseract's image_to_data dict layout"""
+
+
+class PytesseractBackend(OCRBackend):
+    """One tesseract process per call, images exchanged through temp files"""
+    
+    name = 'pytesseract'
+    
+    def image_to_string(self, img, config: str = '') -> str:
+        return pytesseract.image_to_string(img, lang=OCR_LANG, config=config)
+    
+    def image_to_data(self, img, config: str = '') -> Dict[str, List]:
+        return pytesseract.image_to_data(img, lang=OCR_LANG, config=config, output_type=pytesseract.Output.DICT)
+
+
+class TesserocrPoolBackend(OCRBackend):
+    """
+    Pool of Tesseract engines kept loaded in this process
+    
+    Each engine loads its language data once; images are handed over as
+    in-memory buffers. A call borrows an engine for its duration, so up to
+    pool_size pages are recognised in parallel (tesserocr releases the GIL).
+    Configs other than --psm are passed to the fallback backend.
+    """
+    
+    name = 'tesserocr'
+    
+    def __init__(self, pool_size: int = OCR_POOL_SIZE, lang: str = OCR_LANG,
+                 fallback: Optional[OCRBackend] = None):
+        if tesserocr is None:
+            raise RuntimeError("tesserocr is not installed")
+        self.pool_size = max(1, pool_size)
+        self.lang = lang
+        self.fallback = fallback or PytesseractBackend()
+        self._engines = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+    
+    def _new_engine(self):
+        kwargs = {'lang': self.lang, 'psm': tesserocr.PSM.AUTO}
+        if TESSDATA_PREFIX:
+            kwargs['path'] = TESSDATA_PREFIX
+        return tesserocr.PyTessBaseAPI(**kwargs)
+    
+    def warm(self, count: Optional[int] = None):
+        """Create engines now (all of them by default) rather than on first use"""
+        target = self.pool_size if count is None else min(count, self.pool_size)
+        with self._lock:
+            while self._created < target:
+                self._engines.put(self._new_engine())
+                self._created += 1
+    
+    def _acquire(self):
+        try:
+            return self._engines.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.pool_size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return self._new_engine()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        return self._engines.get()
+    
+    def _run(self, img, config, read):
+        engine = self._acquire()
+        try:
+            psm = _PSM.search(config)
+            engine.SetPageSegMode(int(psm.group(1)) if psm else tesserocr.PSM.AUTO)
+            if img.mode not in ('1', 'L', 'RGB', 'RGBA'):
+                img = img.convert('RGB')
+            engine.SetImage(img)
+            return read(engine)
+        finally:
+            engine.Clear()
+            self._engines.put(engine)
+    
+    def _supported(self, config: str) -> bool:
+        return not _PSM.sub('', config).strip()
+    
+    def image_to_string(self, img, config: str = '') -> str:
+        if not self._supported(config):
+            return self.fallback.image_to_string(img, config=config)
+        return self._run(img, config, lambda engine: engine.GetUTF8Text())
+    
+    def image_to_data(self, img, config: str = '') -> Dict[str, List]:
+        if not self._supported(config):
+            return self.fallback.image_to_data(img, config=config)
+        return self._run(img, config, _word_boxes)
+    
+    def close(self):
+        while True:
+            try:
+                self._engines.get_nowait().End()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
+
+
+def _word_boxes(engine) -> Dict[str, List]:
+    data = {key: [] for key in ('level', 'block_num', 'par_num', 'line_num', 'word_num',
+                                'left', 'top', 'width', 'height', 'conf', 'text')}
+    engine.Recognize()
+    iterator = engine.GetIterator()
+    if iterator is None:
+        return data
+    
+    RIL = tesserocr.RIL
+    block = par = line = word = 0
+    for word_iter in tesserocr.iterate_level(iterator, RIL.WORD):
+        if word_iter.IsAtBeginningOf(RIL.BLOCK):
+            block, par, line, word = block + 1, 0, 0, 0
+        if word_iter.IsAtBeginningOf(RIL.PARA):
+            par, line, word = par + 1, 0, 0
+        if word_iter.IsAtBeginningOf(RIL.TEXTLINE):
+            line, word = line + 1, 0
+        word += 1
+        box = word_iter.BoundingBox(RIL.WORD)
+        if box is None:
+            continue
+        left, top, right, bottom = box
+        data['level'].append(5)
+        data['block_num'].append(block)
+        data['par_num'].append(par)
+        data['line_num'].append(line)
+        data['word_num'].append(word)
+        data['left'].append(left)
+        data['top'].append(top)
+        data['width'].append(right - left)
+        data['height'].append(bottom - top)
+        data['conf'].append(word_iter.Confidence(RIL.WORD))
+        data['text'].append(word_iter.GetUTF8Text(RIL.WORD) or '')
+    return data
+
+
+_backend = None
+_backend_pid = None
+_backend_lock = threading.Lock()
+
+
+def get_ocr_backend() -> OCRBackend:
+    """
+    Backend of this process, chosen by OCR_BACKEND
+    
+    Created on the first OCR call in each process, so engines are never
+    loaded before a fork and shared by worker processes. Falls back to
+    pytesseract if engines cannot load.
+    """
+    global _backend, _backend_pid
+    
+    with _backend_lock:
+        if _backend is None or _backend_pid != os.getpid():
+            _backend = _create_backend(OCR_BACKEND)
+            _backend_pid = os.getpid()
+        return _backend
+
+
+def _create_backend(choice: str) -> OCRBackend:
+    if choice in ('auto', 'tesserocr') and tesserocr is not None:
+        try:
+            backend = TesserocrPoolBackend()
+            # One engine up front proves the language data loads
+            backend.warm(1)
+            return backend
+        except Exception as e:
+            print(f"tesserocr backend unavailable, using pytesseract: {e}")
+    elif choice == 'tesserocr':
+        print("tesserocr is not installed, using pytesseract")
+    return PytesseractBackend()
+
+
+if __name__ == '__main__':
+    # Per-page overhead of each backend: python ocr_backend.py [pages]
+    import sys
+    import time
+    from PIL import Image, ImageDraw
+    
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    page = Image.new('L', (1240, 1754), 255)
+    draw = ImageDraw.Draw(page)
+    for i, line in enumerate(['CERTIFICATE OF INTERNSHIP', 'This is to certify that Asha Rao',
+                              'has completed an internship from 01/06/2024 to 31/07/2024',
+                              'at ACME Technologies Pvt Ltd (240 hours)']):
+        draw.text((120, 300 + i * 60), line, fill=0)
+    blank = Image.new('L', (64, 64), 255)
+    
+    backends = [PytesseractBackend()]
+    if tesserocr is not None:
+        pool = TesserocrPoolBackend(pool_size=1)
+        pool.warm()
+        backends.append(pool)
+    else:
+        print("tesserocr not installed: only pytesseract is measured")
+    
+    for backend in backends:
+        # A blank 64x64 image is nearly free to recognise: its time is the call overhead
+        for label, image in (('overhead', blank), ('page', page)):
+            try:
+                backend.image_to_string(image)
+                start = time.perf_counter()
+                for _ in range(pages):
+                    backend.image_to_string(image)
+                elapsed = (time.perf_counter() - start) / pages * 1000
+                print(f"{backend.name:>12} {label:>8}: {elapsed:8.2f} ms/page")
+            except Exception as e:
+                print(f"{backend.name:>12} {label:>8}: failed ({e})")
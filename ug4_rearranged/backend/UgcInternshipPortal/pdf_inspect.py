@@ -0,0 +1,161 @@
+"""
+PDF Pre-inspection
+Cheap per-page look at content streams to choose text extraction, OCR or skipping
+"""
+
+import os
+import re
+from typing import List, NamedTuple, Optional
+
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdftypes import resolve1, PDFStream
+from pdfminer.psparser import PSLiteral
+
+# Pages looked at per upload; certificates are on the first pages, oversized
+# uploads (appended logbooks, scans of whole reports) are cut off here.
+PDF_PAGE_BUDGET = int(os.environ.get('PDF_PAGE_BUDGET', '6'))
+# Of those, pages that may be OCR'd (the expensive path)
+PDF_OCR_PAGE_BUDGET = int(os.environ.get('PDF_OCR_PAGE_BUDGET', '2'))
+# Share of the page covered by images for a page to count as scanned
+OCR_MIN_IMAGE_COVERAGE = float(os.environ.get('OCR_MIN_IMAGE_COVERAGE', '0.3'))
+
+MODE_TEXT = 'text'
+MODE_OCR = 'ocr'
+MODE_SKIP = 'skip'
+
+
+class PageInfo(NamedTuple):
+    number: int           # 1-based
+    text_ops: int         # text-showing operators in the content streams
+    fonts: int
+    image_coverage: float  # fraction of the page area painted by images
+    mode: str
+
+
+_STRING = re.compile(rb'\((?:\\.|[^\\()])*\)|<[0-9A-Fa-f\s]*>')
+# Inline image (BI dict ID data EI); the binary data may hold anything
+_INLINE_IMAGE = re.compile(rb'\bBI\b.*?\bID\s.*?\bEI\b', re.S)
+_TOKEN = re.compile(rb'/[^\s/\[\]()<>{}%]+|[-+]?(?:\d+\.?\d*|\.\d+)|[A-Za-z\'"*]+|\[|\]')
+_TEXT_OPERATORS = {b'Tj', b'TJ', b"'", b'"'}
+_MAX_FORM_DEPTH = 3
+
+
+def _multiply(m, n):
+    a1, b1, c1, d1, e1, f1 = m
+    a2, b2, c2, d2, e2, f2 = n
+    return (a1 * a2 + b1 * c2, a1 * b2 + b1 * d2, c1 * a2 + d1 * c2, c1 * b2 + d1 * d2,
+            e1 * a2 + f1 * c2 + e2, e1 * b2 + f1 * d2 + f2)
+
+
+def _name(value) -> str:
+    value = resolve1(value)
+    if isinstance(value, PSLiteral):
+        return value.name if isinstance(value.name, str) else value.name.decode('latin-1')
+    return str(value)
+
+
+class _PageScan:
+    """Counts text operators and image area (XObject and inline) across a page and its form XObjects"""
+    
+    def __init__(self):
+        self.text_ops = 0
+        self.fonts = 0
+        self.image_area = 0.0
+    
+    def scan(self, data: bytes, resources, ctm=(1, 0, 0, 1, 0, 0), depth=0):
+        resources = resolve1(resources) or {}
+        self.fonts += len(resolve1(resources.get('Font')) or {})
+        xobjects = resolve1(resources.get('XObject')) or {}
+        
+        # Inline image data and string operands may contain anything that looks like an operator
+        data = _STRING.sub(b'()', _INLINE_IMAGE.sub(b' BI ', data))
+        stack, operands = [], []
+        for token in _TOKEN.findall(data):
+            if token[:1] == b'/' or token[:1].isdigit() or token[:1] in b'-+.' or token in (b'[', b']'):
+                operands.append(token)
+                continue
+            
+            if token in _TEXT_OPERATORS:
+                self.text_ops += 1
+            elif token == b'q':
+                stack.append(ctm)
+            elif token == b'Q':
+                ctm = stack.pop() if stack else ctm
+            elif token == b'cm' and len(operands) >= 6:
+                try:
+                    ctm = _multiply(tuple(float(v) for v in operands[-6:]), ctm)
+                except ValueError:
+                    pass
+            elif token == b'Do' and operands and operands[-1][:1] == b'/':
+                self._paint(xobjects.get(operands[-1][1:].decode('latin-1')), ctm, depth)
+            elif token == b'BI':
+                self.image_area += abs(ctm[0] * ctm[3] - ctm[1] * ctm[2])
+            operands = []
+    
+    def _paint(self, xobject, ctm, depth):
+        xobject = resolve1(xobject)
+        if not isinstance(xobject, PDFStream):
+            return
+        subtype = _name(xobject.get('Subtype'))
+        if subtype == 'Image':
+            # Images are drawn into the unit square mapped by the CTM
+            self.image_area += abs(ctm[0] * ctm[3] - ctm[1] * ctm[2])
+        elif subtype == 'Form' and depth < _MAX_FORM_DEPTH:
+            matrix = resolve1(xobject.get('Matrix')) or (1, 0, 0, 1, 0, 0)
+            try:
+                form_ctm = _multiply(tuple(float(resolve1(v)) for v in matrix), ctm)
+                self.scan(xobject.get_data(), xobject.get('Resources'), form_ctm, depth + 1)
+            except Exception as e:
+                print(f"PDF form inspection error: {e}")
+
+
+def _page_mode(text_ops: int, fonts: int, image_coverage: float) -> str:
+    if text_ops and fonts:
+        return MODE_TEXT
+    if image_coverage >= OCR_MIN_IMAGE_COVERAGE:
+        return MODE_OCR
+    return MODE_SKIP
+
+
+def inspect_pdf(path: str, page_budget: Optional[int] = None) -> List[PageInfo]:
+    """
+    Decide per page how to read a PDF, without layout analysis or rendering
+    
+    Only the first page_budget pages are parsed at all.
+    
+    Args:
+        path: PDF file
+        page_budget: Pages inspected (default PDF_PAGE_BUDGET)
+    
+    Returns:
+        PageInfo per inspected page, in page order
+    """
+    page_budget = PDF_PAGE_BUDGET if page_budget is None else page_budget
+    pages = []
+    with open(path, 'rb') as f:
+        document = PDFDocument(PDFParser(f))
+        for index, page in enumerate(PDFPage.create_pages(document)):
+            if index >= page_budget:
+                break
+            
+            scan = _PageScan()
+            contents = page.contents if isinstance(page.contents, list) else [page.contents]
+            data = b'\n'.join(resolve1(stream).get_data() for stream in contents if stream is not None)
+            scan.scan(data, page.resources)
+            
+            x0, y0, x1, y1 = (float(v) for v in page.mediabox)
+            page_area = abs((x1 - x0) * (y1 - y0)) or 1.0
+            coverage = min(1.0, scan.image_area / page_area)
+            pages.append(PageInfo(index + 1, scan.text_ops, scan.fonts, round(coverage, 3),
+                                  _page_mode(scan.text_ops, scan.fonts, coverage)))
+    return pages
+
+
+def page_count(path: str) -> int:
+    """Number of pages from the page tree (no page is parsed)"""
+    with open(path, 'rb') as f:
+        document = PDFDocument(PDFParser(f))
+        pages = resolve1(document.catalog.get('Pages')) or {}
+        return int(resolve1(pages.get('Count', 0)) or 0)
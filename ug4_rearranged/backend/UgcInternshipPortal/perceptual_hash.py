@@ -0,0 +1,68 @@
+"""
+Perceptual Hashing
+64-bit DCT hash of an image's coarse layout; similar pages differ in few bits
+"""
+
+import numpy as np
+from PIL import Image, ImageOps
+
+HASH_BITS = 64
+_HASH_SIDE = 8
+_SAMPLE_SIDE = 32
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    # Orthonormal DCT-II basis: dct(x) = M @ x
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+
+_DCT = _dct_matrix(_SAMPLE_SIDE)
+
+
+def phash(img: Image.Image) -> int:
+    """
+    Perceptual hash of an image
+    
+    The image is reduced to 32x32 grayscale; the 8x8 lowest DCT frequencies
+    (the overall layout) are compared against their median, one bit each.
+    Names and dates printed on a template barely move these frequencies.
+    
+    Args:
+        img: Any PIL image
+    
+    Returns:
+        64-bit hash as an int
+    """
+    small = ImageOps.grayscale(img).resize((_SAMPLE_SIDE, _SAMPLE_SIDE), Image.BILINEAR)
+    pixels = np.asarray(small, dtype=np.float64)
+    low = (_DCT @ pixels @ _DCT.T)[:_HASH_SIDE, :_HASH_SIDE].flatten()
+    # The DC term is the mean brightness, not layout
+    bits = low > np.median(low[1:])
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
+def file_phash(path: str) -> int:
+    """Perceptual hash of an image file, decoding JPEGs at reduced size"""
+    with Image.open(path) as img:
+        img.draft('L', (_SAMPLE_SIDE * 4, _SAMPLE_SIDE * 4))
+        return phash(img)
+
+
+def hamming(a: int, b: int) -> int:
+    """Number of differing bits"""
+    return bin(a ^ b).count('1')
+
+
+def to_hex(value: int) -> str:
+    return f"{value:016x}"
+
+
+def from_hex(text: str) -> int:
+    return int(text, 16)
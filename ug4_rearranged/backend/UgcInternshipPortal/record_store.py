@@ -0,0 +1,183 @@
+"""
+Internship Record Store
+Reads and writes internship records and upload metadata under uploads/db
+"""
+
+import os
+import fcntl
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Optional, Iterator, Iterable
+
+from serialization import StoredRecord, encode_record, dumps, loads
+
+DB_FOLDER = 'uploads/db'
+
+RECORD_EXT = '.rec'
+LEGACY_RECORD_EXT = '.json'
+
+
+def record_path(internship_id: str) -> str:
+    """Path of an internship record file"""
+    return os.path.join(DB_FOLDER, f"{internship_id}{RECORD_EXT}")
+
+
+def legacy_record_path(internship_id: str) -> str:
+    """Path of a record written as indented JSON by earlier versions"""
+    return os.path.join(DB_FOLDER, f"{internship_id}{LEGACY_RECORD_EXT}")
+
+
+def record_file(internship_id: str) -> Optional[str]:
+    """Path of the file currently holding a record (None if it does not exist)"""
+    for path in (record_path(internship_id), legacy_record_path(internship_id)):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def upload_path(upload_id: str) -> str:
+    """Path of an upload metadata file"""
+    return os.path.join(DB_FOLDER, f"{upload_id}_upload.json")
+
+
+def _write_atomic(path: str, data: bytes):
+    # Temp file + rename: readers never see a half-written record
+    tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _read_bytes(path: str) -> Optional[bytes]:
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def load_stored_record(internship_id: str) -> Optional[StoredRecord]:
+    """Load a record without decoding its large fields (None if it does not exist)"""
+    data = _read_bytes(record_path(internship_id))
+    if data is None:
+        data = _read_bytes(legacy_record_path(internship_id))
+    if data is None:
+        return None
+    return StoredRecord.from_bytes(data)
+
+
+def load_record(internship_id: str) -> Optional[Dict[str, Any]]:
+    """Load an internship record (None if it does not exist)"""
+    stored = load_stored_record(internship_id)
+    return stored.to_dict() if stored is not None else None
+
+
+def load_record_json(internship_id: str, exclude: Iterable[str] = ()) -> Optional[bytes]:
+    """Record as JSON bytes for API responses, without decoding large fields"""
+    stored = load_stored_record(internship_id)
+    return stored.to_json(exclude) if stored is not None else None
+
+
+def save_record(record: Dict[str, Any]):
+    """Save an internship record"""
+    internship_id = record['internship_id']
+    _write_atomic(record_path(internship_id), encode_record(record))
+    
+    # Rewritten in the compact format; drop the legacy copy
+    legacy_path = legacy_record_path(internship_id)
+    if os.path.exists(legacy_path):
+        os.remove(legacy_path)
+
+
+@contextmanager
+def record_lock(internship_id: str):
+    """
+    Exclusive lock on one record, across threads and worker processes
+    
+    Hold it around any load-modify-save of a record so concurrent writers
+    (mentor requests, the ABC delivery worker) cannot lose each other's changes.
+    Lock files live in DB_FOLDER/locks and are never removed.
+    """
+    lock_folder = os.path.join(DB_FOLDER, 'locks')
+    os.makedirs(lock_folder, exist_ok=True)
+    with open(os.path.join(lock_folder, f"{internship_id}.lock"), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def update_record(internship_id: str, update: Callable[[Dict[str, Any]], None]) -> Optional[Dict[str, Any]]:
+    """
+    Load a record, apply update() to it and save it, under the record lock
+    
+    Returns:
+        The saved record, or None if it does not exist (e.g. deleted meanwhile)
+    """
+    with record_lock(internship_id):
+        record = load_record(internship_id)
+        if record is None:
+            return None
+        update(record)
+        save_record(record)
+        return record
+
+
+def delete_record(internship_id: str) -> bool:
+    """Delete an internship record; True if it existed"""
+    deleted = False
+    for path in (record_path(internship_id), legacy_record_path(internship_id)):
+        if os.path.exists(path):
+            os.remove(path)
+            deleted = True
+    return deleted
+
+
+def iter_stored_records() -> Iterator[StoredRecord]:
+    """
+    Every record, read one file at a time (large fields stay encoded)
+    
+    Directory entries are streamed, so memory stays flat however many records
+    exist. Legacy JSON records are included; upload metadata and ABC files are
+    skipped.
+    """
+    with os.scandir(DB_FOLDER) as entries:
+        for entry in entries:
+            name = entry.name
+            if name.endswith(RECORD_EXT):
+                pass
+            elif name.endswith(LEGACY_RECORD_EXT) and not name.endswith('_upload.json') and not name.startswith('abc_'):
+                # Superseded by a compact copy written since
+                if os.path.exists(record_path(name[:-len(LEGACY_RECORD_EXT)])):
+                    continue
+            else:
+                continue
+            
+            data = _read_bytes(entry.path)
+            if data is None:
+                continue
+            try:
+                stored = StoredRecord.from_bytes(data)
+            except ValueError as e:
+                print(f"Skipping unreadable record {name}: {e}")
+                continue
+            if 'internship_id' in stored:
+                yield stored
+
+
+def iter_record_summaries() -> Iterator[Dict[str, Any]]:
+    """Small fields of every record (large fields are never decoded)"""
+    for stored in iter_stored_records():
+        yield stored.summary()
+
+
+def load_upload(upload_id: str) -> Optional[Dict[str, Any]]:
+    """Load upload metadata (None if it does not exist)"""
+    data = _read_bytes(upload_path(upload_id))
+    return loads(data) if data is not None else None
+
+
+def save_upload(metadata: Dict[str, Any]):
+    """Save upload metadata"""
+    _write_atomic(upload_path(metadata['upload_id']), dumps(metadata))
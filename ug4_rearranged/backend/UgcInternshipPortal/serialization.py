@@ -0,0 +1,127 @@
+"""
+Record Serialization
+Compact on-disk encoding for internship records with lazily decoded large fields
+"""
+
+import json
+import struct
+from typing import Dict, Any, Iterable, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Binary record layout: magic, header length, header JSON, raw field blobs
+RECORD_MAGIC = b'UGCR\x01'
+_HEADER_LEN = struct.Struct('<I')
+
+# Large, growing fields kept encoded until a caller needs them
+LAZY_FIELDS = ('ceescm_tokens', 'wmd_matches', 'changelog', 'match_state')
+
+
+def dumps(obj: Any) -> bytes:
+    """Minified JSON bytes (orjson when installed)"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def loads(data) -> Any:
+    """Parse JSON bytes or text (orjson when installed)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def encode_record(record: Dict[str, Any]) -> bytes:
+    """
+    Encode a record for disk
+    
+    Small fields go into a JSON header; each large field is stored as its own
+    minified JSON blob after the header so it can be skipped or copied verbatim.
+    """
+    fields = {key: value for key, value in record.items() if key not in LAZY_FIELDS}
+    blobs = [(name, dumps(record[name])) for name in LAZY_FIELDS if name in record]
+    
+    layout, offset = [], 0
+    for name, blob in blobs:
+        layout.append([name, offset, len(blob)])
+        offset += len(blob)
+    
+    header = dumps({'fields': fields, 'lazy': layout})
+    return b''.join([RECORD_MAGIC, _HEADER_LEN.pack(len(header)), header] + [blob for _, blob in blobs])
+
+
+class StoredRecord:
+    """
+    A record read from disk, decoding large fields only on request
+    
+    Also reads legacy records written as plain (indented) JSON.
+    """
+    
+    def __init__(self, fields: Dict[str, Any], raw: Optional[Dict[str, memoryview]] = None):
+        self.fields = fields
+        self._raw = raw or {}
+        self._decoded = {}
+    
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'StoredRecord':
+        if not data.startswith(RECORD_MAGIC):
+            # Compatibility: JSON records written before the binary layout
+            return cls(loads(data))
+        
+        start = len(RECORD_MAGIC) + _HEADER_LEN.size
+        if len(data) < start:
+            raise ValueError("Truncated record header")
+        (header_len,) = _HEADER_LEN.unpack_from(data, len(RECORD_MAGIC))
+        header = loads(data[start:start + header_len])
+        
+        view = memoryview(data)
+        base = start + header_len
+        raw = {name: view[base + offset:base + offset + length] for name, offset, length in header['lazy']}
+        return cls(header['fields'], raw)
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self.fields or name in self._raw
+    
+    def get(self, name: str, default: Any = None) -> Any:
+        if name in self.fields:
+            return self.fields[name]
+        if name not in self._raw:
+            return default
+        if name not in self._decoded:
+            self._decoded[name] = loads(bytes(self._raw[name]))
+        return self._decoded[name]
+    
+    def summary(self) -> Dict[str, Any]:
+        """Small fields only (large fields stay encoded)"""
+        return dict(self.fields)
+    
+    def to_dict(self, lazy_fields: Iterable[str] = LAZY_FIELDS) -> Dict[str, Any]:
+        """Plain dict with the requested large fields decoded"""
+        record = dict(self.fields)
+        for name in lazy_fields:
+            if name in self._raw:
+                record[name] = self.get(name)
+        return record
+    
+    def to_json(self, exclude: Iterable[str] = ()) -> bytes:
+        """
+        JSON document of the record (minus excluded fields)
+        
+        Large fields are spliced in as stored, without a decode/encode round trip.
+        """
+        exclude = set(exclude)
+        fields = {key: value for key, value in self.fields.items() if key not in exclude} if exclude else self.fields
+        raw = [(name, blob) for name, blob in self._raw.items() if name not in exclude]
+        if not raw:
+            return dumps(fields)
+        
+        parts = [dumps(fields)[:-1]]
+        separator = b',' if fields else b''
+        for name, blob in raw:
+            parts.append(separator + dumps(name) + b':' + bytes(blob))
+            separator = b','
+        parts.append(b'}')
+        return b''.join(parts)
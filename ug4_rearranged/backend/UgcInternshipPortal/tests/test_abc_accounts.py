@@ -0,0 +1,134 @@
+"""
+Unit tests for ABC account provisioning and login hashing
+"""
+
+import sys
+import os
+import tempfile
+import threading
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import abc_portal
+
+
+def _use_temp_users_file(tmp):
+    abc_portal.ABC_USERS_FILE = os.path.join(tmp, 'abc_users.json')
+    abc_portal._users_cache['signature'] = None
+
+
+def test_deferred_provisioning_and_login():
+    """Test queued accounts are created in the background and can log in"""
+    
+    print("\n" + "=" * 60)
+    print("TEST: Deferred Account Provisioning")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        _use_temp_users_file(tmp)
+        
+        for i in range(5):
+            abc_portal.enqueue_student_account(f"APAAR-{i}", f"Student {i}")
+        abc_portal.flush_provisioning()
+        
+        users = abc_portal.load_abc_users()
+        assert sorted(users) == [f"APAAR-{i}" for i in range(5)]
+        
+        # Login waits for a still-queued account instead of failing
+        abc_portal.enqueue_student_account('APAAR-LATE', 'Late Student')
+        assert abc_portal.verify_student_login('APAAR-LATE', 'APAAR-LATE')
+        assert not abc_portal.verify_student_login('APAAR-0', 'wrong')
+        assert not abc_portal.verify_student_login('UNKNOWN', 'x')
+    
+    print("\n✓ Test passed: Accounts provisioned off the request path")
+    print("=" * 60)
+
+
+def test_user_index_invalidated_on_write():
+    """Test the cached user index follows writes to the users file"""
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        _use_temp_users_file(tmp)
+        abc_portal.save_abc_users({'A': {'apaar_id': 'A'}})
+        
+        first = abc_portal.load_abc_users()
+        assert abc_portal.load_abc_users() is first
+        
+        # Callers cannot edit the shared index behind the file's back
+        try:
+            first['X'] = {'apaar_id': 'X'}
+            assert False, "Expected TypeError"
+        except TypeError:
+            pass
+        edited = dict(first)
+        edited['X'] = {'apaar_id': 'X'}
+        assert 'X' not in abc_portal.load_abc_users()
+        
+        abc_portal.save_abc_users({'A': {'apaar_id': 'A'}, 'B': {'apaar_id': 'B'}})
+        assert sorted(abc_portal.load_abc_users()) == ['A', 'B']
+
+
+def test_bcrypt_pool_rejects_when_saturated():
+    """Test login hashing is bounded instead of queueing without limit"""
+    
+    slots = abc_portal._bcrypt_slots
+    taken = 0
+    while slots.acquire(blocking=False):
+        taken += 1
+    try:
+        try:
+            abc_portal.run_bcrypt(lambda: True)
+            assert False, "Expected LoginBusyError"
+        except abc_portal.LoginBusyError:
+            pass
+    finally:
+        for _ in range(taken):
+            slots.release()
+    
+    assert abc_portal.run_bcrypt(lambda: True)
+
+
+def test_slow_hash_reported_busy():
+    """Test a hash that outlives BCRYPT_TIMEOUT is reported busy, not raised"""
+    
+    release = threading.Event()
+    original_timeout = abc_portal.BCRYPT_TIMEOUT
+    abc_portal.BCRYPT_TIMEOUT = 0.05
+    try:
+        try:
+            abc_portal.run_bcrypt(release.wait)
+            assert False, "Expected LoginBusyError"
+        except abc_portal.LoginBusyError:
+            pass
+    finally:
+        release.set()
+        abc_portal.BCRYPT_TIMEOUT = original_timeout
+
+
+def test_provisioning_leaves_login_pool_free():
+    """Test account batches hash on their own pool"""
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        _use_temp_users_file(tmp)
+        release = threading.Event()
+        
+        # Occupy every login worker: provisioning must still complete
+        blockers = [abc_portal._bcrypt_pool.submit(release.wait) for _ in range(abc_portal.BCRYPT_WORKERS)]
+        try:
+            done = threading.Thread(target=abc_portal.provision_accounts, args=([('APAAR-P', 'Pooled', '')],))
+            done.start()
+            done.join(timeout=10)
+            assert not done.is_alive()
+            assert 'APAAR-P' in abc_portal.load_abc_users()
+        finally:
+            release.set()
+            for blocker in blockers:
+                blocker.result()
+
+
+if __name__ == '__main__':
+    test_deferred_provisioning_and_login()
+    test_user_index_invalidated_on_write()
+    test_bcrypt_pool_rejects_when_saturated()
+    test_slow_hash_reported_busy()
+    test_provisioning_leaves_login_pool_free()
+    print("\n✓ All ABC account tests completed!\n")
@@ -0,0 +1,124 @@
+"""
+Unit tests for adaptive OCR escalation
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from PIL import Image
+
+import adaptive_ocr
+from adaptive_ocr import adaptive_extract, TIER_FAST, TIER_FULL, TIER_REGION
+from extractor import FieldExtractor
+
+NAME_ANCHORS = FieldExtractor().name_anchors
+
+
+def _extract(text):
+    # Name from a labelled line (no NER needed), dates from the real date rules
+    result = {'name': {'value': '', 'conf': 0.0}}
+    for line in text.splitlines():
+        if line.startswith('This is to certify that '):
+            result['name'] = {'value': line[len('This is to certify that '):], 'conf': 0.9}
+    dates = FieldExtractor()._extract_dates(text)
+    result['start_date'] = dates['start']
+    result['end_date'] = dates['end']
+    return result
+
+
+class FakeOCR:
+    """Answers per tier: the fast pass, full resolution, a PSM mode or a crop"""
+    
+    def __init__(self, answers, words=None):
+        self.answers = answers
+        self.words = words or {'text': []}
+        self.calls = []
+    
+    def text(self, img, config=''):
+        if config == '--psm 6' and img.height < 1000:
+            tier = TIER_REGION
+        elif config:
+            tier = 'psm' + config.split()[-1]
+        else:
+            tier = TIER_FAST if max(img.size) <= adaptive_ocr.OCR_FAST_MAX_SIDE else TIER_FULL
+        self.calls.append(tier)
+        return self.answers.get(tier, '')
+    
+    def data(self, img, config=''):
+        self.calls.append('words')
+        return self.words
+
+
+def test_escalates_only_for_weak_mandatory_fields():
+    """Test tier order, early stop and per-field tier records"""
+    
+    print("\n" + "=" * 60)
+    print("TEST: Adaptive OCR")
+    print("=" * 60)
+    
+    scan = Image.new('RGB', (2480, 3508), 'white')
+    complete = "This is to certify that Asha Rao\nfrom 01/06/2024 to 31/07/2024"
+    
+    # Clean scan: the fast pass is enough
+    ocr = FakeOCR({TIER_FAST: complete})
+    result = adaptive_extract(scan, ocr.text, ocr.data, _extract, NAME_ANCHORS)
+    print(f"\nClean scan calls: {ocr.calls}")
+    assert ocr.calls == [TIER_FAST]
+    assert result['name']['value'] == 'Asha Rao' and result['name']['ocr_tier'] == TIER_FAST
+    
+    # Dates lost at low resolution: full resolution supplies them, the name stays from the fast pass
+    ocr = FakeOCR({TIER_FAST: "This is to certify that Asha Rao\nfrom 0l/O6/2O24 to 3l/07/2O24",
+                   TIER_FULL: complete})
+    result = adaptive_extract(scan, ocr.text, ocr.data, _extract, NAME_ANCHORS)
+    print(f"Blurred dates calls: {ocr.calls}")
+    assert ocr.calls == [TIER_FAST, TIER_FULL]
+    assert result['name']['ocr_tier'] == TIER_FAST
+    assert result['start_date'] == {'value': '2024-06-01', 'conf': 0.8, 'ocr_tier': TIER_FULL}
+    assert result['end_date']['value'] == '2024-07-31'
+    
+    # Dates only readable in a re-OCR'd band around their line
+    words = {
+        'text': ['This', 'certify', 'from', '0l/06/2024', 'Director'],
+        'block_num': [1, 1, 1, 1, 2], 'par_num': [1, 1, 1, 1, 1], 'line_num': [1, 1, 2, 2, 1],
+        'left': [200, 400, 200, 400, 200], 'top': [900, 900, 1400, 1400, 3000],
+        'width': [150, 250, 150, 400, 300], 'height': [60, 60, 60, 60, 60],
+    }
+    ocr = FakeOCR({TIER_FAST: "This is to certify that Asha Rao",
+                   TIER_REGION: "from 01/06/2024 to 31/07/2024"}, words)
+    result = adaptive_extract(scan, ocr.text, ocr.data, _extract, NAME_ANCHORS)
+    print(f"Region calls: {ocr.calls}")
+    # Full resolution improved nothing, so the other segmentation modes are not tried
+    assert ocr.calls == [TIER_FAST, TIER_FULL, 'words', TIER_REGION]
+    assert result['start_date']['ocr_tier'] == TIER_REGION
+    assert result['end_date']['value'] == '2024-07-31'
+    assert result['name']['ocr_tier'] == TIER_FAST
+    
+    # A re-read that helps keeps the escalation going
+    ocr = FakeOCR({TIER_FAST: "from 0l/O6/2O24 to 3l/07/2O24",
+                   TIER_FULL: "This is to certify that Asha Rao",
+                   'psm6': complete})
+    result = adaptive_extract(scan, ocr.text, ocr.data, _extract, NAME_ANCHORS)
+    print(f"Stepwise calls: {ocr.calls}")
+    assert ocr.calls == [TIER_FAST, TIER_FULL, 'psm6']
+    assert result['start_date']['ocr_tier'] == 'psm6'
+    
+    # Without NER no tier can find the name; it does not trigger re-reads
+    ocr = FakeOCR({TIER_FAST: "from 01/06/2024 to 31/07/2024"})
+    result = adaptive_extract(scan, ocr.text, ocr.data, _extract, NAME_ANCHORS,
+                              fields=['start_date', 'end_date'])
+    print(f"Dates only calls: {ocr.calls}")
+    assert ocr.calls == [TIER_FAST]
+    assert result['name']['conf'] == 0.0
+    
+    # Only the date lines are cropped once the name is known
+    regions = adaptive_ocr.anchor_regions(words, ['start_date', 'end_date'], NAME_ANCHORS, scan.size)
+    assert regions == [(0, 1370, 2480, 1580)]
+    
+    print("\n✓ Test passed: OCR escalates only while mandatory fields are weak")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    test_escalates_only_for_weak_mandatory_fields()
+    print("\n✓ All adaptive OCR tests completed!\n")
@@ -0,0 +1,73 @@
+"""
+Unit tests for the materialized submission analytics
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import analytics
+
+
+def _record(internship_id, institution, day, decision, credits, composite, course_id, needs_review=False):
+    return {
+        'internship_id': internship_id,
+        'timestamp': f"{day}T10:00:00",
+        'form_data': {'institution_code': institution},
+        'decision': decision,
+        'credits': credits,
+        'wmd_composite': composite,
+        'needs_review': needs_review,
+        'wmd_matches': [{'course_id': course_id, 'similarity': composite}],
+    }
+
+
+def test_counters_follow_submit_review_delete():
+    """Test counters move with each record change and summaries filter"""
+    
+    print("\n" + "=" * 60)
+    print("TEST: Analytics Counters")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        analytics.ANALYTICS_DB = os.path.join(tmp, 'analytics.sqlite3')
+        
+        first = _record('AN-1', 'inst01', '2024-03-01', 'Partially Equivalent', 1, 0.5, 'CS301', needs_review=True)
+        second = _record('AN-2', 'INST02', '2024-03-02', 'Equivalent', 2, 0.9, 'CS301')
+        third = _record('AN-3', 'INST02', '2024-03-02', 'Not Equivalent', 0, 0.2, 'ML401')
+        for record in (first, second, third):
+            analytics.record_updated(None, record)
+        
+        # Mentor review upgrades the first submission
+        before = analytics.contribution(first)
+        first.update({'decision': 'Equivalent', 'credits': 2, 'needs_review': False, 'wmd_composite': 0.8})
+        analytics.record_updated(before, first)
+        
+        # Student deletes the third submission
+        analytics.record_updated(third, None)
+        
+        summary = analytics.get_summary()
+        totals = summary['totals']
+        print(f"\nTotals: {totals}")
+        assert totals['submissions'] == 2
+        assert totals['decisions'] == {'Equivalent': 2, 'Partially Equivalent': 0, 'Not Equivalent': 0}
+        assert totals['credits_awarded'] == 4
+        assert totals['needs_review_rate'] == 0.0
+        assert totals['avg_wmd_composite'] == 0.85
+        assert summary['top_courses'] == [{'course_id': 'CS301', 'matches': 2}]
+        assert [i['institution_code'] for i in summary['by_institution']] == ['INST01', 'INST02']
+        assert [d['day'] for d in summary['by_day']] == ['2024-03-01', '2024-03-02']
+        
+        filtered = analytics.get_summary(institution_code='inst02', start_day='2024-03-02')
+        assert filtered['totals']['submissions'] == 1
+        assert filtered['totals']['credits_awarded'] == 2
+        assert analytics.get_summary(end_day='2024-02-28')['totals']['submissions'] == 0
+    
+    print("\n✓ Test passed: Counters match the surviving records")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    test_counters_follow_submit_review_delete()
+    print("\n✓ All analytics tests completed!\n")
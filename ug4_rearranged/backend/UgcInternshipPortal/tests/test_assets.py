@@ -0,0 +1,78 @@
+"""
+Unit tests for the fingerprinted static asset build and serving route
+"""
+
+import sys
+import os
+import gzip
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask, render_template_string
+
+import assets
+
+
+def test_build_and_serve_precompressed():
+    """Test fingerprinted names, gzip variants, template URLs and cache headers"""
+    
+    print("\n" + "=" * 60)
+    print("TEST: Static Assets")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'static')
+        output = os.path.join(tmp, 'static_build')
+        os.makedirs(os.path.join(source, 'css'))
+        css = b'body { color: #333; }\n' * 50
+        with open(os.path.join(source, 'css', 'style.css'), 'wb') as f:
+            f.write(css)
+        
+        manifest = assets.build_assets(source, output)
+        built_name = manifest['css/style.css']
+        print(f"\nManifest: {manifest}")
+        assert built_name.startswith('css/style.') and built_name.endswith('.css')
+        assert built_name == assets.fingerprint_name('css/style.css', css)
+        with open(os.path.join(output, built_name + '.gz'), 'rb') as f:
+            assert gzip.decompress(f.read()) == css
+        
+        original_folder = assets.ASSET_BUILD_FOLDER
+        assets.ASSET_BUILD_FOLDER = output
+        assets.reload_manifest()
+        try:
+            app = Flask(__name__, static_folder=source)
+            app.register_blueprint(assets.assets_bp)
+            app.add_template_global(assets.asset_url)
+            
+            with app.test_request_context():
+                url = render_template_string("{{ asset_url('css/style.css') }}")
+                assert url == f"/assets/{built_name}"
+                # Files outside the build fall back to the plain static route
+                assert render_template_string("{{ asset_url('js/new.js') }}") == '/static/js/new.js'
+            
+            client = app.test_client()
+            response = client.get(url, headers={'Accept-Encoding': 'gzip, deflate'})
+            print(f"Headers: {dict(response.headers)}")
+            assert response.status_code == 200
+            assert response.headers['Content-Encoding'] == 'gzip'
+            assert response.headers['Cache-Control'] == assets.IMMUTABLE_CACHE_CONTROL
+            assert response.mimetype == 'text/css'
+            assert gzip.decompress(response.data) == css
+            response.close()
+            
+            plain = client.get(url)
+            assert 'Content-Encoding' not in plain.headers and plain.data == css
+            plain.close()
+            
+            assert client.get('/assets/css/style.css').status_code == 404
+        finally:
+            assets.ASSET_BUILD_FOLDER = original_folder
+            assets.reload_manifest()
+    
+    print("\n✓ Test passed: Assets fingerprinted and served precompressed")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    test_build_and_serve_precompressed()
+    print("\n✓ All asset tests completed!\n")
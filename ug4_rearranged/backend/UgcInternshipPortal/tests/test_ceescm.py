@@ -0,0 +1,67 @@
+"""
+Unit tests for chunked CEESCM tokenization
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ceescm import CEESCMTokenizer, iter_chunks, get_sample_ceescm_tokens
+
+
+def _daily_logs(days):
+    return '\n'.join(
+        f"Day {d}: Worked on feature{d % 37} using react and flask, reviewed pull request {d}."
+        for d in range(days)
+    )
+
+
+def test_chunked_matches_single_pass():
+    """Test windowed tokenization gives the same tokens as one pass"""
+    
+    print("\n" + "=" * 60)
+    print("TEST: Chunked Log Tokenization")
+    print("=" * 60)
+    
+    logs = _daily_logs(400)
+    chunks = list(iter_chunks(logs, chunk_chars=500))
+    assert ''.join(chunks) == logs
+    assert all(len(chunk) <= 500 for chunk in chunks)
+    # Windows end at line breaks
+    assert all(chunk.endswith('.') for chunk in chunks[:-1])
+    
+    whole = CEESCMTokenizer(chunk_chars=len(logs) + 1).tokenize(logs)
+    chunked = CEESCMTokenizer(chunk_chars=500).tokenize(logs)
+    print(f"\n{len(logs)} characters, {len(chunks)} windows, {len(chunked)} tokens")
+    
+    if CEESCMTokenizer().nlp is None:
+        assert chunked == whole
+    
+    data = {'organization': 'Acme Corp', 'internship_title': 'Web Intern', 'logs': logs * 40}
+    tokens = get_sample_ceescm_tokens(data)
+    assert tokens[:3] == CEESCMTokenizer().tokenize('Acme Corp Web Intern')[:3]
+    
+    print("\n✓ Test passed: Chunked tokens match single pass")
+    print("=" * 60)
+
+
+def test_caps_enforced():
+    """Test input and token caps bound the work done"""
+    
+    tokenizer = CEESCMTokenizer(chunk_chars=200, max_input_chars=1000, max_tokens=25)
+    logs = ' '.join(f"uniqueword{i}" for i in range(5000))
+    
+    tokens = tokenizer.tokenize(logs)
+    assert len(tokens) == 25
+    
+    # Only the first max_input_chars are read
+    assert sum(len(c) for c in iter_chunks(logs, 200, 1000)) == 1000
+    
+    # A single word longer than the window is still split
+    assert [len(c) for c in iter_chunks('x' * 450, 200)] == [200, 200, 50]
+
+
+if __name__ == '__main__':
+    test_chunked_matches_single_pass()
+    test_caps_enforced()
+    print("\n✓ All CEESCM tests completed!\n")
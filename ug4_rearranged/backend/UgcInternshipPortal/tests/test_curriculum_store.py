@@ -0,0 +1,156 @@
+"""
+Unit tests for the versioned curriculum catalogue store
+"""
+
+import sys
+import os
+import json
+import tempfile
+import threading
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from curriculum_store import CurriculumStore, InstitutionCurriculumRegistry
+from wmd_matcher import match_internship
+
+
+def test_snapshot_versions_and_hot_reload():
+    """Test publishing a new version swaps the snapshot without a restart"""
+    
+    print("\n" + "=" * 60)
+    print("TEST: Curriculum Snapshot Hot Reload")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CurriculumStore(os.path.join(tmp, 'catalogue.json'), poll_interval=0)
+        
+        first = store.current()
+        assert first.version == 1
+        assert 'CS301' in first.courses
+        
+        store.publish({
+            'EE101': {
+                'title': 'Circuit Design',
+                'keywords': ['circuit', 'pcb', 'embedded'],
+                'description': 'Analog and digital circuit design'
+            }
+        })
+        store.wait()
+        
+        second = store.current()
+        print(f"\nVersions: {first.label} -> {second.label}")
+        
+        assert second.version == 2
+        assert list(second.courses) == ['EE101']
+        # The old snapshot is untouched
+        assert 'CS301' in first.courses
+        
+        matcher = second.matcher()
+        matches, composite, decision = match_internship(['circuit', 'pcb', 'embedded'], matcher)
+        assert matcher.catalogue_version == second.label
+        assert matches and matches[0]['course_id'] == 'EE101'
+    
+    print("\n✓ Test passed: New catalogue version picked up")
+    print("=" * 60)
+
+
+def test_custom_keywords_persist():
+    """Test mentor keywords are stored as a new catalogue version"""
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'catalogue.json')
+        store = CurriculumStore(path, poll_interval=0)
+        store.current()
+        
+        # Matcher-level overrides never leak into the shared snapshot
+        matcher = store.matcher()
+        matcher.add_custom_keywords('CS301', ['vue'])
+        assert 'vue' not in store.current().courses['CS301']['keywords']
+        
+        version = store.add_custom_keywords('CS301', ['vue', 'angular'])
+        store.wait()
+        assert version == 2
+        
+        # A fresh worker process sees the persisted keywords
+        reopened = CurriculumStore(path)
+        keywords = reopened.current().courses['CS301']['keywords']
+        assert 'vue' in keywords and 'angular' in keywords
+        assert os.path.exists(os.path.join(tmp, 'versions', 'v000002.json'))
+        
+        # Concurrent edits (several mentors, several courses) all survive
+        threads = [threading.Thread(target=store.add_custom_keywords, args=(['CS301', 'CS302'], [f'kw{i}']))
+                   for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        store.wait()
+        courses = CurriculumStore(path).current().courses
+        for course_id in ('CS301', 'CS302'):
+            assert all(f'kw{i}' in courses[course_id]['keywords'] for i in range(8))
+        assert store.add_custom_keywords(['NOPE'], ['x']) is None
+
+
+def test_old_versions_pruned():
+    """Test archived versions and their persisted indexes are kept to a bounded number"""
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CurriculumStore(os.path.join(tmp, 'catalogue.json'), poll_interval=0, keep_versions=3)
+        for i in range(6):
+            store.publish({f'C{i}': {'title': f'Course {i}', 'keywords': [f'kw{i}'], 'description': ''}})
+            store.wait()
+            store.current()
+        
+        versions = sorted(os.listdir(store.versions_folder))
+        indexes = os.listdir(store.index_folder)
+        print(f"\nKept versions: {versions}, indexes: {len(indexes)}")
+        assert versions == ['v000005.json', 'v000006.json', 'v000007.json']
+        assert 0 < len(indexes) <= 3
+        assert store.current().checksum[:16] in indexes
+        assert list(CurriculumStore(store.path).current().courses) == ['C5']
+
+
+def test_institution_partitions_lru():
+    """Test per-institution catalogues are isolated and evicted LRU-first"""
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        # Tiny budget: only the most recently used partition stays loaded
+        registry = InstitutionCurriculumRegistry(tmp, memory_budget_mb=0.001, poll_interval=0)
+        registry.create_partition('UNI-A', {
+            'A100': {'title': 'Agronomy', 'keywords': ['soil', 'crop'], 'description': 'Crop science'}
+        })
+        registry.create_partition('uni-b', {
+            'B100': {'title': 'Biotech', 'keywords': ['gene', 'lab'], 'description': 'Genetics lab work'}
+        })
+        
+        store_a = registry.store_for('uni-a')
+        assert list(store_a.current().courses) == ['A100']
+        assert store_a.current().label.startswith('UNI-A/')
+        
+        matches, _, _ = match_internship(['gene', 'lab'], registry.store_for('UNI-B').matcher())
+        assert [m['course_id'] for m in matches] == ['B100']
+        assert registry.loaded_partitions() == ['UNI-B']
+        
+        # Unknown or malformed codes fall back to the global catalogue
+        assert registry.store_for('UNKNOWN') is registry.global_store
+        assert registry.store_for('../etc') is registry.global_store
+        
+        # Missing catalogues are remembered until the next poll, unless one is created here
+        slow = InstitutionCurriculumRegistry(tmp, poll_interval=3600)
+        assert slow.store_for('UNI-C') is slow.global_store
+        os.makedirs(os.path.dirname(slow.partition_path('UNI-C')))
+        with open(slow.partition_path('UNI-C'), 'w') as f:
+            json.dump({'version': 1, 'courses': {}}, f)
+        assert slow.store_for('UNI-C') is slow.global_store
+        slow.create_partition('UNI-C', {
+            'C100': {'title': 'Chemistry', 'keywords': ['titration'], 'description': 'Lab chemistry'}
+        })
+        slow.store_for('UNI-C').wait()
+        assert list(slow.store_for('UNI-C').current().courses) == ['C100']
+
+
+if __name__ == '__main__':
+    test_snapshot_versions_and_hot_reload()
+    test_custom_keywords_persist()
+    test_old_versions_pruned()
+    test_institution_partitions_lru()
+    print("\n✓ All curriculum store tests completed!\n")
@@ -0,0 +1,80 @@
+"""
+Unit tests for the streaming DOCX reader
+"""
+
+import sys
+import os
+import zipfile
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from docx_reader import read_docx_text
+
+NS = ('xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+      'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006"')
+
+
+def _para(text):
+    return f'<w:p><w:r><w:t>{text}</w:t></w:r></w:p>'
+
+
+def _cell(*texts):
+    return '<w:tc>' + ''.join(_para(t) for t in texts) + '</w:tc>'
+
+
+DOCUMENT = f'''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:document {NS}><w:body>
+{_para('Certificate of Internship')}
+<w:p><w:r><w:t>This certifies that</w:t></w:r><w:r><w:tab/><w:t>Asha Rao</w:t></w:r>
+  <w:r><mc:AlternateContent>
+    <mc:Choice Requires="wps"><w:drawing><w:txbxContent>{_para('Cert No: CERT-2024-0042')}</w:txbxContent></w:drawing></mc:Choice>
+    <mc:Fallback><w:pict><w:txbxContent>{_para('Cert No: CERT-2024-0042')}</w:txbxContent></w:pict></mc:Fallback>
+  </mc:AlternateContent></w:r>
+</w:p>
+<w:tbl>
+  <w:tr>{_cell('Organization')}{_cell('ACME Technologies', 'Bengaluru')}</w:tr>
+  <w:tr>{_cell('Duration')}{_cell('240 hours')}</w:tr>
+</w:tbl>
+<w:p><w:r><w:delText>removed text</w:delText></w:r></w:p>
+{_para('Signed, Director')}
+</w:body></w:document>'''
+
+HEADER = f'<w:hdr {NS}>{_para("ACME Technologies Pvt Ltd")}</w:hdr>'
+FOOTER = f'<w:ftr {NS}>{_para("GSTIN 29ABCDE1234F1Z5")}</w:ftr>'
+
+
+def test_reads_tables_text_boxes_headers_and_footers():
+    """Test reading order and coverage beyond body paragraphs"""
+    
+    print("\n" + "=" * 60)
+    print("TEST: Streaming DOCX Reader")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'certificate.docx')
+        with zipfile.ZipFile(path, 'w') as archive:
+            archive.writestr('word/document.xml', DOCUMENT)
+            archive.writestr('word/header1.xml', HEADER)
+            archive.writestr('word/header2.xml', HEADER)
+            archive.writestr('word/footer1.xml', FOOTER)
+        
+        lines = read_docx_text(path).split('\n')
+        print(f"\nLines: {lines}")
+        assert lines == [
+            'ACME Technologies Pvt Ltd',
+            'Certificate of Internship',
+            'Cert No: CERT-2024-0042',
+            'This certifies that\tAsha Rao',
+            'Organization\tACME Technologies Bengaluru',
+            'Duration\t240 hours',
+            'Signed, Director',
+            'GSTIN 29ABCDE1234F1Z5',
+        ]
+    
+    print("\n✓ Test passed: Tables, text boxes, headers and footers read in order")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    test_reads_tables_text_boxes_headers_and_footers()
+    print("\n✓ All DOCX reader tests completed!\n")
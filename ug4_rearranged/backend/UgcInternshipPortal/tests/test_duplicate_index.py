@@ -0,0 +1,153 @@
+"""
+Unit tests for the near-duplicate certificate index
+"""
+
+import sys
+import os
+import random
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from PIL import Image, ImageDraw
+
+import duplicate_index
+from perceptual_hash import HASH_BITS, hamming
+
+
+def _certificate(name, size=(1600, 1130)):
+    width, height = size
+    img = Image.new('RGB', size, (250, 245, 230))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle([20, 20, width - 20, height - 20], outline=(120, 60, 20), width=18)
+    draw.rectangle([0, 0, width, int(height * 0.18)], fill=(30, 60, 120))
+    draw.ellipse([int(width * 0.45), int(height * 0.72), int(width * 0.55), int(height * 0.86)], fill=(200, 160, 40))
+    draw.text((int(width * 0.3), int(height * 0.44)), name, fill=(0, 0, 0))
+    return img
+
+
+def _flip(value, bits, rng):
+    for bit in rng.sample(range(HASH_BITS), bits):
+        value ^= 1 << bit
+    return value
+
+
+def test_lsh_lookup_and_upload_flags():
+    """Test recall against a linear scan and flagging of re-uploaded certificates"""
+    
+    print("\n" + "=" * 60)
+    print("TEST: Near-duplicate Index")
+    print("=" * 60)
+    
+    original_db = duplicate_index.DUPLICATE_DB
+    with tempfile.TemporaryDirectory() as tmp:
+        duplicate_index.DUPLICATE_DB = os.path.join(tmp, 'duplicates.sqlite3')
+        try:
+            rng = random.Random(3)
+            hashes = {f"upload-{i}": rng.getrandbits(HASH_BITS) for i in range(2000)}
+            conn = duplicate_index._connect()
+            for upload_id, value in hashes.items():
+                duplicate_index.add(upload_id, value, conn=conn)
+            
+            # Same results as comparing against every upload, up to the guaranteed distance
+            for i, base in enumerate(list(hashes.values())[:50]):
+                probe = _flip(base, i % (duplicate_index.MAX_GUARANTEED_DISTANCE + 1), rng)
+                expected = sorted((upload_id, hamming(probe, value)) for upload_id, value in hashes.items()
+                                  if hamming(probe, value) <= duplicate_index.MAX_GUARANTEED_DISTANCE)
+                found = duplicate_index.query(probe, duplicate_index.MAX_GUARANTEED_DISTANCE, conn=conn)
+                assert sorted(found) == expected
+            conn.close()
+            print(f"\nLookups agree with a linear scan over {len(hashes)} uploads")
+            
+            # Uploads: one certificate resubmitted resized and recompressed, and
+            # another student's certificate issued on the same template
+            original = os.path.join(tmp, 'original.png')
+            _certificate('Asha Rao').save(original)
+            resubmitted = os.path.join(tmp, 'resubmitted.jpg')
+            _certificate('Asha Rao', size=(1200, 848)).save(resubmitted, quality=70)
+            classmate = os.path.join(tmp, 'classmate.png')
+            _certificate('Vikram Singh').save(classmate)
+            unrelated = os.path.join(tmp, 'unrelated.png')
+            other = Image.new('RGB', (1130, 1600), 'white')
+            ImageDraw.Draw(other).ellipse([100, 100, 500, 500], fill=(200, 30, 30))
+            other.save(unrelated)
+            
+            def fields(name, cert_id=''):
+                return {'name': {'value': name, 'conf': 0.9}, 'cert_id': {'value': cert_id, 'conf': 0.8}}
+            
+            first = duplicate_index.index_upload('first', original, fields('Asha Rao', 'CERT-001'))
+            assert first['phash'] and first['near_duplicates'] == []
+            
+            second = duplicate_index.index_upload('second', resubmitted, fields('ASHA  RAO'))
+            print(f"Resubmission flags: {second['near_duplicates']}")
+            assert [(dup['upload_id'], dup['identity_match']) for dup in second['near_duplicates']] == [('first', True)]
+            
+            # Same certificate under another student's name: still flagged, with the mismatch shown
+            third = duplicate_index.index_upload('third', classmate, fields('Vikram Singh', 'CERT-002'))
+            print(f"Other-name flags: {third['near_duplicates']}")
+            assert sorted((dup['upload_id'], dup['identity_match']) for dup in third['near_duplicates']) == \
+                [('first', False), ('second', False)]
+            
+            # Nothing read to compare
+            unread = duplicate_index.index_upload('unread', classmate)
+            assert sorted(dup['upload_id'] for dup in unread['near_duplicates']) == ['first', 'second', 'third']
+            assert all(dup['identity_match'] is None for dup in unread['near_duplicates'])
+            
+            assert duplicate_index.index_upload('fourth', unrelated)['near_duplicates'] == []
+            
+            # Re-indexing an upload does not report it as its own duplicate
+            again = duplicate_index.index_upload('first', original, fields('Asha Rao', 'CERT-001'))
+            assert sorted(dup['upload_id'] for dup in again['near_duplicates']) == ['second', 'third', 'unread']
+            
+            # Deleted uploads leave the index
+            assert duplicate_index.remove('second') and not duplicate_index.remove('second')
+            again = duplicate_index.index_upload('first', original, fields('Asha Rao', 'CERT-001'))
+            assert sorted(dup['upload_id'] for dup in again['near_duplicates']) == ['third', 'unread']
+            
+            text = os.path.join(tmp, 'pasted.txt')
+            with open(text, 'w') as f:
+                f.write('Certificate of Internship')
+            assert duplicate_index.index_upload('pasted', text) == {'phash': None, 'near_duplicates': []}
+        finally:
+            duplicate_index.DUPLICATE_DB = original_db
+    
+    print("\n✓ Test passed: Near-duplicates found through LSH buckets")
+    print("=" * 60)
+
+
+def test_record_api_hides_duplicate_flags():
+    """Test the student-facing record endpoint leaves out duplicate flags and matcher state"""
+    
+    import app as portal
+    import audit_log
+    import record_store
+    
+    original_db, original_folder = audit_log.AUDIT_DB, record_store.DB_FOLDER
+    with tempfile.TemporaryDirectory() as tmp:
+        audit_log.AUDIT_DB = os.path.join(tmp, 'audit.sqlite3')
+        record_store.DB_FOLDER = tmp
+        portal.app.testing = True
+        try:
+            record_store.save_record({
+                'internship_id': 'DUP-API',
+                'decision': 'review',
+                'near_duplicates': [{'upload_id': 'other', 'distance': 0, 'identity_match': False}],
+                'match_state': {'catalogue_version': 'v1'},
+            })
+            
+            client = portal.app.test_client()
+            for url in ('/api/internship/DUP-API', '/api/internship/DUP-API?include_trail=1'):
+                data = client.get(url).get_json()
+                assert data['decision'] == 'review'
+                assert 'near_duplicates' not in data and 'match_state' not in data
+            
+            # Still on the stored record for the mentor
+            assert record_store.load_record('DUP-API')['near_duplicates']
+        finally:
+            audit_log.AUDIT_DB, record_store.DB_FOLDER = original_db, original_folder
+            portal.app.testing = False
+
+
+if __name__ == '__main__':
+    test_lsh_lookup_and_upload_flags()
+    test_record_api_hides_duplicate_flags()
+    print("\n✓ All near-duplicate index tests completed!\n")
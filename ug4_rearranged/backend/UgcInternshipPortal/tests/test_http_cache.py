@@ -0,0 +1,82 @@
+"""
+Unit tests for conditional GET handling and the rendered page cache
+"""
+
+import sys
+import os
+import time
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+
+from http_cache import file_validators, conditional_response, RenderedCache
+
+
+def test_etag_revalidation_and_page_cache():
+    """Test 304s while a file is unchanged and fresh content after it changes"""
+    
+    print("\n" + "=" * 60)
+    print("TEST: Conditional GET")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'record.rec')
+        with open(path, 'w') as f:
+            f.write('version 1')
+        
+        pages = RenderedCache(max_entries=2)
+        renders = []
+        app = Flask(__name__)
+        
+        @app.route('/page')
+        def page():
+            validators = file_validators(path)
+            etag = validators[0]
+            
+            def build():
+                html = pages.get('record', etag)
+                if html is None:
+                    with open(path) as f:
+                        html = f"<p>{f.read()}</p>"
+                    renders.append(html)
+                    pages.put('record', etag, html)
+                return html
+            
+            return conditional_response(validators, 'private, no-cache', build)
+        
+        client = app.test_client()
+        first = client.get('/page')
+        etag = first.headers['ETag']
+        assert first.status_code == 200 and first.headers['Cache-Control'] == 'private, no-cache'
+        
+        repeat = client.get('/page', headers={'If-None-Match': etag})
+        print(f"\nRevalidation status: {repeat.status_code}")
+        assert repeat.status_code == 304 and repeat.data == b''
+        
+        # Unconditional reload reuses the rendered page
+        assert client.get('/page').data == b'<p>version 1</p>'
+        assert len(renders) == 1
+        
+        time.sleep(0.01)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write('version 2')
+        os.replace(tmp_path, path)
+        
+        changed = client.get('/page', headers={'If-None-Match': etag})
+        print(f"After change: {changed.status_code} {changed.data}")
+        assert changed.status_code == 200 and changed.data == b'<p>version 2</p>'
+        assert changed.headers['ETag'] != etag
+        assert len(renders) == 2
+        
+        assert file_validators(os.path.join(tmp, 'missing.rec')) is None
+        assert file_validators(path, 'a')[0] != file_validators(path, 'b')[0]
+    
+    print("\n✓ Test passed: Unchanged files revalidate with 304")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    test_etag_revalidation_and_page_cache()
+    print("\n✓ All HTTP cache tests completed!\n")
@@ -0,0 +1,118 @@
+"""
+Unit tests for the persisted, memory-mapped course index
+"""
+
+import sys
+import os
+import tempfile
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from course_index import CourseIndex
+from index_store import save_course_index, load_course_index, SortedLookup
+from ann_index import IVFIndex, normalize_rows
+from wmd_matcher import WMDMatcher, DEFAULT_CURRICULUM
+from ceescm import tokenize
+
+
+def test_round_trip_memory_mapped():
+    """Test a saved index loads memory-mapped and scores identically"""
+    
+    print("\n" + "=" * 60)
+    print("TEST: Persisted Course Index")
+    print("=" * 60)
+    
+    built = CourseIndex(DEFAULT_CURRICULUM, ann_min_courses=0)
+    texts = [' '.join(tokenize("Built a react native mobile app backed by a flask api"))]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = os.path.join(tmp, 'index')
+        save_course_index(built, folder, 'abc123')
+        
+        loaded = load_course_index(folder, catalogue_checksum='abc123')
+        assert loaded is not None
+        assert isinstance(loaded.term_courses, np.memmap)
+        assert list(loaded.course_ids) == built.course_ids
+        assert list(loaded.course_titles) == built.course_titles
+        assert list(loaded.course_keywords) == built.course_keywords
+        assert list(loaded.course_word_sets) == built.course_word_sets
+        
+        # String tables and lookups stay in the mapped files
+        assert isinstance(loaded.course_ids.blob, np.memmap)
+        assert isinstance(loaded.vocab, SortedLookup) and isinstance(loaded.vocab.sorted_keys, np.memmap)
+        assert dict(loaded.vocab) == built.vocab
+        assert sorted(loaded.term_ids({'react', 'flask', 'zzz'})) == sorted(built.term_ids({'react', 'flask', 'zzz'}))
+        assert loaded.course_positions['CS302'] == built.course_ids.index('CS302')
+        assert 'CS999' not in loaded.course_positions
+        assert np.allclose(loaded.similarity_matrix(texts), built.similarity_matrix(texts))
+        assert loaded.keyword_index.match(texts[0]) == built.keyword_index.match(texts[0])
+        assert loaded.ann is not None
+        
+        matcher = WMDMatcher(curriculum_db=DEFAULT_CURRICULUM, course_index=loaded)
+        assert matcher.find_matches(texts[0].split(), threshold=0.0) == \
+            WMDMatcher(curriculum_db=DEFAULT_CURRICULUM, course_index=built).find_matches(texts[0].split(), threshold=0.0)
+        
+        # Stale catalogue checksum is rejected
+        assert load_course_index(folder, catalogue_checksum='other') is None
+    
+    print("\n✓ Test passed: Memory-mapped index matches built index")
+    print("=" * 60)
+
+
+def test_corrupt_index_rejected():
+    """Test integrity checks reject a modified array file"""
+    
+    built = CourseIndex(DEFAULT_CURRICULUM)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = os.path.join(tmp, 'index')
+        save_course_index(built, folder, 'abc123')
+        
+        path = os.path.join(folder, 'term_courses.bin')
+        data = bytearray(open(path, 'rb').read())
+        data[0] ^= 0xFF
+        with open(path, 'wb') as f:
+            f.write(data)
+        
+        assert load_course_index(folder, catalogue_checksum='abc123') is None
+        
+        # Rebuilding replaces the corrupt folder
+        save_course_index(built, folder, 'abc123')
+        assert load_course_index(folder, catalogue_checksum='abc123', verify=True) is not None
+        
+        # A damaged ANN sub-index fails the whole load (and so gets rebuilt)
+        with_ann = CourseIndex(DEFAULT_CURRICULUM, ann_min_courses=0)
+        save_course_index(with_ann, folder, 'abc123')
+        with open(os.path.join(folder, 'ann', 'list_members.npy'), 'ab') as f:
+            f.write(b'\0' * 8)
+        assert IVFIndex.load(os.path.join(folder, 'ann')) is None
+        assert load_course_index(folder, catalogue_checksum='abc123') is None
+
+
+def test_ann_resave_swaps_whole_generation():
+    """Test re-saving an ANN index replaces every file at once"""
+    
+    rng = np.random.default_rng(0)
+    first = IVFIndex.build(normalize_rows(rng.random((64, 8)).astype(np.float32)), n_lists=4)
+    second = IVFIndex.build(normalize_rows(rng.random((96, 8)).astype(np.float32)), n_lists=6)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = os.path.join(tmp, 'ann')
+        first.save(folder)
+        mapped = IVFIndex.load(folder)
+        
+        second.save(folder)
+        reloaded = IVFIndex.load(folder)
+        assert reloaded.meta == second.meta
+        assert len(reloaded.list_members) == 96 and reloaded.centroids.shape[0] == 6
+        # The earlier generation stays readable through its mappings
+        assert mapped.centroids.shape[0] == 4 and len(mapped.list_members) == 64
+        # No temporary or stale folders are left behind
+        assert os.listdir(tmp) == ['ann']
+
+
+if __name__ == '__main__':
+    test_round_trip_memory_mapped()
+    test_corrupt_index_rejected()
+    test_ann_resave_swaps_whole_generation()
+    print("\n✓ All index store tests completed!\n")
@@ -0,0 +1,97 @@
+"""
+Unit tests for the NLP parse cache
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import spacy
+import numpy as np
+from nlp_cache import NLPCache, ParsedDoc, cache_owner, purge_owners
+
+
+def test_memory_and_disk_hits():
+    """Test repeated texts are served from memory, then from disk in a new process"""
+    
+    print("\n" + "=" * 60)
+    print("TEST: NLP Parse Cache")
+    print("=" * 60)
+    
+    nlp = spacy.blank('en')
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = NLPCache(nlp, folder=tmp, max_entries=2)
+        
+        first = cache("Acme Technologies Pvt Ltd")
+        # Normalization: line endings and surrounding whitespace share a key
+        assert cache("  Acme Technologies Pvt Ltd\r\n") is first
+        assert [t.text for t in first] == ['Acme', 'Technologies', 'Pvt', 'Ltd']
+        
+        cache("Worked on the frontend")
+        cache("Wrote unit tests")
+        # LRU: the first entry was evicted from memory but is still on disk
+        again = cache("Acme Technologies Pvt Ltd")
+        assert [t.text for t in again] == [t.text for t in first]
+        
+        stats = cache.stats()
+        print(f"\nStats: {stats}")
+        assert (stats['memory_hits'], stats['disk_hits'], stats['misses']) == (1, 1, 3)
+        assert stats['hit_rate'] == 0.4
+        
+        # A worker with an empty memory level reuses the disk entries
+        other = NLPCache(nlp, folder=tmp)
+        other("Wrote unit tests")
+        assert other.stats()['disk_hits'] == 1
+    
+    print("\n✓ Test passed: Parses reused across requests")
+    print("=" * 60)
+
+
+def test_disk_budget_and_roundtrip():
+    """Test the disk level stays within budget and parses survive serialization"""
+    
+    nlp = spacy.blank('en')
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = NLPCache(nlp, folder=tmp, disk_mb=0.002)
+        for i in range(40):
+            cache(f"Internship log entry number {i} with some repeated boilerplate text")
+        
+        _, total = cache._scan_disk()
+        assert total <= cache.disk_budget
+        
+        doc = ParsedDoc.from_dict(cache("Internship log entry number 39 with some repeated boilerplate text").to_dict())
+        assert len(doc) == 10
+        other = ParsedDoc([], [], [], np.array([1.0, 0.0], dtype=np.float32))
+        assert doc.similarity(other) == 0.0
+        assert other.similarity(other) == 1.0
+
+
+def test_purge_owner_entries():
+    """Test parses made for a deleted submission are removed from disk"""
+    
+    nlp = spacy.blank('en')
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = NLPCache(nlp, folder=tmp)
+        with cache_owner('upload-1'):
+            cache("Certificate awarded to Asha Rao")
+            cache("Certificate awarded to Asha Rao")
+        with cache_owner('internship-1'):
+            cache("Built dashboards in React")
+        cache("Course text shared by everyone")
+        
+        assert purge_owners(['internship-1', 'upload-1', None], folder=tmp) == 2
+        assert purge_owners(['upload-1'], folder=tmp) == 0
+        
+        other = NLPCache(nlp, folder=tmp)
+        other("Certificate awarded to Asha Rao")
+        other("Built dashboards in React")
+        other("Course text shared by everyone")
+        assert (other.stats()['disk_hits'], other.stats()['misses']) == (1, 2)
+
+
+if __name__ == '__main__':
+    test_memory_and_disk_hits()
+    test_disk_budget_and_roundtrip()
+    test_purge_owner_entries()
+    print("\n✓ All NLP cache tests completed!\n")
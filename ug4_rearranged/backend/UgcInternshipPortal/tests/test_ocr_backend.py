@@ -0,0 +1,139 @@
+"""
+Unit tests for the OCR backends
+"""
+
+import sys
+import os
+import time
+import threading
+from types import SimpleNamespace
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from PIL import Image
+
+import ocr_backend
+from ocr_backend import OCRBackend, PytesseractBackend, TesserocrPoolBackend
+
+
+class FakeEngine:
+    """Stands in for tesserocr.PyTessBaseAPI; loading is the expensive part"""
+    
+    created = []
+    
+    def __init__(self, lang, psm, path=None):
+        time.sleep(0.01)
+        self.lang = lang
+        self.psm = psm
+        self.image = None
+        self.busy = False
+        FakeEngine.created.append(self)
+    
+    def SetPageSegMode(self, psm):
+        self.psm = psm
+    
+    def SetImage(self, img):
+        assert not self.busy, "engine shared between threads"
+        self.busy = True
+        self.image = img
+    
+    def GetUTF8Text(self):
+        time.sleep(0.005)
+        return f"{self.image.size[0]}px psm{self.psm}"
+    
+    def Clear(self):
+        self.busy = False
+        self.image = None
+    
+    def End(self):
+        pass
+
+
+class MissingLanguageEngine:
+    def __init__(self, **kwargs):
+        raise RuntimeError("Failed to init API, possibly an invalid tessdata path")
+
+
+class FallbackBackend(OCRBackend):
+    name = 'fallback'
+    
+    def image_to_string(self, img, config=''):
+        return f"fallback {config}"
+    
+    def image_to_data(self, img, config=''):
+        return {'text': [f"fallback {config}"]}
+
+
+FAKE_TESSEROCR = SimpleNamespace(PyTessBaseAPI=FakeEngine, PSM=SimpleNamespace(AUTO=3))
+
+
+def test_pool_reuses_warm_engines():
+    """Test engine reuse across threads, PSM configs and pytesseract fallback"""
+    
+    print("\n" + "=" * 60)
+    print("TEST: OCR Engine Pool")
+    print("=" * 60)
+    
+    original = ocr_backend.tesserocr
+    ocr_backend.tesserocr = FAKE_TESSEROCR
+    FakeEngine.created = []
+    try:
+        pool = TesserocrPoolBackend(pool_size=2, fallback=FallbackBackend())
+        pool.warm()
+        assert len(FakeEngine.created) == 2
+        
+        page = Image.new('L', (1240, 1754), 255)
+        results = []
+        
+        def worker():
+            for _ in range(5):
+                results.append(pool.image_to_string(page))
+        
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        print(f"\nEngines created for {len(results)} pages: {len(FakeEngine.created)}")
+        assert results == ['1240px psm3'] * 20
+        assert len(FakeEngine.created) == 2
+        
+        # Page segmentation mode per call, reset afterwards
+        assert pool.image_to_string(page, config='--psm 11') == '1240px psm11'
+        assert pool.image_to_string(page) == '1240px psm3'
+        
+        # Options the pool does not translate go to the fallback backend
+        assert pool.image_to_string(page, config='--oem 1') == 'fallback --oem 1'
+        
+        # Backends without both calls cannot be constructed
+        class PartialBackend(OCRBackend):
+            def image_to_string(self, img, config=''):
+                return ''
+        try:
+            PartialBackend()
+            assert False, "incomplete backend was created"
+        except TypeError:
+            pass
+        
+        # One backend per process, created on first use
+        ocr_backend._backend = None
+        assert ocr_backend.get_ocr_backend() is ocr_backend.get_ocr_backend()
+        ocr_backend._backend_pid = -1
+        inherited = ocr_backend._backend
+        assert ocr_backend.get_ocr_backend() is not inherited
+        ocr_backend._backend = None
+        
+        # Engines that cannot load (no language data) leave pytesseract in charge
+        FAKE_TESSEROCR.PyTessBaseAPI = MissingLanguageEngine
+        assert isinstance(ocr_backend._create_backend('auto'), PytesseractBackend)
+    finally:
+        FAKE_TESSEROCR.PyTessBaseAPI = FakeEngine
+        ocr_backend.tesserocr = original
+    
+    print("\n✓ Test passed: Pages share a fixed set of warm engines")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    test_pool_reuses_warm_engines()
+    print("\n✓ All OCR backend tests completed!\n")
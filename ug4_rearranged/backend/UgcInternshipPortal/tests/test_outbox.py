@@ -0,0 +1,212 @@
+"""
+Unit tests for the ABC delivery outbox
+"""
+
+import sys
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import abc_portal
+import abc_outbox
+import record_store
+from abc_stub import StubABCRegistry
+
+
+@contextmanager
+def _temp_db():
+    original = (record_store.DB_FOLDER, abc_outbox.OUTBOX_DB,
+                abc_portal.ABC_RECORDS_FILE, abc_portal.ABC_USERS_FILE)
+    with tempfile.TemporaryDirectory() as tmp:
+        record_store.DB_FOLDER = tmp
+        abc_outbox.OUTBOX_DB = os.path.join(tmp, 'abc_outbox.sqlite3')
+        abc_portal.ABC_RECORDS_FILE = os.path.join(tmp, 'abc_records.json')
+        abc_portal.ABC_USERS_FILE = os.path.join(tmp, 'abc_users.json')
+        abc_portal._users_cache['signature'] = None
+        try:
+            yield tmp
+        finally:
+            (record_store.DB_FOLDER, abc_outbox.OUTBOX_DB,
+             abc_portal.ABC_RECORDS_FILE, abc_portal.ABC_USERS_FILE) = original
+            abc_portal._users_cache['signature'] = None
+
+
+def _queue_approval(internship_id, credits=2):
+    record = {
+        'internship_id': internship_id,
+        'form_data': {'name': 'Test Student', 'apaar_id': f"APAAR-{internship_id}", 'organization': 'Org',
+                      'internship_title': 'Intern', 'start_date': '', 'end_date': '', 'hours': '80'},
+        'abc_token': None,
+        'abc_status': 'queued',
+    }
+    payload = {'student_name': 'Test Student', 'apaar_id': f"APAAR-{internship_id}", 'credits': credits,
+               'internship_id': internship_id, 'timestamp': '2024-01-01T00:00:00'}
+    approval = {'credits': credits, 'top_match': 'CS301', 'composite_score': 0.8,
+                'approved_by': 'Mentor', 'report_path': '', 'notes': ''}
+    return abc_outbox.save_record_with_outbox(record, payload, approval)
+
+
+def test_outbox_delivers_with_retries():
+    """Test queued approvals survive registry failures and are delivered once"""
+    
+    print("\n" + "=" * 60)
+    print("TEST: ABC Outbox Delivery")
+    print("=" * 60)
+    
+    with _temp_db(), StubABCRegistry() as registry:
+        original_base = abc_outbox.BACKOFF_BASE
+        abc_outbox.BACKOFF_BASE = 0
+        client = abc_outbox.HTTPABCClient(registry.url, pool_size=2)
+        worker = abc_outbox.DeliveryWorker(client, batch_size=10)
+        
+        try:
+            keys = [_queue_approval(f"INT-{i}") for i in range(3)]
+            # Re-queueing the same approval does not create a second delivery
+            assert _queue_approval('INT-0') == keys[0]
+            assert len(abc_outbox.outbox_status()) == 3
+            
+            # Registry down for the first batch: rows stay pending with an error
+            registry.fail_next = 3
+            assert worker.run_once() == 3
+            rows = abc_outbox.outbox_status()
+            assert all(r['status'] == 'pending' and r['attempts'] == 1 for r in rows)
+            assert record_store.load_record('INT-1')['abc_status'] == 'queued'
+            
+            assert worker.run_once() == 3
+            assert worker.run_once() == 0
+            
+            record = record_store.load_record('INT-1')
+            print(f"\nDelivered token: {record['abc_token']} ({record['abc_status']})")
+            assert record['abc_token'].startswith('ABC-TOK-')
+            assert len(registry.submissions) == 3
+            assert abc_portal.load_abc_records()['INT-1']['abc_token'] == record['abc_token']
+            
+            # Status reconciliation picks up the registry's processed state
+            assert worker.reconcile() == 3
+            assert record_store.load_record('INT-1')['abc_status'] == 'processed'
+            
+            # A mentor re-push of a delivered approval keeps its token and status
+            _queue_approval('INT-1')
+            record = record_store.load_record('INT-1')
+            assert record['abc_status'] == 'processed' and record['abc_token'].startswith('ABC-TOK-')
+            assert worker.run_once() == 0 and len(registry.submissions) == 3
+        finally:
+            abc_outbox.BACKOFF_BASE = original_base
+            client.close()
+            abc_portal.flush_provisioning()
+    
+    print("\n✓ Test passed: Approvals delivered despite registry failures")
+    print("=" * 60)
+
+
+def test_permanent_failure_marks_record():
+    """Test a submission the registry rejects is not retried forever"""
+    
+    with _temp_db():
+        def reject(payload):
+            raise abc_outbox.DeliveryError('Invalid APAAR ID', permanent=True)
+        
+        worker = abc_outbox.DeliveryWorker(abc_outbox.LocalABCTransport(reject))
+        _queue_approval('INT-X')
+        assert worker.run_once() == 1
+        
+        row = abc_outbox.outbox_status('INT-X')[0]
+        assert row['status'] == 'failed' and row['last_error'] == 'Invalid APAAR ID'
+        assert record_store.load_record('INT-X')['abc_status'] == 'delivery_failed'
+        
+        # Approving again re-queues the delivery
+        _queue_approval('INT-X')
+        assert abc_outbox.outbox_status('INT-X')[0]['status'] == 'pending'
+
+
+def test_reconcile_backs_off_and_updates_under_lock():
+    """Test unchanged registry status is not re-polled every cycle"""
+    
+    with _temp_db():
+        polls = []
+        transport = abc_outbox.LocalABCTransport(lambda payload: {'abc_token': 'TOK', 'status': 'accepted'})
+        transport.status = lambda token: polls.append(token) or {'abc_token': token, 'status': 'accepted'}
+        worker = abc_outbox.DeliveryWorker(transport)
+        
+        _queue_approval('INT-R')
+        assert worker.run_once() == 1
+        assert worker.reconcile() == 0 and len(polls) == 1
+        # Still 'accepted': the next poll waits for RECONCILE_INTERVAL
+        assert worker.reconcile() == 0 and len(polls) == 1
+        
+        # Worker updates wait for a mentor holding the record lock
+        with record_store.record_lock('INT-R'):
+            updater = threading.Thread(target=record_store.update_record,
+                                       args=('INT-R', lambda record: record.update(abc_status='processed')))
+            updater.start()
+            updater.join(0.2)
+            assert updater.is_alive()
+            record = record_store.load_record('INT-R')
+            record['notes'] = 'mentor edit'
+            record_store.save_record(record)
+        updater.join(5)
+        record = record_store.load_record('INT-R')
+        assert record['notes'] == 'mentor edit' and record['abc_status'] == 'processed'
+
+
+def _delete_student(internship_id):
+    with record_store.record_lock(internship_id):
+        record_store.delete_record(internship_id)
+        return abc_outbox.purge(internship_id)
+
+
+def test_purge_cancels_deliveries_of_deleted_record():
+    """Test deleting a record stops its queued and in-flight deliveries"""
+    
+    with _temp_db():
+        uploads = []
+        transport = abc_outbox.LocalABCTransport(lambda payload: uploads.append(payload) or {'abc_token': 'TOK'})
+        worker = abc_outbox.DeliveryWorker(transport)
+        
+        # Queued, never sent: removed with the record
+        _queue_approval('INT-Q')
+        assert _delete_student('INT-Q') == 1
+        assert abc_outbox.outbox_status('INT-Q') == []
+        assert worker.run_once() == 0 and uploads == []
+        
+        # Deleted while the worker is sending: the receipt is kept without the student's data
+        _queue_approval('INT-S')
+        transport.upload_func = lambda payload: _delete_student('INT-S') and {'abc_token': 'TOK-S'}
+        assert worker.run_once() == 1
+        row = abc_outbox.outbox_status('INT-S')[0]
+        assert row['status'] == 'delivered' and row['abc_token'] == 'TOK-S'
+        assert row['payload'] == '{}' and row['approval'] == '{}'
+        assert record_store.load_record('INT-S') is None
+        assert 'INT-S' not in abc_portal.load_abc_records()
+        
+        # Deleted while sending and the call failed: nothing is left to retry
+        _queue_approval('INT-F')
+        
+        def fail(payload):
+            _delete_student('INT-F')
+            raise abc_outbox.DeliveryError('timeout')
+        
+        transport.upload_func = fail
+        assert worker.run_once() == 1
+        assert abc_outbox.outbox_status('INT-F') == []
+
+
+def test_local_transport_token_cache_bounded():
+    """Test the simulator transport only remembers recent idempotency keys"""
+    
+    transport = abc_outbox.LocalABCTransport(lambda payload: {'abc_token': payload['n']}, max_tokens=3)
+    for n in range(10):
+        transport.upload({'n': n}, f"key-{n}")
+    assert list(transport._tokens) == ['key-7', 'key-8', 'key-9']
+    assert transport.upload({'n': 99}, 'key-8') == {'abc_token': 8}
+
+
+if __name__ == '__main__':
+    test_outbox_delivers_with_retries()
+    test_permanent_failure_marks_record()
+    test_reconcile_backs_off_and_updates_under_lock()
+    test_purge_cancels_deliveries_of_deleted_record()
+    test_local_transport_token_cache_bounded()
+    print("\n✓ All outbox tests completed!\n")
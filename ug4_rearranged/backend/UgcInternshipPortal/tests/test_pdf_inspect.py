@@ -0,0 +1,138 @@
+"""
+Unit tests for PDF pre-inspection and per-page extraction routing
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from PIL import Image
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+import extractor
+import pdf_inspect
+
+
+def _mixed_pdf(path, scan_path):
+    """Text page, scanned page, blank page, then more text pages"""
+    pdf = canvas.Canvas(path, pagesize=A4)
+    width, height = A4
+    pdf.drawString(72, height - 72, "Certificate of Internship - Asha Rao")
+    pdf.showPage()
+    pdf.drawImage(scan_path, 0, 0, width=width, height=height)
+    pdf.showPage()
+    pdf.showPage()
+    for i in range(5):
+        pdf.drawString(72, height - 72, f"Logbook page {i}")
+        pdf.showPage()
+    pdf.save()
+
+
+def test_pages_routed_to_text_ocr_or_skip():
+    """Test page modes, the page budget and that text pages are never OCR'd"""
+    
+    print("\n" + "=" * 60)
+    print("TEST: PDF Pre-inspection")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        scan_path = os.path.join(tmp, 'scan.png')
+        Image.new('RGB', (400, 560), 'white').save(scan_path)
+        path = os.path.join(tmp, 'mixed.pdf')
+        _mixed_pdf(path, scan_path)
+        
+        plan = pdf_inspect.inspect_pdf(path, page_budget=4)
+        print(f"\nPlan: {plan}")
+        assert [p.mode for p in plan] == ['text', 'ocr', 'skip', 'text']
+        assert plan[1].image_coverage > 0.9
+        assert pdf_inspect.page_count(path) == 8
+        
+        ocr_calls = []
+        original_convert = extractor.convert_from_path
+        
+        def fake_convert(file_path, first_page, last_page):
+            ocr_calls.append(first_page)
+            return [Image.new('RGB', (10, 10))]
+        
+        extractor.convert_from_path = fake_convert
+        field_extractor = extractor.FieldExtractor()
+        field_extractor._ocr_image = lambda img: "Scanned page text"
+        try:
+            text = field_extractor._read_pdf(path)
+        finally:
+            extractor.convert_from_path = original_convert
+        
+        print(f"Text: {text!r}")
+        assert ocr_calls == [2]
+        lines = text.split('\n')
+        assert lines[0] == "Certificate of Internship - Asha Rao"
+        assert lines[1] == "Scanned page text"
+        # Default budget stops before the last logbook pages
+        assert len(lines) == 2 + pdf_inspect.PDF_PAGE_BUDGET - 3
+    
+    print("\n✓ Test passed: Each page read once by the cheapest suitable path")
+    print("=" * 60)
+
+
+def test_pages_without_text_layer_fall_back_to_ocr():
+    """Test inline images count as scans and vector-only documents are still OCR'd"""
+    
+    print("\n" + "=" * 60)
+    print("TEST: PDF Pages Without a Text Layer")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        scan_path = os.path.join(tmp, 'scan.png')
+        Image.new('RGB', (40, 56), 'white').save(scan_path)
+        width, height = A4
+        
+        inline = os.path.join(tmp, 'inline.pdf')
+        pdf = canvas.Canvas(inline, pagesize=A4)
+        pdf.drawInlineImage(scan_path, 0, 0, width=width, height=height)
+        pdf.showPage()
+        pdf.save()
+        plan = pdf_inspect.inspect_pdf(inline)
+        print(f"\nInline image plan: {plan}")
+        assert plan[0].mode == 'ocr' and plan[0].image_coverage > 0.9
+        
+        # Text converted to outlines: shapes only, no text operators or images
+        outlined = os.path.join(tmp, 'outlined.pdf')
+        pdf = canvas.Canvas(outlined, pagesize=A4)
+        for i in range(3):
+            path = pdf.beginPath()
+            path.moveTo(72, height - 72)
+            path.curveTo(90, height - 40, 120, height - 100, 140, height - 72)
+            pdf.drawPath(path, fill=1)
+            pdf.showPage()
+        pdf.save()
+        assert [p.mode for p in pdf_inspect.inspect_pdf(outlined)] == ['skip'] * 3
+        
+        ocr_calls = []
+        original_convert = extractor.convert_from_path
+        
+        def fake_convert(file_path, first_page, last_page):
+            ocr_calls.append(first_page)
+            return [Image.new('RGB', (10, 10))]
+        
+        extractor.convert_from_path = fake_convert
+        field_extractor = extractor.FieldExtractor()
+        field_extractor._ocr_image = lambda img: "Outlined certificate text"
+        try:
+            text = field_extractor._read_pdf(outlined)
+        finally:
+            extractor.convert_from_path = original_convert
+        
+        print(f"OCR calls: {ocr_calls}")
+        assert ocr_calls == list(range(1, pdf_inspect.PDF_OCR_PAGE_BUDGET + 1))
+        assert text.startswith("Outlined certificate text")
+    
+    print("\n✓ Test passed: Pages without a text layer are not silently dropped")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    test_pages_routed_to_text_ocr_or_skip()
+    test_pages_without_text_layer_fall_back_to_ocr()
+    print("\n✓ All PDF inspection tests completed!\n")
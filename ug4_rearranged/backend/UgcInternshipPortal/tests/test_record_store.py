@@ -0,0 +1,102 @@
+"""
+Unit tests for compact record storage
+"""
+
+import sys
+import os
+import json
+import time
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import record_store
+from serialization import StoredRecord, encode_record
+
+
+def _sample_record(internship_id):
+    return {
+        'internship_id': internship_id,
+        'timestamp': '2024-01-01T10:00:00',
+        'form_data': {'name': 'Test Student', 'organization': 'Acme', 'hours': '120'},
+        'decision': 'Partially Equivalent',
+        'wmd_composite': 0.512,
+        'needs_review': True,
+        'ceescm_tokens': [f"token{i}" for i in range(2000)],
+        'wmd_matches': [{'course_id': f"CS{i}", 'course_title': 'Course', 'similarity': 0.5,
+                         'keywords_matched': ['react', 'flask']} for i in range(50)],
+        'changelog': [{'timestamp': '2024-01-01', 'action': 'mentor_review', 'by': 'mentor'}] * 200,
+    }
+
+
+def test_compact_roundtrip_and_legacy_reader():
+    """Test records round-trip, shrink on disk and legacy JSON files stay readable"""
+    
+    print("\n" + "=" * 60)
+    print("TEST: Compact Record Storage")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        record_store.DB_FOLDER = tmp
+        record = _sample_record('REC-1')
+        
+        # Legacy record as written by earlier versions
+        with open(record_store.legacy_record_path('REC-1'), 'w') as f:
+            json.dump(record, f, indent=2)
+        legacy_size = os.path.getsize(record_store.legacy_record_path('REC-1'))
+        assert record_store.load_record('REC-1') == record
+        
+        start = time.perf_counter()
+        for _ in range(50):
+            json.loads(open(record_store.legacy_record_path('REC-1')).read())
+        legacy_ms = (time.perf_counter() - start) * 20
+        
+        record_store.save_record(record)
+        assert not os.path.exists(record_store.legacy_record_path('REC-1'))
+        compact_size = os.path.getsize(record_store.record_path('REC-1'))
+        assert record_store.load_record('REC-1') == record
+        
+        start = time.perf_counter()
+        for _ in range(50):
+            record_store.load_stored_record('REC-1').summary()
+        summary_ms = (time.perf_counter() - start) * 20
+        
+        print(f"\nDisk: {legacy_size} -> {compact_size} bytes; "
+              f"parse {legacy_ms:.3f} ms (JSON) -> {summary_ms:.3f} ms (summary)")
+        assert compact_size < legacy_size * 0.7
+        
+        # API responses splice the stored blobs without decoding them
+        assert json.loads(record_store.load_record_json('REC-1')) == record
+        
+        summaries = list(record_store.iter_record_summaries())
+        assert [s['internship_id'] for s in summaries] == ['REC-1']
+        assert 'ceescm_tokens' not in summaries[0] and summaries[0]['needs_review']
+        
+        assert record_store.delete_record('REC-1')
+        assert record_store.load_record('REC-1') is None
+    
+    print("\n✓ Test passed: Records stored compactly")
+    print("=" * 60)
+
+
+def test_lazy_fields_decoded_on_demand():
+    """Test large fields are only parsed when read"""
+    
+    stored = StoredRecord.from_bytes(encode_record(_sample_record('REC-2')))
+    assert stored._decoded == {}
+    assert stored.get('wmd_composite') == 0.512
+    assert stored._decoded == {}
+    assert len(stored.get('ceescm_tokens')) == 2000
+    assert list(stored._decoded) == ['ceescm_tokens']
+    assert 'changelog' in stored and 'missing' not in stored
+    
+    try:
+        StoredRecord.from_bytes(encode_record(_sample_record('REC-3'))[:6])
+        assert False, "truncated record accepted"
+    except ValueError:
+        pass
+
+
+if __name__ == '__main__':
+    test_compact_roundtrip_and_legacy_reader()
+    test_lazy_fields_decoded_on_demand()
+    print("\n✓ All record store tests completed!\n")
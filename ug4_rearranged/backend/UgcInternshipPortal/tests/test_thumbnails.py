@@ -0,0 +1,121 @@
+"""
+Unit tests for cached certificate thumbnails
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from PIL import Image
+from docx import Document
+from docx.shared import Inches
+
+import thumbnails
+
+
+def test_thumbnails_cached_by_content():
+    """Test image, DOCX and text previews and reuse across identical uploads"""
+    
+    print("\n" + "=" * 60)
+    print("TEST: Certificate Thumbnails")
+    print("=" * 60)
+    
+    original_folder = thumbnails.THUMBNAIL_FOLDER
+    with tempfile.TemporaryDirectory() as tmp:
+        thumbnails.THUMBNAIL_FOLDER = os.path.join(tmp, 'thumbnails')
+        try:
+            scan = os.path.join(tmp, 'scan.png')
+            Image.new('RGB', (2480, 3508), (200, 220, 240)).save(scan)
+            copy = os.path.join(tmp, 'same_scan.png')
+            shutil.copy(scan, copy)
+            
+            docx_path = os.path.join(tmp, 'certificate.docx')
+            document = Document()
+            document.add_paragraph('Certificate of Internship')
+            document.add_picture(scan, width=Inches(6))
+            document.save(docx_path)
+            
+            text_path = os.path.join(tmp, 'pasted.txt')
+            with open(text_path, 'w') as f:
+                f.write('Certificate of Internship\nName: Asha Rao\n')
+            
+            first = thumbnails.get_thumbnail(scan)
+            print(f"\nThumbnail: {first}")
+            assert first is not None and first.endswith(thumbnails.THUMBNAIL_EXT)
+            with Image.open(first) as image:
+                assert max(image.size) == thumbnails.THUMBNAIL_SIZE
+            assert os.path.getsize(first) < os.path.getsize(scan)
+            
+            # Identical content shares one cached thumbnail
+            mtime = os.path.getmtime(first)
+            assert thumbnails.get_thumbnail(copy) == first
+            assert os.path.getmtime(first) == mtime
+            
+            thumbnails.pregenerate([docx_path, text_path, os.path.join(tmp, 'missing.pdf')])
+            thumbnails.wait_for_pregeneration()
+            docx_thumb = thumbnails.thumbnail_path(thumbnails.content_hash(docx_path))
+            text_thumb = thumbnails.thumbnail_path(thumbnails.content_hash(text_path))
+            assert os.path.exists(docx_thumb) and os.path.exists(text_thumb)
+            with Image.open(docx_thumb) as image:
+                # Embedded scan (portrait), not the text fallback
+                assert image.getpixel((image.width // 2, image.height // 2)) != (255, 255, 255)
+            
+            assert thumbnails.get_thumbnail(os.path.join(tmp, 'missing.pdf')) is None
+        finally:
+            thumbnails.THUMBNAIL_FOLDER = original_folder
+    
+    print("\n✓ Test passed: Thumbnails rendered once per content hash")
+    print("=" * 60)
+
+
+def test_concurrent_requests_render_once():
+    """Test simultaneous requests for one upload share a single render"""
+    
+    print("\n" + "=" * 60)
+    print("TEST: Concurrent Thumbnail Requests")
+    print("=" * 60)
+    
+    original_folder, original_render = thumbnails.THUMBNAIL_FOLDER, thumbnails.render_first_page
+    renders = []
+    
+    def slow_render(path):
+        renders.append(path)
+        time.sleep(0.05)
+        return original_render(path)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        thumbnails.THUMBNAIL_FOLDER = os.path.join(tmp, 'thumbnails')
+        thumbnails.render_first_page = slow_render
+        try:
+            scan = os.path.join(tmp, 'scan.png')
+            Image.new('RGB', (1200, 1600), (200, 220, 240)).save(scan)
+            
+            results = []
+            workers = [threading.Thread(target=lambda: results.append(thumbnails.get_thumbnail(scan)))
+                       for _ in range(8)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            
+            print(f"\nRenders: {len(renders)}, results: {len(set(results))}")
+            assert len(renders) == 1
+            assert len(set(results)) == 1 and results[0] is not None
+            # Lock entries go away once nobody waits on them
+            assert thumbnails._render_locks == {}
+        finally:
+            thumbnails.THUMBNAIL_FOLDER = original_folder
+            thumbnails.render_first_page = original_render
+    
+    print("\n✓ Test passed: One render per upload")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    test_thumbnails_cached_by_content()
+    test_concurrent_requests_render_once()
+    print("\n✓ All thumbnail tests completed!\n")
@@ -4,10 +4,13 @@ Unit tests for WMD similarity matching
 
 import sys
 import os
+import tempfile
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from wmd_matcher import match_internship, WMDMatcher
+from wmd_matcher import match_internship, match_internships, rematch_internship, rematch_with_overrides, WMDMatcher
 from ceescm import tokenize
+from course_index import CourseIndex
+from ann_index import IVFIndex
 
 
 def test_web_development_match():
@@ -158,6 +161,158 @@ def test_custom_keywords():
     print("=" * 60)
 
 
+def test_batch_matching():
+    """Test batch matrix scoring agrees with per-record matching"""
+    
+    print("\n" + "=" * 60)
+    print("TEST 6: Batch Matching (N x M)")
+    print("=" * 60)
+    
+    descriptions = [
+        "Built responsive web pages with HTML, CSS, JavaScript and React",
+        "Wrote SQL queries and designed tables in PostgreSQL database",
+        "Deployed docker containers on AWS cloud with kubernetes",
+        "Marketing internship focused on social media campaigns",
+    ]
+    batch_tokens = [tokenize(desc) for desc in descriptions]
+    
+    matcher = WMDMatcher()
+    similarity = matcher.score_matrix(batch_tokens)
+    assert similarity.shape == (len(descriptions), len(matcher.curriculum_db))
+    
+    batch_results = match_internships(batch_tokens)
+    
+    for tokens, (matches, composite, decision) in zip(batch_tokens, batch_results):
+        single_matches, single_composite, single_decision = match_internship(tokens)
+        print(f"Composite: batch={composite} single={single_composite} ({decision})")
+        
+        assert abs(composite - single_composite) <= 0.002
+        assert [m['course_id'] for m in matches[:1]] == [m['course_id'] for m in single_matches[:1]]
+    
+    print("\n✓ Test passed: Batch results match per-record matching")
+    print("=" * 60)
+
+
+def test_keyword_index_boundaries():
+    """Test multi-word keywords match at token boundaries only"""
+    
+    print("\n" + "=" * 60)
+    print("TEST 7: Keyword Index (token boundaries)")
+    print("=" * 60)
+    
+    matcher = WMDMatcher()
+    index = matcher.course_index.keyword_index
+    
+    hits = index.match("maintained a react native app and studied machine_learning")
+    print(f"\nKeyword hits: {hits}")
+    
+    assert hits['CS304'] == ['app', 'react native']
+    assert 'machine learning' in hits['CS303']
+    # 'ai' must not match inside 'maintained'
+    assert 'ai' not in hits.get('CS303', [])
+    assert 'react' in hits['CS301']
+    
+    print("\n✓ Test passed: Keywords matched at token boundaries")
+    print("=" * 60)
+
+
+def test_ann_candidate_stage():
+    """Test ANN candidates keep exact scores and threshold semantics"""
+    
+    print("\n" + "=" * 60)
+    print("TEST 8: ANN Candidate Retrieval")
+    print("=" * 60)
+    
+    base = WMDMatcher()
+    with tempfile.TemporaryDirectory() as tmp:
+        index = CourseIndex(base.curriculum_db, base.nlp, ann_min_courses=0, ann_folder=tmp)
+        matcher = WMDMatcher(curriculum_db=base.curriculum_db, course_index=index)
+        tokens = tokenize("Deployed docker containers to AWS cloud using kubernetes and devops")
+        
+        exact = matcher.find_matches(tokens, use_ann=False)
+        # Probing every list is equivalent to exact scoring
+        assert matcher.find_matches(tokens, n_probe=index.ann.n_lists) == exact
+        
+        approx = matcher.find_matches(tokens, n_probe=1)
+        exact_scores = {m['course_id']: m['similarity'] for m in exact}
+        for match in approx:
+            assert match['similarity'] >= 0.3
+            assert exact_scores[match['course_id']] == match['similarity']
+        print(f"\nExact: {len(exact)} matches, ANN (1 probe): {len(approx)} matches")
+        
+        # Persisted index is memory-mapped on load
+        loaded = IVFIndex.load(tmp)
+        assert loaded.meta['count'] == len(index)
+        assert hasattr(loaded.list_members, 'filename')
+        
+        # Reused for the same catalogue; rebuilt after an edit that keeps the course count
+        reused = CourseIndex(base.curriculum_db, base.nlp, ann_min_courses=0, ann_folder=tmp)
+        assert hasattr(reused.ann.list_members, 'filename')
+        edited = dict(base.curriculum_db)
+        first_id = next(iter(edited))
+        edited[first_id] = dict(edited[first_id], description='Marine biology field work')
+        rebuilt = CourseIndex(edited, base.nlp, ann_min_courses=0, ann_folder=tmp)
+        assert not hasattr(rebuilt.ann.list_members, 'filename')
+        assert rebuilt.ann.meta['catalogue_digest'] != reused.ann.meta['catalogue_digest']
+    
+    print("\n✓ Test passed: ANN candidates scored exactly")
+    print("=" * 60)
+
+
+def test_incremental_rematch():
+    """Test keyword overrides rescored from stored state match a full re-run"""
+    
+    print("\n" + "=" * 60)
+    print("TEST 9: Incremental Re-matching")
+    print("=" * 60)
+    
+    tokens = ['html', 'css', 'javascript', 'web', 'react', 'api', 'flask']
+    custom_keywords = ['frontend', 'responsive', 'vue', 'server']
+    relevant = ['CS301', 'CS306']
+    
+    matcher = WMDMatcher()
+    state = matcher.match_state(tokens)
+    
+    incremental = rematch_internship(state, tokens, custom_keywords, relevant, WMDMatcher())
+    
+    full_matcher = WMDMatcher()
+    for course_id in relevant:
+        full_matcher.add_custom_keywords(course_id, custom_keywords)
+    full = match_internship(tokens + custom_keywords, full_matcher)
+    
+    print(f"\nIncremental: {incremental[1]} ({incremental[2]}), full: {full[1]} ({full[2]})")
+    assert incremental[0] and incremental[1:] == full[1:]
+    assert [(m['course_id'], m['similarity']) for m in incremental[0]] == \
+           [(m['course_id'], m['similarity']) for m in full[0]]
+    for inc, ful in zip(incremental[0], full[0]):
+        assert sorted(inc['keywords_matched']) == sorted(ful['keywords_matched'])
+    
+    # The state holds no vectors, and keywords spanning the old/new boundary are found
+    assert 'vector' not in state
+    tokens = ['mobile', 'app', 'android', 'ios', 'built', 'with', 'react']
+    incremental = rematch_internship(matcher.match_state(tokens), tokens, ['native'], ['CS304'], WMDMatcher())
+    assert 'react native' in incremental[0][0]['keywords_matched']
+    
+    # Overrides accumulated over several reviews, each with its own courses
+    tokens = ['html', 'css', 'javascript', 'web', 'react', 'api', 'flask']
+    overrides = {'CS301': ['frontend', 'vue'], 'CS306': ['vue', 'server']}
+    incremental = rematch_with_overrides(state, tokens, ['frontend', 'vue', 'server'], overrides, WMDMatcher())
+    full_matcher = WMDMatcher()
+    for course_id, keywords in overrides.items():
+        full_matcher.add_custom_keywords(course_id, keywords)
+    full = match_internship(tokens + ['frontend', 'vue', 'server'], full_matcher)
+    assert [(m['course_id'], m['similarity']) for m in incremental[0]] == \
+           [(m['course_id'], m['similarity']) for m in full[0]]
+    
+    # A state from another catalogue version is rejected
+    other = WMDMatcher(catalogue_version='global/v2-deadbeef')
+    assert rematch_internship(state, tokens, custom_keywords, relevant, other) is None
+    assert rematch_internship(None, tokens, custom_keywords, relevant, matcher) is None
+    
+    print("\n✓ Test passed: Incremental rescoring equals full re-match")
+    print("=" * 60)
+
+
 if __name__ == '__main__':
     print("\n" + "=" * 70)
     print(" WMD Similarity Matching Tests")
@@ -169,6 +324,10 @@ if __name__ == '__main__':
     test_mobile_development_match()
     test_low_match()
     test_custom_keywords()
+    test_batch_matching()
+    test_keyword_index_boundaries()
+    test_ann_candidate_stage()
+    test_incremental_rematch()
     
     print("\n" + "=" * 70)
     print("✓ All WMD tests completed successfully!")
@@ -0,0 +1,211 @@
+"""
+Certificate Thumbnails
+Small previews of the first page of uploads, generated on demand and cached by content hash
+"""
+
+import os
+import queue
+import zipfile
+import hashlib
+import threading
+from typing import Dict, Optional, Tuple
+
+from PIL import Image, ImageDraw, ImageOps, features
+
+from docx_reader import read_docx_text
+
+THUMBNAIL_FOLDER = os.environ.get('THUMBNAIL_FOLDER', 'uploads/thumbnails')
+THUMBNAIL_SIZE = int(os.environ.get('THUMBNAIL_SIZE', '320'))
+# Bump when rendering changes so old thumbnails are not reused
+THUMBNAIL_VERSION = 1
+
+THUMBNAIL_FORMAT = 'WEBP' if features.check('webp') else 'JPEG'
+THUMBNAIL_EXT = '.webp' if THUMBNAIL_FORMAT == 'WEBP' else '.jpg'
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tiff', '.bmp')
+
+
+def content_hash(path: str) -> str:
+    """SHA-256 of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# (path, mtime, size) -> content hash, so repeated requests skip rehashing
+_hashes: Dict[Tuple[str, int, int], str] = {}
+_hashes_lock = threading.Lock()
+
+
+def _cached_hash(path: str) -> str:
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _hashes_lock:
+        if key in _hashes:
+            return _hashes[key]
+    digest = content_hash(path)
+    with _hashes_lock:
+        if len(_hashes) > 4096:
+            _hashes.clear()
+        _hashes[key] = digest
+    return digest
+
+
+def thumbnail_path(digest: str) -> str:
+    return os.path.join(THUMBNAIL_FOLDER, digest[:2], f"{digest}_{THUMBNAIL_SIZE}_v{THUMBNAIL_VERSION}{THUMBNAIL_EXT}")
+
+
+def _text_page(text: str) -> Image.Image:
+    """Plain rendering of text documents: the first lines on a white page"""
+    width = THUMBNAIL_SIZE * 2
+    page = Image.new('RGB', (width, int(width * 1.414)), 'white')
+    draw = ImageDraw.Draw(page)
+    y = 16
+    for line in text.splitlines()[:60]:
+        draw.text((16, y), line[:90], fill='black')
+        y += 14
+        if y > page.height - 16:
+            break
+    return page
+
+
+def _open_image(path: str) -> Image.Image:
+    image = Image.open(path)
+    # JPEG decoders can downscale while decoding, which is far cheaper
+    image.draft('RGB', (THUMBNAIL_SIZE * 2, THUMBNAIL_SIZE * 2))
+    return ImageOps.exif_transpose(image)
+
+
+def _render_pdf(path: str) -> Image.Image:
+    try:
+        from pdf2image.pdf2image import convert_from_path
+        pages = convert_from_path(path, first_page=1, last_page=1, size=(THUMBNAIL_SIZE * 2, None))
+        if pages:
+            return pages[0]
+    except Exception as e:
+        print(f"pdf2image thumbnail error: {e}")
+    
+    # Without poppler: pdfplumber's own renderer
+    import pdfplumber
+    with pdfplumber.open(path) as pdf:
+        page = pdf.pages[0]
+        return page.to_image(resolution=72 * THUMBNAIL_SIZE * 2 / max(float(page.width), 1.0)).original.copy()
+
+
+def _render_docx(path: str) -> Image.Image:
+    with zipfile.ZipFile(path) as archive:
+        # Certificates in DOCX are usually a scanned image placed in the document
+        media = [name for name in archive.namelist()
+                 if name.startswith('word/media/') and name.lower().endswith(IMAGE_EXTENSIONS)]
+        if media:
+            largest = max(media, key=lambda name: archive.getinfo(name).file_size)
+            with archive.open(largest) as f:
+                image = Image.open(f)
+                image.draft('RGB', (THUMBNAIL_SIZE * 2, THUMBNAIL_SIZE * 2))
+                image.load()
+                return image
+    
+    return _text_page(read_docx_text(path))
+
+
+def render_first_page(path: str) -> Image.Image:
+    """First page of an image, PDF, DOCX or text upload"""
+    lower = path.lower()
+    if lower.endswith(IMAGE_EXTENSIONS):
+        return _open_image(path)
+    if lower.endswith('.pdf'):
+        return _render_pdf(path)
+    if lower.endswith('.docx'):
+        return _render_docx(path)
+    if lower.endswith('.txt'):
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return _text_page(f.read(8192))
+    raise ValueError(f"No thumbnail renderer for {os.path.basename(path)}")
+
+
+# Per-thumbnail locks: concurrent requests for one upload render it once.
+# Each entry is [lock, users]; it is dropped when its last user leaves.
+_render_locks: Dict[str, list] = {}
+_render_locks_guard = threading.Lock()
+
+
+def get_thumbnail(path: str) -> Optional[str]:
+    """
+    Path of the cached thumbnail for an upload, rendering it on first use
+    
+    Returns:
+        Thumbnail path, or None if the file is missing or cannot be rendered
+    """
+    try:
+        digest = _cached_hash(path)
+    except OSError:
+        return None
+    
+    target = thumbnail_path(digest)
+    if os.path.exists(target):
+        return target
+    
+    with _render_locks_guard:
+        entry = _render_locks.setdefault(digest, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            if os.path.exists(target):
+                return target
+            
+            image = render_first_page(path)
+            image = image.convert('RGB')
+            image.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.LANCZOS)
+            
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            tmp_path = f"{target}.tmp-{os.getpid()}-{threading.get_ident()}"
+            image.save(tmp_path, THUMBNAIL_FORMAT, quality=75)
+            os.replace(tmp_path, target)
+            return target
+    except Exception as e:
+        print(f"Thumbnail error for {os.path.basename(path)}: {e}")
+        return None
+    finally:
+        with _render_locks_guard:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _render_locks[digest]
+
+
+# Background pre-generation for uploads that mentors are about to open
+_pregenerate_queue = queue.Queue()
+_pregenerate_pending = set()
+_pregenerate_lock = threading.Lock()
+_pregenerate_thread = None
+
+
+def pregenerate(paths):
+    """Queue thumbnails for rendering in the background (already cached ones are skipped)"""
+    global _pregenerate_thread
+    
+    with _pregenerate_lock:
+        for path in paths:
+            if path and path not in _pregenerate_pending:
+                _pregenerate_pending.add(path)
+                _pregenerate_queue.put(path)
+        if _pregenerate_thread is None or not _pregenerate_thread.is_alive():
+            _pregenerate_thread = threading.Thread(target=_pregenerate_worker, daemon=True, name='thumbnails')
+            _pregenerate_thread.start()
+
+
+def _pregenerate_worker():
+    while True:
+        path = _pregenerate_queue.get()
+        try:
+            get_thumbnail(path)
+        finally:
+            with _pregenerate_lock:
+                _pregenerate_pending.discard(path)
+            _pregenerate_queue.task_done()
+
+
+def wait_for_pregeneration():
+    """Block until queued thumbnails are rendered (used in tests)"""
+    _pregenerate_queue.join()
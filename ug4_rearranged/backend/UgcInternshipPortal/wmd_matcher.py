@@ -3,55 +3,79 @@ Word Mover's Distance (WMD) Similarity Matching Module
 Uses spaCy embeddings as fallback (no GoogleNews dependency)
 """
 
+import copy
 import numpy as np
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Any, Optional, Set
 import spacy
 
+from course_index import CourseIndex, ANN_N_PROBE, course_text, word_set
+from keyword_index import KeywordIndex, normalize_tokens
+from nlp_cache import get_nlp_cache
+
 try:
     nlp = spacy.load("en_core_web_sm")
 except OSError:
     nlp = None
 
 
+# Reference curriculum database (sample data)
+DEFAULT_CURRICULUM = {
+    'CS301': {
+        'title': 'Web Development Fundamentals',
+        'keywords': ['html', 'css', 'javascript', 'web', 'frontend', 'react', 'responsive'],
+        'description': 'Introduction to web development including HTML, CSS, JavaScript, and modern frameworks like React'
+    },
+    'CS302': {
+        'title': 'Database Management Systems',
+        'keywords': ['database', 'sql', 'mysql', 'postgresql', 'queries', 'data', 'tables'],
+        'description': 'Relational database concepts, SQL queries, database design and normalization'
+    },
+    'CS303': {
+        'title': 'Machine Learning Basics',
+        'keywords': ['machine learning', 'python', 'ai', 'models', 'data science', 'algorithms'],
+        'description': 'Introduction to machine learning algorithms, data preprocessing, and model training'
+    },
+    'CS304': {
+        'title': 'Mobile App Development',
+        'keywords': ['mobile', 'android', 'ios', 'app', 'react native', 'flutter'],
+        'description': 'Mobile application development for Android and iOS platforms'
+    },
+    'CS305': {
+        'title': 'Cloud Computing',
+        'keywords': ['cloud', 'aws', 'azure', 'gcp', 'devops', 'docker', 'kubernetes'],
+        'description': 'Cloud platforms, containerization, and DevOps practices'
+    },
+    'CS306': {
+        'title': 'Backend Development',
+        'keywords': ['backend', 'api', 'rest', 'node', 'python', 'flask', 'django', 'server'],
+        'description': 'Server-side development, API design, and backend frameworks'
+    },
+}
+
+
 class WMDMatcher:
     """Word Mover's Distance based similarity matching"""
     
-    def __init__(self):
+    def __init__(self, curriculum_db: Optional[Dict[str, Dict]] = None,
+                 course_index: Optional[CourseIndex] = None,
+                 catalogue_version: Optional[str] = None):
         self.nlp = nlp
+        self.nlp_cache = get_nlp_cache(nlp)
         
-        # Reference curriculum database (sample data)
-        self.curriculum_db = {
-            'CS301': {
-                'title': 'Web Development Fundamentals',
-                'keywords': ['html', 'css', 'javascript', 'web', 'frontend', 'react', 'responsive'],
-                'description': 'Introduction to web development including HTML, CSS, JavaScript, and modern frameworks like React'
-            },
-            'CS302': {
-                'title': 'Database Management Systems',
-                'keywords': ['database', 'sql', 'mysql', 'postgresql', 'queries', 'data', 'tables'],
-                'description': 'Relational database concepts, SQL queries, database design and normalization'
-            },
-            'CS303': {
-                'title': 'Machine Learning Basics',
-                'keywords': ['machine learning', 'python', 'ai', 'models', 'data science', 'algorithms'],
-                'description': 'Introduction to machine learning algorithms, data preprocessing, and model training'
-            },
-            'CS304': {
-                'title': 'Mobile App Development',
-                'keywords': ['mobile', 'android', 'ios', 'app', 'react native', 'flutter'],
-                'description': 'Mobile application development for Android and iOS platforms'
-            },
-            'CS305': {
-                'title': 'Cloud Computing',
-                'keywords': ['cloud', 'aws', 'azure', 'gcp', 'devops', 'docker', 'kubernetes'],
-                'description': 'Cloud platforms, containerization, and DevOps practices'
-            },
-            'CS306': {
-                'title': 'Backend Development',
-                'keywords': ['backend', 'api', 'rest', 'node', 'python', 'flask', 'django', 'server'],
-                'description': 'Server-side development, API design, and backend frameworks'
-            },
-        }
+        # Reference curriculum database (sample data unless a catalogue
+        # snapshot is supplied; snapshots are shared, never mutated)
+        self.curriculum_db = curriculum_db if curriculum_db is not None else copy.deepcopy(DEFAULT_CURRICULUM)
+        self.catalogue_version = catalogue_version
+        
+        # Precomputed vectors/postings (shared by a catalogue snapshot or built lazily)
+        self._course_index = course_index
+    
+    @property
+    def course_index(self) -> CourseIndex:
+        """Precomputed index over the current curriculum database"""
+        if self._course_index is None:
+            self._course_index = CourseIndex(self.curriculum_db, self.nlp)
+        return self._course_index
     
     def calculate_similarity(self, text1: str, text2: str) -> float:
         """
@@ -64,20 +88,22 @@ class WMDMatcher:
         Returns:
             Similarity score (0.0 to 1.0)
         """
+        return self._similarity(text1, text2, word_set(text1), word_set(text2))
+    
+    def _similarity(self, text1: str, text2: str, words1: Set[str], words2: Set[str]) -> float:
+        """calculate_similarity with the word sets supplied by the caller"""
         if not self.nlp:
             # Fallback: simple word overlap
-            return self._simple_similarity(text1, text2)
+            return self._simple_similarity(words1, words2)
         
         # Use spaCy similarity
-        doc1 = self.nlp(text1)
-        doc2 = self.nlp(text2)
+        doc1 = self.nlp_cache(text1)
+        doc2 = self.nlp_cache(text2)
         
         # spaCy similarity ranges 0-1
         similarity = doc1.similarity(doc2)
         
         # Boost for exact keyword matches
-        words1 = set(text1.lower().split())
-        words2 = set(text2.lower().split())
         overlap = len(words1 & words2) / max(len(words1 | words2), 1)
         
         # Weighted combination
@@ -85,11 +111,8 @@ class WMDMatcher:
         
         return min(final_score, 1.0)
     
-    def _simple_similarity(self, text1: str, text2: str) -> float:
+    def _simple_similarity(self, words1: Set[str], words2: Set[str]) -> float:
         """Fallback similarity using word overlap"""
-        words1 = set(text1.lower().split())
-        words2 = set(text2.lower().split())
-        
         if not words1 or not words2:
             return 0.0
         
@@ -98,33 +121,49 @@ class WMDMatcher:
         
         return len(intersection) / len(union)
     
-    def find_matches(self, internship_tokens: List[str], threshold: float = 0.3) -> List[Dict]:
+    def find_matches(self, internship_tokens: List[str], threshold: float = 0.3,
+                     n_probe: int = ANN_N_PROBE, use_ann: bool = True) -> List[Dict]:
         """
         Find matching curriculum courses for internship
         
         Args:
             internship_tokens: List of CEESCM tokens from internship
             threshold: Minimum similarity threshold
+            n_probe: ANN lists scanned for candidates (large catalogues only)
+            use_ann: Set False to score every course exactly
             
         Returns:
             List of matches with scores
         """
         internship_text = ' '.join(internship_tokens)
+        internship_words = word_set(internship_text)
         matches = []
         
-        for course_id, course_data in self.curriculum_db.items():
-            # Combine course keywords and description
-            course_text = ' '.join(course_data['keywords']) + ' ' + course_data['description']
+        # One pass over the submission finds keywords for every course
+        index = self.course_index
+        keyword_hits = index.keyword_index.match(internship_text)
+        
+        # Large catalogues: only ANN candidates are scored exactly
+        if use_ann and index.ann is not None:
+            positions = index.candidate_positions([internship_text], n_probe)[0]
+        else:
+            positions = range(len(index.course_ids))
+        
+        for position in positions:
+            # Course text is keywords + description, word set precomputed
+            course_id = index.course_ids[position]
+            course_data = self.curriculum_db[course_id]
             
             # Calculate similarity
-            similarity = self.calculate_similarity(internship_text, course_text)
+            similarity = self._similarity(internship_text, course_text(course_data),
+                                          internship_words, index.course_word_sets[position])
             
             if similarity >= threshold:
                 matches.append({
                     'course_id': course_id,
                     'course_title': course_data['title'],
                     'similarity': round(similarity, 3),
-                    'keywords_matched': self._get_matched_keywords(internship_text, course_data['keywords'])
+                    'keywords_matched': keyword_hits.get(course_id, [])
                 })
         
         # Sort by similarity descending
@@ -133,15 +172,9 @@ class WMDMatcher:
         return matches
     
     def _get_matched_keywords(self, internship_text: str, course_keywords: List[str]) -> List[str]:
-        """Get keywords that appear in both texts"""
-        internship_lower = internship_text.lower()
-        matched = []
-        
-        for keyword in course_keywords:
-            if keyword in internship_lower:
-                matched.append(keyword)
-        
-        return matched
+        """Get keywords that appear in both texts (matched at token boundaries)"""
+        index = KeywordIndex({'_': {'keywords': course_keywords}})
+        return index.match(internship_text).get('_', [])
     
     def compute_composite_score(self, matches: List[Dict]) -> float:
         """
@@ -179,25 +212,310 @@ class WMDMatcher:
         else:
             return 'Not Equivalent'
     
+    def score_matrix(self, batch_tokens: List[List[str]]) -> np.ndarray:
+        """
+        Score many submissions against every course in one call
+        
+        Args:
+            batch_tokens: One CEESCM token list per submission
+        
+        Returns:
+            N x M similarity matrix (columns follow course_index.course_ids)
+        """
+        texts = [' '.join(tokens) for tokens in batch_tokens]
+        return self.course_index.similarity_matrix(texts)
+    
+    def match_batch(self, batch_tokens: List[List[str]], threshold: float = 0.3,
+                    top_k: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Batch equivalent of find_matches/compute_composite_score/classify_match
+        
+        Args:
+            batch_tokens: One CEESCM token list per submission
+            threshold: Minimum similarity threshold
+            top_k: Maximum number of matches listed per submission (None for all)
+        
+        Returns:
+            Dictionary with the raw similarity matrix, composite scores,
+            decisions and per-submission match lists
+        """
+        index = self.course_index
+        similarity = self.score_matrix(batch_tokens)
+        rounded = np.round(similarity, 3)
+        
+        # Stable sort keeps curriculum order for ties, like find_matches
+        order = np.argsort(-rounded, axis=1, kind='stable')
+        sorted_scores = np.take_along_axis(rounded, order, axis=1)
+        passed = np.take_along_axis(similarity >= threshold, order, axis=1)
+        
+        # Composite: mean of the top 3 courses above threshold
+        rank = np.cumsum(passed, axis=1) - 1
+        top3 = passed & (rank < 3)
+        counts = top3.sum(axis=1)
+        totals = (sorted_scores * top3).sum(axis=1)
+        composites = np.round(np.divide(totals, counts, out=np.zeros_like(totals), where=counts > 0), 3)
+        
+        decisions = np.select(
+            [composites >= 0.7, composites >= 0.4],
+            ['Equivalent', 'Partially Equivalent'],
+            'Not Equivalent'
+        )
+        
+        listed = passed if top_k is None else passed & (rank < top_k)
+        all_matches = []
+        for row, tokens in enumerate(batch_tokens):
+            keyword_hits = index.keyword_index.match(' '.join(tokens))
+            matches = []
+            for col in order[row][listed[row]]:
+                matches.append({
+                    'course_id': index.course_ids[col],
+                    'course_title': index.course_titles[col],
+                    'similarity': float(rounded[row, col]),
+                    'keywords_matched': keyword_hits.get(index.course_ids[col], [])
+                })
+            all_matches.append(matches)
+        
+        return {
+            'course_ids': list(index.course_ids),
+            'similarity': similarity,
+            'composites': composites,
+            'decisions': decisions.tolist(),
+            'matches': all_matches,
+        }
+    
+    def match_state(self, internship_tokens: List[str]) -> Dict[str, Any]:
+        """
+        Reusable partial results for a submission (stored with the record)
+        
+        Holds the submission word set, the number of words it shares with each
+        course and its keyword hits, so keyword overrides can be rescored
+        without rescanning the catalogue. No vectors are stored: a rescore
+        embeds the amended submission once.
+        
+        Args:
+            internship_tokens: List of CEESCM tokens from internship
+        
+        Returns:
+            JSON-serializable state for rescore()
+        """
+        index = self.course_index
+        text = ' '.join(internship_tokens)
+        words = word_set(text)
+        
+        counts = index.intersection_counts(words)
+        partials = {index.course_ids[p]: int(counts[p]) for p in np.flatnonzero(counts)}
+        
+        return {
+            'catalogue_version': self.catalogue_version,
+            'course_count': len(index),
+            'words': sorted(words),
+            'partials': partials,
+            'keyword_hits': index.keyword_index.match(text),
+        }
+    
+    def rescore(self, state: Dict[str, Any], internship_tokens: List[str], added_tokens: List[str],
+                course_keywords: Dict[str, List[str]], threshold: float = 0.3) -> List[Dict]:
+        """
+        Incremental find_matches after tokens/keywords are added
+        
+        Only the changed courses are rescored: those in course_keywords and
+        those containing an added word. Any other course gains no shared word
+        while the submission grows, so its word overlap can only drop; when
+        course_keywords covers the previous matches (as in rematch_internship)
+        the result equals a full re-run on overlap scores. With vectors, other
+        courses are not compared against the amended submission vector.
+        
+        Args:
+            state: Result of match_state() for internship_tokens
+            internship_tokens: Tokens the state was built from
+            added_tokens: Tokens appended to the submission
+            course_keywords: Keywords added per course (mentor override)
+            threshold: Minimum similarity threshold
+        
+        Returns:
+            List of matches with scores (same shape as find_matches)
+        """
+        index = self.course_index
+        if state.get('catalogue_version') != self.catalogue_version or state.get('course_count') != len(index):
+            raise ValueError("Match state was built against a different catalogue")
+        
+        positions = index.course_positions
+        words = set(state['words'])
+        added_words = word_set(' '.join(added_tokens)) - words
+        all_words = words | added_words
+        
+        # Course side: keywords not already on the course (like add_custom_keywords)
+        changed, new_keywords = set(), {}
+        for course_id, keywords in course_keywords.items():
+            if course_id not in positions:
+                continue
+            position = positions[course_id]
+            changed.add(position)
+            fresh = [kw for kw in dict.fromkeys(keywords) if kw not in index.course_keywords[position]]
+            if fresh:
+                new_keywords[position] = fresh
+        
+        # Submission side: courses containing an added word (found through the postings)
+        added_counts = index.intersection_counts(added_words)
+        scored = np.array(sorted(changed | set(np.flatnonzero(added_counts).tolist())), dtype=np.int64)
+        
+        inter = added_counts[scored] + np.array(
+            [state['partials'].get(index.course_ids[p], 0) for p in scored], dtype=np.int64)
+        sizes = index.course_word_counts[scored].astype(np.int64)
+        for row, position in enumerate(scored):
+            if position in new_keywords:
+                new_words = word_set(' '.join(new_keywords[position])) - index.course_word_sets[position]
+                sizes[row] += len(new_words)
+                inter[row] += len(new_words & all_words)
+        
+        union = len(all_words) + sizes - inter
+        overlap = np.divide(inter, union, out=np.zeros(len(scored)), where=union > 0)
+        if not all_words:
+            overlap[:] = 0.0
+        
+        text = ' '.join(list(internship_tokens) + list(added_tokens))
+        if self.nlp and len(scored):
+            vector = self.nlp_cache(text).vector.astype(np.float64)
+            course_vectors = np.asarray(index.vectors[scored], dtype=np.float64)
+            for row, position in enumerate(scored):
+                if position in new_keywords:
+                    base_tokens = len(self.nlp.make_doc(course_text(self.curriculum_db[index.course_ids[position]])))
+                    delta, count = self._vector_sum(' '.join(new_keywords[position]))
+                    course_vectors[row] = (course_vectors[row] * base_tokens + delta) / (base_tokens + count)
+            
+            denom = np.linalg.norm(vector) * np.linalg.norm(course_vectors, axis=1)
+            dots = course_vectors @ vector
+            semantic = np.divide(dots, denom, out=np.zeros_like(dots), where=denom > 0)
+            scores = np.minimum(0.7 * semantic + 0.3 * overlap, 1.0)
+        else:
+            scores = overlap
+        
+        # Keyword hits: stored ones, plus n-grams that reach into the added tokens
+        original = normalize_tokens(' '.join(internship_tokens))
+        tail = original[max(len(original) - (index.keyword_index.max_ngram - 1), 0):] + \
+            normalize_tokens(' '.join(added_tokens))
+        tail_hits = index.keyword_index.match_tokens(tail)
+        custom_hits = KeywordIndex({
+            index.course_ids[position]: {'keywords': keywords} for position, keywords in new_keywords.items()
+        }).match(text) if new_keywords else {}
+        
+        matches = []
+        for position, similarity in zip(scored, scores):
+            if similarity < threshold:
+                continue
+            course_id = index.course_ids[position]
+            hits = set(state['keyword_hits'].get(course_id, ())) | set(tail_hits.get(course_id, ()))
+            keywords_matched = [kw for kw in index.course_keywords[position] if kw in hits]
+            keywords_matched += custom_hits.get(course_id, [])
+            matches.append({
+                'course_id': course_id,
+                'course_title': index.course_titles[position],
+                'similarity': round(float(similarity), 3),
+                'keywords_matched': keywords_matched
+            })
+        
+        # Sort by similarity descending (stable, curriculum order for ties)
+        matches.sort(key=lambda x: x['similarity'], reverse=True)
+        
+        return matches
+    
     def add_custom_keywords(self, course_id: str, keywords: List[str]):
         """Add custom keywords to a course (mentor override)"""
         if course_id in self.curriculum_db:
-            existing = set(self.curriculum_db[course_id]['keywords'])
+            # Copy-on-write so a shared catalogue snapshot is never modified
+            course = dict(self.curriculum_db[course_id])
+            existing = set(course['keywords'])
             existing.update(keywords)
-            self.curriculum_db[course_id]['keywords'] = list(existing)
+            course['keywords'] = list(existing)
+            self.curriculum_db = {**self.curriculum_db, course_id: course}
+            self._course_index = None
 
 
 # Convenience function
-def match_internship(internship_tokens: List[str]) -> Tuple[List[Dict], float, str]:
+def match_internship(internship_tokens: List[str],
+                     matcher: Optional[WMDMatcher] = None) -> Tuple[List[Dict], float, str]:
     """
     Match internship against curriculum
     
+    Args:
+        internship_tokens: List of CEESCM tokens from internship
+        matcher: Matcher bound to a catalogue snapshot (sample data if omitted)
+    
     Returns:
         (matches, composite_score, decision)
     """
-    matcher = WMDMatcher()
+    matcher = matcher or WMDMatcher()
     matches = matcher.find_matches(internship_tokens)
     composite = matcher.compute_composite_score(matches)
     decision = matcher.classify_match(composite)
     
     return matches, composite, decision
+
+
+def rematch_internship(state: Optional[Dict[str, Any]], internship_tokens: List[str],
+                       custom_keywords: List[str], course_ids: List[str],
+                       matcher: Optional[WMDMatcher] = None) -> Optional[Tuple[List[Dict], float, str]]:
+    """
+    Re-match after a mentor adds keywords, reusing the stored match state
+    
+    The keywords are appended to the submission and added to each of
+    course_ids, like add_custom_keywords followed by match_internship.
+    
+    Returns:
+        (matches, composite_score, decision), or None if the state is
+        missing or was built against another catalogue version
+    """
+    return rematch_with_overrides(state, internship_tokens, custom_keywords,
+                                  {course_id: custom_keywords for course_id in course_ids}, matcher)
+
+
+def rematch_with_overrides(state: Optional[Dict[str, Any]], internship_tokens: List[str],
+                           added_tokens: List[str], overrides: Dict[str, List[str]],
+                           matcher: Optional[WMDMatcher] = None) -> Optional[Tuple[List[Dict], float, str]]:
+    """
+    Re-match with keyword overrides, reusing the stored match state
+    
+    added_tokens are appended to the submission and each course gets its
+    override keywords, like add_custom_keywords per course followed by
+    match_internship. The catalogue itself is not changed.
+    
+    Args:
+        state: Result of match_state() for internship_tokens
+        internship_tokens: Tokens the state was built from
+        added_tokens: Keywords appended to the submission
+        overrides: Keywords added per course
+        matcher: Matcher bound to the catalogue version of the state
+    
+    Returns:
+        (matches, composite_score, decision), or None if the state is
+        missing or was built against another catalogue version
+    """
+    matcher = matcher or WMDMatcher()
+    if not state:
+        return None
+    
+    try:
+        matches = matcher.rescore(state, internship_tokens, added_tokens, overrides)
+    except (ValueError, KeyError):
+        return None
+    composite = matcher.compute_composite_score(matches)
+    decision = matcher.classify_match(composite)
+    
+    return matches, composite, decision
+
+
+def match_internships(batch_tokens: List[List[str]],
+                      matcher: Optional[WMDMatcher] = None) -> List[Tuple[List[Dict], float, str]]:
+    """
+    Match many internships against curriculum in one vectorized pass
+    
+    Returns:
+        One (matches, composite_score, decision) tuple per submission
+    """
+    matcher = matcher or WMDMatcher()
+    result = matcher.match_batch(batch_tokens)
+    
+    return [
+        (matches, float(composite), decision)
+        for matches, composite, decision in zip(result['matches'], result['composites'], result['decisions'])
+    ]